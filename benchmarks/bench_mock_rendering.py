@@ -0,0 +1,116 @@
+"""Compare the template-based rendering of `GMockGenerator` with the former string concatenation.
+
+Usage: python benchmarks/bench_mock_rendering.py [--classes N] [--methods N] [--files N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gtest_mock_generator import GMockGenerator, is_mockable, is_mocked, method_qualifiers, parameter_declaration, protect_commas
+
+def reference_generate_mock_file(parsed_data, output_file):
+    """Reference implementation of the generator features with `+=` concatenation and several writes per file:
+    namespaces, skipped methods and classes, qualifiers, commas in types and wrapped declarators."""
+    def generate_method_mock(method_data):
+        params = ', '.join([parameter_declaration(param['type'], param['name']) for param in method_data['parameters']])
+        qualifiers = method_qualifiers(method_data['is_const'], method_data.get('is_noexcept', False),
+                                       method_data.get('ref_qualifier', ''))
+        return (f"    MOCK_METHOD({protect_commas(method_data['return_type'])}, {method_data['name']}, ({params}), "
+                f"({qualifiers}));")
+
+    def generate_class_mock(class_data):
+        class_name = class_data['name']
+        mock_class = f"class Mock{class_name} : public {class_name} {{\npublic:\n"
+        mock_class += '\n'.join([generate_method_mock(method) for method in class_data['methods'] if is_mockable(method)])
+        mock_class += "\n};"
+        return mock_class
+
+    def generate_mocks(items):
+        mocks = []
+        for item in items:
+            if item['type'] == 'Class' and is_mocked(item):
+                mocks.append(generate_class_mock(item))
+            elif item['type'] == 'Namespace':
+                mocks.append(f"namespace {item['name']} {{\n\n{generate_mocks(item['children'])}\n\n}}  // namespace {item['name']}")
+        return '\n\n'.join(mocks)
+
+    header_guard = f"MOCK_{os.path.basename(output_file).replace('.', '_').upper()}"
+    with open(output_file, 'w') as f:
+        f.write(f"#ifndef {header_guard}\n")
+        f.write(f"#define {header_guard}\n\n")
+        f.write('#include <gmock/gmock.h>\n\n')
+        f.write(generate_mocks(parsed_data))
+        f.write(f"\n\n#endif // {header_guard}\n")
+
+def synthetic_method(index, **fields):
+    """Build the parsed data of a public virtual method, using the less common features on some methods."""
+    parameters = [{'name': 'count', 'type': 'int'}, {'name': 'name', 'type': 'const std::string &'},
+                  {'name': 'values', 'type': 'std::vector<int> &'}]
+    if index % 10 == 0:
+        parameters.append({'name': 'callback', 'type': 'void (*)(int, int)'})
+    return {
+        'type': 'Method', 'name': f'method{index}', 'return_type': 'std::map<int, int>' if index % 7 == 0 else 'std::string',
+        'parameters': parameters, 'is_virtual': True, 'is_static': False, 'is_const': index % 3 == 0,
+        'is_noexcept': index % 5 == 0, 'ref_qualifier': '&' if index % 11 == 0 else '', 'is_final': False,
+        'access': 'AccessSpecifier.PUBLIC', **fields,
+    }
+
+def synthetic_parsed_data(classes, methods, classes_per_namespace=10):
+    """Build the parsed data of `classes` classes of `methods` virtual methods each, plus a non-virtual
+    method and an operator, in namespaces of `classes_per_namespace` classes."""
+    namespaces = []
+    for class_index in range(classes):
+        if class_index % classes_per_namespace == 0:
+            namespaces.append({'type': 'Namespace', 'name': f'module{len(namespaces)}', 'children': []})
+        namespaces[-1]['children'].append({
+            'type': 'Class', 'name': f'Interface{class_index}', 'base_classes': [], 'members': [], 'static_members': [],
+            'methods': [synthetic_method(method_index) for method_index in range(methods)] + [
+                synthetic_method(methods, name='size', is_virtual=False),
+                synthetic_method(methods + 1, name='operator==', return_type='bool'),
+            ],
+        })
+    return namespaces
+
+def best_time(function, repeat):
+    """Return the best wall time of `repeat` calls to `function`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(argv):
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument('--classes', type=int, default=100)
+    argument_parser.add_argument('--methods', type=int, default=100)
+    argument_parser.add_argument('--files', type=int, default=10)
+    argument_parser.add_argument('--repeat', type=int, default=5)
+    arguments = argument_parser.parse_args(argv)
+
+    parsed_data = synthetic_parsed_data(arguments.classes, arguments.methods)
+    generator = GMockGenerator()
+    with tempfile.TemporaryDirectory() as directory:
+        mock_files = [(parsed_data, os.path.join(directory, f'mock{file_index}.h')) for file_index in range(arguments.files)]
+        reference_file = os.path.join(directory, 'reference.h')
+
+        reference = best_time(lambda: [reference_generate_mock_file(data, mock_file) for data, mock_file in mock_files],
+                              arguments.repeat)
+        templates = best_time(lambda: generator.generate_mock_files(mock_files), arguments.repeat)
+
+        # Both paths must produce the same headers.
+        reference_generate_mock_file(parsed_data, reference_file)
+        generator.generate_mock_file(parsed_data, os.path.join(directory, 'reference.h.new'))
+        with open(reference_file) as expected, open(reference_file + '.new') as rendered:
+            assert expected.read() == rendered.read().replace('REFERENCE_H_NEW', 'REFERENCE_H')
+
+    print(f"{arguments.files} files of {arguments.classes} classes x {arguments.methods} methods")
+    print(f"string concatenation: {reference * 1000:9.1f} ms")
+    print(f"templates:            {templates * 1000:9.1f} ms ({reference / templates:.2f}x)")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,75 @@
+"""Compare the single-pass traversal of `CppParser` with the former recursive, two-pass walk.
+
+Usage: python benchmarks/bench_traversal.py [--classes N] [--namespace-depth N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clang.cindex import CursorKind
+from cppparser import CppParser, normalize_path
+from synthetic_headers import write_header
+
+def recursive_walk(node):
+    """Reference implementation of the former walk: classes list their children twice and
+    namespaces recurse through the generic node processing."""
+    if node.kind == CursorKind.NAMESPACE:
+        children = [recursive_walk(child) for child in node.get_children()]
+        return {'type': 'Namespace', 'name': node.spelling, 'children': [child for child in children if child]}
+    if node.kind == CursorKind.CLASS_DECL:
+        class_data = {'type': 'Class', 'name': node.spelling, 'base_classes': [], 'members': [],
+                      'methods': [], 'static_members': []}
+        for base in node.get_children():
+            if base.kind == CursorKind.CXX_BASE_SPECIFIER:
+                class_data['base_classes'].append(base.type.spelling)
+        for child in node.get_children():
+            if child.kind == CursorKind.CXX_METHOD:
+                class_data['methods'].append({
+                    'type': 'Method', 'name': child.spelling, 'return_type': child.result_type.spelling,
+                    'parameters': [{'name': arg.spelling, 'type': arg.type.spelling} for arg in child.get_arguments()],
+                    'is_virtual': 'virtual' in child.type.spelling, 'is_static': child.is_static_method(),
+                    'is_const': child.is_const_method(), 'access': str(child.access_specifier)})
+            elif child.kind == CursorKind.FIELD_DECL:
+                class_data['members'].append({'type': 'Member', 'name': child.spelling, 'is_static': False,
+                                              'access': str(child.access_specifier)})
+        return class_data
+    return None
+
+def best_time(function, repeat):
+    """Return the best wall time of `repeat` calls to `function`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(argv):
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument('--classes', type=int, default=2000)
+    argument_parser.add_argument('--methods', type=int, default=10)
+    argument_parser.add_argument('--namespace-depth', type=int, default=50)
+    argument_parser.add_argument('--repeat', type=int, default=3)
+    arguments = argument_parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        header = write_header(directory, 'large.h', classes=arguments.classes, methods=arguments.methods,
+                              namespace_depth=arguments.namespace_depth, stl_includes=False)
+        parser = CppParser()
+        tu = parser.index.parse(header, args=parser.arguments_for(header), options=parser.parse_options)
+        header_path = normalize_path(header)
+        top_level = [node for node in tu.cursor.get_children() if node.location.file and normalize_path(node.location.file.name) == header_path]
+
+        recursive = best_time(lambda: [recursive_walk(node) for node in top_level], arguments.repeat)
+        single_pass = best_time(lambda: parser.process_translation_unit(tu, header_path), arguments.repeat)
+
+    print(f"{arguments.classes} classes x {arguments.methods} methods, {arguments.namespace_depth} nested namespaces")
+    print(f"recursive two-pass walk: {recursive * 1000:9.1f} ms")
+    print(f"single-pass traversal:   {single_pass * 1000:9.1f} ms ({recursive / single_pass:.2f}x)")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
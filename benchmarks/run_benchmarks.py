@@ -0,0 +1,155 @@
+"""Benchmark suite timing each stage of the pipeline on synthetic headers, with regression detection.
+
+Every scenario generates a header, then times separately:
+- `parse`: `CppParser.parse_header`, without consolidation;
+- `consolidate`: the consolidation of inheritance by a `ClassHierarchy`;
+- `save_yaml` and `load_yaml`: the YAML round-trip of the parsed data (and likewise for the other formats);
+- `generate_mocks`: `GMockGenerator.generate_mock_file`.
+
+Results are written as JSON. Given a baseline (the JSON of an earlier run), stages slower than the
+baseline by more than the tolerance are reported and the suite exits with status 1.
+
+Usage: python benchmarks/run_benchmarks.py [--scale F] [--repeat N] [--output FILE] [--baseline FILE]
+                                           [--tolerance F] [--scenario NAME ...]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from class_hierarchy import ClassHierarchy
+from cpp_ir import entity_from_dict
+from cppparser import CppParser
+from gtest_mock_generator import GMockGenerator
+from serialization import OUTPUT_FORMATS, load_parsed_data, save_parsed_data
+from synthetic_headers import write_header
+
+RESULTS_VERSION = 1
+
+# Options of `synthetic_headers.generate_header` for each scenario, at scale 1.
+SCENARIOS = {
+    'many_classes': {'classes': 2000, 'methods': 10, 'namespace_depth': 0, 'stl_includes': False},
+    'deep_inheritance': {'classes': 1000, 'methods': 10, 'inheritance_depth': 50, 'stl_includes': False},
+    'wide_namespaces': {'classes': 2000, 'methods': 10, 'namespace_count': 200, 'namespace_depth': 3,
+                        'stl_includes': False},
+    'stl_includes': {'classes': 200, 'methods': 10, 'stl_includes': True},
+}
+
+# Differences below this many seconds are noise, whatever their ratio to the baseline.
+MINIMUM_REGRESSION = 0.005
+
+def best_time(function, repeat):
+    """Return the best wall time of `repeat` calls to `function`, and the result of the last call."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def consolidate(parsed_data):
+    """Consolidate the inheritance of parsed data, as `main.consolidate_all` does."""
+    entities = [entity_from_dict(item) for item in parsed_data]
+    hierarchy = ClassHierarchy()
+    hierarchy.add_entities(entities)
+    hierarchy.consolidate(entities)
+    return [entity.to_dict() for entity in entities]
+
+def run_scenario(options, directory, repeat):
+    """Time every stage on a header generated with `options`, returning the seconds of each stage."""
+    header = write_header(directory, 'benchmark.h', **options)
+    parser = CppParser()
+    timings = {}
+
+    timings['parse'], parsed_data = best_time(lambda: parser.parse_header([header], consolidate=False), repeat)
+    timings['consolidate'], consolidated_data = best_time(lambda: consolidate(parsed_data), repeat)
+
+    for output_format, extension in OUTPUT_FORMATS.items():
+        output_file = os.path.join(directory, f'benchmark_output{extension}')
+
+        def save():
+            # Remove the file first, so every run writes it instead of finding it unchanged.
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            save_parsed_data(consolidated_data, output_file)
+
+        timings[f'save_{output_format}'], _ = best_time(save, repeat)
+        timings[f'load_{output_format}'], _ = best_time(lambda: load_parsed_data(output_file), repeat)
+
+    generator = GMockGenerator()
+    mock_file = os.path.join(directory, 'benchmark_mock.h')
+    timings['generate_mocks'], _ = best_time(lambda: generator.generate_mock_file(consolidated_data, mock_file), repeat)
+    return timings
+
+def scaled_options(options, scale):
+    """Scale the number of classes of a scenario."""
+    return {**options, 'classes': max(1, int(options['classes'] * scale))}
+
+def find_regressions(results, baseline, tolerance):
+    """List the stages of `results` slower than in `baseline` by more than `tolerance` (a ratio)."""
+    regressions = []
+    for scenario, timings in results['scenarios'].items():
+        baseline_timings = baseline.get('scenarios', {}).get(scenario, {})
+        for stage, seconds in timings.items():
+            baseline_seconds = baseline_timings.get(stage)
+            if baseline_seconds is None:
+                continue
+            if seconds > baseline_seconds * (1 + tolerance) and seconds - baseline_seconds > MINIMUM_REGRESSION:
+                regressions.append((scenario, stage, baseline_seconds, seconds))
+    return regressions
+
+def main(argv):
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument('--scale', type=float, default=1.0,
+                                 help="Factor applied to the number of classes of every scenario (default: 1).")
+    argument_parser.add_argument('--repeat', type=int, default=3, help="Runs of each stage; the best is kept (default: 3).")
+    argument_parser.add_argument('--scenario', dest='scenarios', action='append', choices=sorted(SCENARIOS),
+                                 help="Scenario to run (may be repeated; default: all).")
+    argument_parser.add_argument('--output', help="File to write the results to, as JSON.")
+    argument_parser.add_argument('--baseline', help="Results of an earlier run to compare with.")
+    argument_parser.add_argument('--tolerance', type=float, default=0.25,
+                                 help="Slowdown ratio over the baseline reported as a regression (default: 0.25).")
+    arguments = argument_parser.parse_args(argv)
+
+    results = {
+        'version': RESULTS_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': arguments.scale,
+        'scenarios': {},
+    }
+    for scenario in arguments.scenarios or SCENARIOS:
+        with tempfile.TemporaryDirectory() as directory:
+            timings = run_scenario(scaled_options(SCENARIOS[scenario], arguments.scale), directory, arguments.repeat)
+        results['scenarios'][scenario] = timings
+        print(f"{scenario}:")
+        for stage, seconds in timings.items():
+            print(f"    {stage:<16} {seconds * 1000:9.1f} ms")
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
+            file.write('\n')
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get('scale') != arguments.scale:
+            print(f"The baseline was run at scale {baseline.get('scale')}, not {arguments.scale}")
+            return 1
+        regressions = find_regressions(results, baseline, arguments.tolerance)
+        for scenario, stage, baseline_seconds, seconds in regressions:
+            print(f"Regression in {scenario}/{stage}: {baseline_seconds * 1000:.1f} ms -> {seconds * 1000:.1f} ms "
+                  f"({seconds / baseline_seconds:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regression over {arguments.baseline}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
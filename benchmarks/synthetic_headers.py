@@ -0,0 +1,45 @@
+import os
+
+def class_declaration(name, base_name=None, methods=10, members=3, indent=''):
+    """Write the declaration of a class with virtual methods and data members."""
+    inheritance = f" : public {base_name}" if base_name else ''
+    lines = [f"{indent}class {name}{inheritance} {{", f"{indent}public:", f"{indent}    virtual ~{name}();"]
+    for index in range(methods):
+        lines.append(f"{indent}    virtual int {name}_method{index}(int a, const std::string& b) const;")
+    lines.append(f"{indent}    static int {name}_instances;")
+    lines.append(f"{indent}private:")
+    for index in range(members):
+        lines.append(f"{indent}    int {name}_member{index};")
+    lines.append(f"{indent}}};")
+    return '\n'.join(lines)
+
+def generate_header(classes=1000, methods=10, inheritance_depth=1, namespace_depth=1, stl_includes=True,
+                    namespace_count=1):
+    """Generate the content of a large header.
+
+    Classes are spread evenly across `namespace_count` sibling namespaces, each made of `namespace_depth`
+    nested namespaces; within a namespace, each class derives from the class declared before it until a
+    chain of `inheritance_depth` classes is complete."""
+    lines = ['#pragma once']
+    if stl_includes:
+        lines += ['#include <string>', '#include <vector>', '#include <map>', '#include <memory>', '#include <functional>']
+    else:
+        lines += ['namespace std { class string; }']
+    classes_per_namespace = -(-classes // namespace_count)
+    for namespace_index in range(namespace_count):
+        for depth in range(namespace_depth):
+            lines.append(f"namespace level{depth}{f'_{namespace_index}' if namespace_count > 1 else ''} {{")
+        first_index = namespace_index * classes_per_namespace
+        for index in range(first_index, min(first_index + classes_per_namespace, classes)):
+            base_name = f"Class{index - 1}" if (index - first_index) % inheritance_depth else None
+            lines.append(class_declaration(f"Class{index}", base_name, methods))
+        lines += ['}'] * namespace_depth
+    return '\n'.join(lines) + '\n'
+
+def write_header(directory, name, **options):
+    """Generate a header and write it to `directory`, returning its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, 'w') as file:
+        file.write(generate_header(**options))
+    return path
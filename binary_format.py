@@ -0,0 +1,325 @@
+"""Compact binary layout for parsed data, loaded without pickle and directly from a memory map.
+
+A file is made of, all integers being little-endian:
+- a header: the `MAGIC` bytes, the format `VERSION`, the sizes of the following sections and the root token;
+- the string table: every distinct string once, as its UTF-8 length followed by its bytes, padded to a word;
+- the shape table: the key lists shared by dicts, each as its key count followed by the string index of each key;
+- the wide values: the 64-bit integers that do not fit in a token, then the 64-bit floats;
+- the body: the containers, in groups of dicts of one shape or of lists, each group referring only to groups
+  before it. A group is its kind (0 for lists, one plus the shape index for dicts), its container count, the
+  token of each container, the item count of each list, then the values of its containers, one token word per
+  value tagged in its low `TAG_BITS` bits.
+
+Dicts whose keys appear in the shape table (the entities of `cpp_ir`, which always have the same keys)
+are encoded as their values only. Grouping the containers lets the loader build a whole group at once, with
+C-level `map` calls and comprehensions, rather than run a Python loop over each value.
+"""
+import mmap
+import struct
+import sys
+from array import array
+from itertools import accumulate, repeat
+
+MAGIC = b'CMGB'
+VERSION = 2
+
+HEADER = struct.Struct('<4sHHIIIIIII')
+
+TAG_BITS = 3
+TAG_MASK = (1 << TAG_BITS) - 1
+MAX_PAYLOAD = (1 << (32 - TAG_BITS)) - 1
+
+TAG_CONSTANT = 0  # Payload 0, 1 or 2 for None, False, True
+TAG_INT = 1       # Non-negative integer up to MAX_PAYLOAD
+TAG_INT64 = 2     # Payload is the index of a signed 64-bit integer in the wide values
+TAG_STRING = 3    # Payload is the string index
+TAG_CONTAINER = 4 # Payload is the container index, in encoding order
+TAG_FLOAT = 6     # Payload is the index of a 64-bit float in the wide values
+
+CONSTANTS = (None, False, True)
+
+# Group kind of lists; dicts use one plus their shape index.
+LIST_KIND = 0
+
+class BinaryFormatError(ValueError):
+    """Raised when a file is not in the binary format, or in an unsupported version of it."""
+
+def _words(view):
+    """View little-endian bytes as 32-bit words, without copying them on little-endian hosts."""
+    if sys.byteorder == 'little':
+        return view.cast('I')
+    words = array('I')
+    words.frombytes(view)
+    words.byteswap()
+    return words
+
+def _word_bytes(words):
+    """Convert an array of native 32-bit words to the little-endian layout of the file."""
+    if sys.byteorder != 'little':
+        words = array('I', words)
+        words.byteswap()
+    return words.tobytes()
+
+def _wide_values(typecode, view):
+    values = array(typecode)
+    values.frombytes(view)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+class _Encoder:
+    def __init__(self):
+        self.strings = {}
+        self.shapes = {}
+        self.int64s = array('q')
+        self.floats = array('d')
+        # Containers by height, shifted left by 32 bits, and kind; the height is 0 for containers of primitive values
+        # only. Each group holds the tokens of its containers, their item counts and the tokens of their values.
+        self.groups = {}
+        self.container_count = 0
+        # Highest height among the containers encoded in the current container so far
+        self.child_height = -1
+
+    def string_index(self, string):
+        index = self.strings.get(string)
+        if index is None:
+            index = self.strings[string] = len(self.strings)
+        return index
+
+    def token(self, tag, payload):
+        if payload > MAX_PAYLOAD:
+            raise BinaryFormatError(f"Value too large for the binary format: {payload}")
+        return (payload << TAG_BITS) | tag
+
+    def container(self, kind, items):
+        """Encode the items of a container and get its token, the container index being its encoding order."""
+        sibling_height = self.child_height
+        self.child_height = -1
+        tokens = list(map(self.encode, items))
+        height = self.child_height + 1
+        self.child_height = height if height > sibling_height else sibling_height
+
+        group_key = (height << 32) | kind
+        group = self.groups.get(group_key)
+        if group is None:
+            group = self.groups[group_key] = ([], [], [])
+        token = self.token(TAG_CONTAINER, self.container_count)
+        self.container_count += 1
+        group[0].append(token)
+        group[1].append(len(tokens))
+        group[2].extend(tokens)
+        return token
+
+    def encode(self, value):
+        """Encode a value and get its token."""
+        if isinstance(value, str):
+            return (self.string_index(value) << TAG_BITS) | TAG_STRING
+        elif value is None or value is False or value is True:
+            return (CONSTANTS.index(value) << TAG_BITS) | TAG_CONSTANT
+        elif isinstance(value, int):
+            if 0 <= value <= MAX_PAYLOAD:
+                return (value << TAG_BITS) | TAG_INT
+            if not -2 ** 63 <= value < 2 ** 63:
+                raise BinaryFormatError(f"Value too large for the binary format: {value}")
+            self.int64s.append(value)
+            return self.token(TAG_INT64, len(self.int64s) - 1)
+        elif isinstance(value, float):
+            self.floats.append(value)
+            return self.token(TAG_FLOAT, len(self.floats) - 1)
+        elif isinstance(value, (list, tuple)):
+            return self.container(LIST_KIND, value)
+        elif isinstance(value, dict):
+            keys = tuple(value)
+            shape_index = self.shapes.get(keys)
+            if shape_index is None:
+                if not all(isinstance(key, str) for key in keys):
+                    raise BinaryFormatError("Only dicts with string keys can be encoded")
+                shape_index = self.shapes[keys] = len(self.shapes)
+                for key in keys:
+                    self.string_index(key)
+            return self.container(shape_index + 1, value.values())
+        else:
+            raise BinaryFormatError(f"Cannot encode a value of type {type(value).__name__}")
+
+    def to_bytes(self, root):
+        string_table = bytearray()
+        for string in self.strings:
+            encoded = string.encode('utf-8')
+            string_table += struct.pack('<I', len(encoded)) + encoded
+        string_table += b'\0' * (-len(string_table) % 4)
+
+        shape_table = array('I')
+        for keys in self.shapes:
+            shape_table.append(len(keys))
+            shape_table.extend(self.strings[key] for key in keys)
+
+        # Lower groups first, so that every container is decoded before those holding it.
+        order = sorted(self.groups)
+        body = array('I')
+        for group_key in order:
+            kind = group_key & 0xFFFFFFFF
+            container_tokens, counts, values = self.groups[group_key]
+            body.extend((kind, len(counts)))
+            body.extend(container_tokens)
+            if kind == LIST_KIND:
+                body.extend(counts)
+            body.extend(values)
+
+        int64s = self.int64s
+        floats = self.floats
+        if sys.byteorder != 'little':
+            int64s = array('q', int64s)
+            int64s.byteswap()
+            floats = array('d', floats)
+            floats.byteswap()
+
+        header = HEADER.pack(MAGIC, VERSION, 0, len(string_table), len(shape_table), len(self.int64s),
+                             len(self.floats), len(order), len(body), root)
+        header += b'\0' * (-len(header) % 4)
+        return b''.join([header, bytes(string_table), _word_bytes(shape_table), int64s.tobytes(), floats.tobytes(),
+                         _word_bytes(body)])
+
+def dumps(data):
+    """Encode parsed data to bytes."""
+    encoder = _Encoder()
+    root = encoder.encode(data)
+    return encoder.to_bytes(root)
+
+def loads(buffer):
+    """Decode parsed data from bytes, or any buffer such as a memory map."""
+    with memoryview(buffer) as view:
+        if len(view) < HEADER.size:
+            raise BinaryFormatError("Truncated binary file")
+        (magic, version, _, strings_size, shape_words, int64_count, float_count, group_count, body_words,
+         root) = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise BinaryFormatError("Not a binary parsed data file")
+        if version != VERSION:
+            raise BinaryFormatError(f"Unsupported binary format version {version} (expected {VERSION})")
+
+        offset = HEADER.size + (-HEADER.size % 4)
+        shapes_offset = offset + strings_size
+        int64s_offset = shapes_offset + shape_words * 4
+        floats_offset = int64s_offset + int64_count * 8
+        body_offset = floats_offset + float_count * 8
+        if len(view) < body_offset + body_words * 4:
+            raise BinaryFormatError("Truncated binary file")
+
+        # The padding of the string table is shorter than a length word.
+        strings = []
+        while offset + 4 <= shapes_offset:
+            length, = struct.unpack_from('<I', view, offset)
+            offset += 4
+            strings.append(sys.intern(str(view[offset:offset + length], 'utf-8')))
+            offset += length
+
+        shapes = _shapes(_words(view[shapes_offset:int64s_offset]), strings)
+        values = _Values(_wide_values('q', view[int64s_offset:floats_offset]),
+                         _wide_values('d', view[floats_offset:body_offset]))
+        for index, string in enumerate(strings):
+            values[(index << TAG_BITS) | TAG_STRING] = string
+        for index, constant in enumerate(CONSTANTS):
+            values[(index << TAG_BITS) | TAG_CONSTANT] = constant
+        try:
+            _decode(_words(view[body_offset:body_offset + body_words * 4]), group_count, shapes, values)
+            return values[root]
+        except (IndexError, ValueError) as error:
+            message = f"Corrupted binary file: {error}"
+    # Raised once the views of the buffer are gone, as a memory map cannot be closed while they are referenced
+    raise BinaryFormatError(message)
+
+def _shapes(shape_table, strings):
+    """Read the key lists of the shape table."""
+    shapes = []
+    position = 0
+    while position < len(shape_table):
+        count = shape_table[position]
+        shapes.append(tuple(strings[index] for index in shape_table[position + 1:position + 1 + count]))
+        position += 1 + count
+    return shapes
+
+class _Values(dict):
+    """The value of each token, filled with the containers group by group as they are decoded."""
+    def __init__(self, int64s, floats):
+        super().__init__()
+        self.int64s = int64s
+        self.floats = floats
+
+    def __missing__(self, token):
+        tag = token & TAG_MASK
+        payload = token >> TAG_BITS
+        if tag == TAG_INT:
+            value = payload
+        elif tag == TAG_INT64:
+            value = self.int64s[payload]
+        elif tag == TAG_FLOAT:
+            value = self.floats[payload]
+        else:
+            raise BinaryFormatError(f"Unsupported token {token:#x}")
+        self[token] = value
+        return value
+
+# Functions building the dicts of a shape from rows of values, by key count.
+DICT_BUILDERS = {}
+
+def _dict_builder(width):
+    """Get a function building dicts of `width` keys from rows of values, given the keys as arguments.
+
+    A dict display is about twice as fast as `dict(zip(keys, row))`, so the function is generated for each key count;
+    its source only depends on the count, never on the contents of a file."""
+    builder = DICT_BUILDERS.get(width)
+    if builder is None:
+        keys = ''.join(f', key{index}' for index in range(width))
+        items = ', '.join(f'key{index}: value{index}' for index in range(width))
+        values = ''.join(f'value{index}, ' for index in range(width))
+        namespace = {}
+        exec(f"def build(rows{keys}):\n    return [{{{items}}} for ({values}) in rows]", namespace)
+        builder = DICT_BUILDERS[width] = namespace['build']
+    return builder
+
+def _decode(words, group_count, shapes, values):
+    """Decode the body groups into `values`, building each group at once rather than value by value."""
+    value_of = values.__getitem__
+    position = 0
+    for _ in range(group_count):
+        kind = words[position]
+        count = words[position + 1]
+        position += 2
+        container_tokens = words[position:position + count]
+        position += count
+        if kind == LIST_KIND:
+            ends = list(accumulate(words[position:position + count], initial=0))
+            position += count
+            size = ends[-1]
+            items = list(map(value_of, words[position:position + size]))
+            if len(items) != size:
+                raise BinaryFormatError("Truncated binary group")
+            containers = list(map(items.__getitem__, map(slice, ends, ends[1:])))
+        else:
+            keys = shapes[kind - 1]
+            width = len(keys)
+            size = count * width
+            items = map(value_of, words[position:position + size])
+            rows = zip(*[items] * width) if width else repeat((), count)
+            containers = _dict_builder(width)(rows, *keys)
+            if len(containers) != count:
+                raise BinaryFormatError("Truncated binary group")
+        position += size
+        values.update(zip(container_tokens, containers))
+
+def dump(data, file_path):
+    """Write parsed data to a binary file."""
+    with open(file_path, 'wb') as file:
+        file.write(dumps(data))
+
+def load(file_path):
+    """Load parsed data from a binary file through a read-only memory map."""
+    with open(file_path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return loads(b'')  # Empty files cannot be mapped
+        try:
+            return loads(mapped)
+        finally:
+            mapped.close()
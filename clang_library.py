@@ -0,0 +1,95 @@
+import glob
+import os
+import re
+import sys
+
+# Environment variable giving the libclang shared library, or the directory holding it.
+LIBRARY_ENVIRONMENT_VARIABLE = 'LIBCLANG_PATH'
+
+# Where libclang is usually installed, when neither the command line nor the environment tell.
+# Patterns matching several versions pick the newest one. Versioned names must start with a digit, so
+# that `libclang-cpp.so`, the C++ API library, is not taken for the C API `clang.cindex` calls.
+SEARCH_PATTERNS = {
+    'linux': [
+        '/usr/lib/llvm-*/lib/libclang.so*',
+        '/usr/lib/llvm-*/lib/libclang-[0-9]*.so*',
+        '/usr/lib/x86_64-linux-gnu/libclang-[0-9]*.so*',
+        '/usr/lib/aarch64-linux-gnu/libclang-[0-9]*.so*',
+        '/usr/lib64/llvm*/lib*/libclang.so*',
+        '/usr/lib64/libclang.so*',
+        '/usr/lib/libclang.so*',
+        '/usr/local/lib/libclang.so*',
+    ],
+    'darwin': [
+        '/opt/homebrew/opt/llvm/lib/libclang.dylib',
+        '/usr/local/opt/llvm/lib/libclang.dylib',
+        '/Library/Developer/CommandLineTools/usr/lib/libclang.dylib',
+        '/Applications/Xcode.app/Contents/Developer/Toolchains/XcodeDefault.xctoolchain/usr/lib/libclang.dylib',
+    ],
+    'win32': [
+        'C:/LLVM/bin/libclang.dll',
+        'C:/Program Files/LLVM/bin/libclang.dll',
+    ],
+}
+
+# Library given by `configure`, taking precedence over the environment.
+_configured_library = None
+# `clang.cindex`, once imported and pointed at its library by `cindex`.
+_cindex = None
+
+def configure(library):
+    """Use `library`, a libclang shared library or the directory holding it, instead of looking for one.
+
+    Must be called before the first parse; None restores the automatic lookup."""
+    global _configured_library
+    if _cindex is not None and _cindex.Config.loaded:
+        raise RuntimeError("libclang is already loaded, it must be configured before the first parse")
+    _configured_library = library
+
+def version_key(path):
+    """Sort key ordering library paths by the version numbers they contain."""
+    return [int(number) for number in re.findall(r'\d+', path)]
+
+def search_library(platform=sys.platform):
+    """Look for libclang in the usual installation directories of a platform, returning None if not found."""
+    for pattern in SEARCH_PATTERNS.get('linux' if platform.startswith('linux') else platform, []):
+        matches = sorted(glob.glob(pattern), key=version_key, reverse=True)
+        if matches:
+            return matches[0]
+    return None
+
+def find_library(default_library=None):
+    """Find the libclang library to load: the configured one, then the one given by the environment,
+    then `default_library` (the library `clang.cindex` would load itself) if it exists, and failing
+    those one found in the usual installation directories. Returns None if none is found."""
+    for library in (_configured_library, os.environ.get(LIBRARY_ENVIRONMENT_VARIABLE)):
+        if library:
+            return library
+    if default_library and os.path.isfile(default_library):
+        return default_library
+    return search_library()
+
+def cindex():
+    """Import `clang.cindex`, pointing it at the libclang library found by `find_library`.
+
+    The library itself is only loaded by `clang.cindex` when first used."""
+    global _cindex
+    if _cindex is None:
+        import clang.cindex
+        if not clang.cindex.Config.loaded:
+            library = find_library(clang.cindex.conf.get_filename())
+            if library and os.path.isdir(library):
+                clang.cindex.Config.set_library_path(library)
+            elif library:
+                clang.cindex.Config.set_library_file(library)
+        _cindex = clang.cindex
+    return _cindex
+
+def create_index():
+    """Create a clang index, loading libclang, with a hint on how to find it when it cannot be loaded."""
+    clang_cindex = cindex()
+    try:
+        return clang_cindex.Index.create()
+    except clang_cindex.LibclangError as error:
+        raise clang_cindex.LibclangError(
+            f"{error} Set {LIBRARY_ENVIRONMENT_VARIABLE} or pass --libclang with the path of libclang.") from None
@@ -0,0 +1,172 @@
+import re
+from cpp_ir import Method, Parameter, entity_from_dict, split_template_arguments, strip_template_arguments, template_argument
+
+class ClassHierarchy:
+    """Index of classes by qualified name, resolving the members and methods each class inherits.
+
+    The inherited set of a class is computed once from the resolved sets of its bases and memoized,
+    so deep hierarchies are complete and wide ones do not copy the same lists for every class.
+    Multiple and diamond inheritance are handled by keeping a single entry per method signature (or
+    member name), the most derived declaration winning. Classes of several headers can be added to a
+    single hierarchy, so bases declared in other files of a run are resolved too.
+
+    Bases are looked up as C++ does, from the scope of the derived class outwards, so same-named classes
+    of different namespaces are told apart. A base spelled as an instantiation, e.g. `Repo<int>`, is the
+    class template `Repo`, whose inherited methods get the template arguments in place of its parameters.
+    """
+
+    def __init__(self, classes=()):
+        self.classes = {}
+        # Qualified names of the classes by unqualified name
+        self.qualified_names = {}
+        self.resolved = {}
+        # Base names that could not be found; adding one of them invalidates the memoized resolutions.
+        self.missing_bases = set()
+        for class_data in classes:
+            self.add(class_data)
+
+    def add(self, class_data):
+        """Add a `cpp_ir.Class` to the hierarchy, keeping its own declarations aside."""
+        qualified_name = class_data.qualified_name
+        # A class may hide a same-named base found in an outer scope, or stand for a base not found so far.
+        if class_data.name in self.qualified_names or class_data.name in self.missing_bases:
+            self.resolved.clear()
+            self.missing_bases.clear()
+        self.classes[qualified_name] = (class_data.base_classes, class_data.members, class_data.methods,
+                                        class_data.static_members, class_data.template_parameters)
+        self.qualified_names.setdefault(class_data.name, set()).add(qualified_name)
+
+    def add_entities(self, entities):
+        """Add every class found in `cpp_ir` entities, including those nested in namespaces."""
+        for class_data in iter_classes(entities):
+            self.add(class_data)
+
+    def __find(self, base_name, derived_name):
+        """Find a base class by its spelling, looking it up in the scopes enclosing the derived class from the
+        innermost one, then falling back to the only class bearing its unqualified name, if there is one.
+        Template arguments are ignored, as templates are indexed by their plain name."""
+        base_name = strip_template_arguments(base_name.lstrip(':'))
+        scope = derived_name
+        while '::' in scope:
+            scope = scope.rsplit('::', 1)[0]
+            candidate = f"{scope}::{base_name}"
+            if candidate in self.classes and candidate != derived_name:
+                return candidate
+        if base_name in self.classes and base_name != derived_name:
+            return base_name
+        unqualified_name = base_name.rsplit('::', 1)[-1]
+        candidates = self.qualified_names.get(unqualified_name, set()) - {derived_name}
+        if len(candidates) == 1:
+            return next(iter(candidates))
+        self.missing_bases.update((base_name, unqualified_name))
+        return None
+
+    def resolve(self, name):
+        """Return the members, methods and static members of a class given by its qualified name, including
+        inherited ones."""
+        if name in self.resolved:
+            return self.resolved[name]
+
+        # Mark the class as being resolved, so a malformed cyclic hierarchy terminates.
+        self.resolved[name] = None
+        base_classes, members, methods, static_members, _ = self.classes[name]
+        inherited = ([], [], [])
+        for base_spelling in base_classes:
+            base_name = self.__find(base_spelling, name)
+            if base_name is None:
+                continue
+            base_resolution = self.resolve(base_name)
+            if base_resolution is None:
+                continue
+            base_members, base_methods, base_static_members = base_resolution
+            substitutions = template_substitutions(self.classes[base_name][4], split_template_arguments(base_spelling)[1])
+            if substitutions:
+                base_methods = substitute_methods(base_methods, substitutions)
+            inherited[0].extend(base_members)
+            inherited[1].extend(base_methods)
+            inherited[2].extend(base_static_members)
+
+        resolution = (
+            merge_declarations(inherited[0], members, member_key),
+            merge_declarations(inherited[1], methods, method_key),
+            merge_declarations(inherited[2], static_members, member_key),
+        )
+        self.resolved[name] = resolution
+        return resolution
+
+    def consolidate(self, entities):
+        """Replace the members and methods of every class in `entities` by their consolidated sets."""
+        classes = list(iter_classes(entities))
+        resolutions = [self.resolve(class_data.qualified_name) if class_data.qualified_name in self.classes else None
+                       for class_data in classes]
+        for class_data, resolution in zip(classes, resolutions):
+            if resolution is not None:
+                members, methods, static_members = resolution
+                class_data.members = list(members)
+                class_data.methods = list(methods)
+                class_data.static_members = list(static_members)
+
+def consolidate_all(parsed_files):
+    """Consolidate class inheritance across the parsed data of several headers.
+
+    A single class hierarchy spans all the headers, so a class inherits from bases declared in any of them."""
+    entities_per_file = [[entity_from_dict(item) for item in parsed_data] for parsed_data in parsed_files]
+    hierarchy = ClassHierarchy()
+    for entities in entities_per_file:
+        hierarchy.add_entities(entities)
+    for entities in entities_per_file:
+        hierarchy.consolidate(entities)
+    return [[entity.to_dict() for entity in entities] for entities in entities_per_file]
+
+def iter_classes(entities):
+    """Yield the classes of `cpp_ir` entities, including those nested in namespaces."""
+    stack = [iter(entities)]
+    while stack:
+        entity = next(stack[-1], None)
+        if entity is None:
+            stack.pop()
+        elif entity.kind == 'Class':
+            yield entity
+        elif entity.kind == 'Namespace':
+            stack.append(iter(entity.children))
+
+def template_substitutions(template_parameters, arguments):
+    """Map the names of the template parameters of a class template to the arguments of an instantiation.
+
+    Parameter packs are left as they are: methods expanding them are not mocked."""
+    return {template_argument(parameter): argument for parameter, argument in zip(template_parameters, arguments)
+            if '...' not in parameter}
+
+def substitute_methods(methods, substitutions):
+    """Copy methods, replacing the template parameters named in `substitutions` in their return and parameter types."""
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, substitutions)) + r')\b')
+
+    def substitute(type_spelling):
+        return pattern.sub(lambda match: substitutions[match.group()], type_spelling)
+
+    return [Method(method.name, substitute(method.return_type),
+                   [Parameter(parameter.name, substitute(parameter.type)) for parameter in method.parameters],
+                   method.is_virtual, method.is_static, method.is_const, method.access, method.is_pure_virtual,
+                   method.is_noexcept, method.ref_qualifier, method.is_final)
+            for method in methods]
+
+def member_key(member):
+    return member.name
+
+def method_key(method):
+    return (method.name, tuple(parameter.type for parameter in method.parameters), method.is_const, method.ref_qualifier)
+
+def merge_declarations(inherited, declared, key):
+    """Merge inherited and declared entries, keeping one entry per key.
+
+    Inherited entries come first, in base order; an entry redeclared by the class (an override) is
+    dropped from the inherited ones and kept at its own position."""
+    declared_keys = {key(declaration) for declaration in declared}
+    merged = []
+    seen = set()
+    for declaration in inherited:
+        declaration_key = key(declaration)
+        if declaration_key not in declared_keys and declaration_key not in seen:
+            seen.add(declaration_key)
+            merged.append(declaration)
+    return merged + list(declared)
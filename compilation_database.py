@@ -0,0 +1,88 @@
+import os
+import clang_library
+
+# Options whose value is a path, relative to the directory the compile command runs in.
+PATH_OPTIONS = ('-I', '-isystem', '-iquote', '-idirafter', '-include', '-imacros')
+
+# Options only relevant to producing object files or dependency files, dropped along with their value.
+DROPPED_OPTIONS_WITH_VALUE = ('-o', '-MF', '-MT', '-MQ')
+DROPPED_OPTIONS = ('-c', '-M', '-MM', '-MD', '-MMD', '-MP', '-MG')
+
+def header_arguments(command):
+    """Convert a compile command into clang arguments suitable to parse a header of the same target."""
+    arguments = list(command.arguments)[1:]  # Drop the compiler executable
+    directory = command.directory
+    source_file = os.path.normcase(os.path.abspath(os.path.join(directory, command.filename)))
+    header_args = ['-x', 'c++']
+    position = 0
+    while position < len(arguments):
+        arg = arguments[position]
+        position += 1
+        if arg == '--':
+            break  # Only input files follow
+        elif arg in DROPPED_OPTIONS_WITH_VALUE:
+            position += 1
+        elif arg in DROPPED_OPTIONS or arg.startswith(('-MF', '-MT', '-MQ', '--driver-mode=')):
+            continue
+        elif arg in PATH_OPTIONS and position < len(arguments):
+            header_args += [arg, os.path.join(directory, arguments[position])]
+            position += 1
+        elif arg.startswith('-I') and len(arg) > 2:
+            header_args.append('-I' + os.path.join(directory, arg[2:]))
+        elif arg == '-x':
+            position += 1  # The language is forced to C++ above
+        elif not arg.startswith('-') and os.path.normcase(os.path.abspath(os.path.join(directory, arg))) == source_file:
+            continue
+        else:
+            header_args.append(arg)
+    return header_args
+
+class CompileFlags:
+    """Look up the clang arguments of headers in a `compile_commands.json`.
+
+    Headers rarely have an entry of their own: libclang infers one from the most similar source file,
+    and failing that the flags of the nearest source compiled from the header's directory or one of its
+    parents are used. Headers of a same directory share their flags, so the lookup is memoized per directory.
+    """
+
+    def __init__(self, build_directory, fallback_args):
+        self.database = clang_library.cindex().CompilationDatabase.fromDirectory(build_directory)
+        self.fallback_args = list(fallback_args)
+        self.directory_arguments = {}
+        self.source_directories = None
+
+    def __index_source_directories(self):
+        """Map each directory holding a compiled source file to the arguments of its first source."""
+        source_directories = {}
+        for command in self.database.getAllCompileCommands() or []:
+            source_file = os.path.join(command.directory, command.filename)
+            directory = os.path.normcase(os.path.dirname(os.path.abspath(source_file)))
+            if directory not in source_directories:
+                source_directories[directory] = header_arguments(command)
+        return source_directories
+
+    def __nearest_source_arguments(self, directory):
+        """Get the arguments of the nearest compiled source in a directory or its parents."""
+        if self.source_directories is None:
+            self.source_directories = self.__index_source_directories()
+        while True:
+            if directory in self.source_directories:
+                return self.source_directories[directory]
+            parent_directory = os.path.dirname(directory)
+            if parent_directory == directory:
+                return self.fallback_args
+            directory = parent_directory
+
+    def arguments_for(self, file_path):
+        """Return the clang arguments to parse a header file."""
+        file_path = os.path.abspath(file_path)
+        directory = os.path.normcase(os.path.dirname(file_path))
+        arguments = self.directory_arguments.get(directory)
+        if arguments is None:
+            commands = list(self.database.getCompileCommands(file_path) or [])
+            if commands:
+                arguments = header_arguments(commands[0])
+            else:
+                arguments = self.__nearest_source_arguments(directory)
+            self.directory_arguments[directory] = arguments
+        return arguments
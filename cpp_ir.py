@@ -0,0 +1,309 @@
+import re
+from sys import intern
+
+class Parameter:
+    """A function or method parameter."""
+    __slots__ = ('name', 'type')
+
+    def __init__(self, name, type):
+        self.name = intern(name)
+        self.type = intern(type)
+
+    def to_dict(self):
+        return {'name': self.name, 'type': self.type}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['type'])
+
+class Function:
+    """A free function declaration."""
+    __slots__ = ('name', 'return_type', 'parameters')
+    kind = 'Function'
+
+    def __init__(self, name, return_type, parameters):
+        self.name = intern(name)
+        self.return_type = intern(return_type)
+        self.parameters = parameters
+
+    def to_dict(self):
+        return {
+            'type': self.kind,
+            'name': self.name,
+            'return_type': self.return_type,
+            'parameters': [parameter.to_dict() for parameter in self.parameters]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['return_type'], [Parameter.from_dict(parameter) for parameter in data['parameters']])
+
+class Method:
+    """A method declared in a class."""
+    __slots__ = ('name', 'return_type', 'parameters', 'is_virtual', 'is_static', 'is_const', 'access',
+                 'is_pure_virtual', 'is_noexcept', 'ref_qualifier', 'is_final')
+    kind = 'Method'
+
+    def __init__(self, name, return_type, parameters, is_virtual, is_static, is_const, access,
+                 is_pure_virtual=False, is_noexcept=False, ref_qualifier='', is_final=False):
+        self.name = intern(name)
+        self.return_type = intern(return_type)
+        self.parameters = parameters
+        self.is_virtual = is_virtual
+        self.is_static = is_static
+        self.is_const = is_const
+        self.access = access
+        self.is_pure_virtual = is_pure_virtual
+        self.is_noexcept = is_noexcept
+        # '&' or '&&' for a ref-qualified method, '' otherwise
+        self.ref_qualifier = ref_qualifier
+        self.is_final = is_final
+
+    def to_dict(self):
+        return {
+            'type': self.kind,
+            'name': self.name,
+            'return_type': self.return_type,
+            'parameters': [parameter.to_dict() for parameter in self.parameters],
+            'is_virtual': self.is_virtual,
+            'is_static': self.is_static,
+            'is_const': self.is_const,
+            'access': self.access,
+            'is_pure_virtual': self.is_pure_virtual,
+            'is_noexcept': self.is_noexcept,
+            'ref_qualifier': self.ref_qualifier,
+            'is_final': self.is_final
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['return_type'], [Parameter.from_dict(parameter) for parameter in data['parameters']],
+                   data['is_virtual'], data['is_static'], data['is_const'], data.get('access', 'public'),
+                   data.get('is_pure_virtual', False), data.get('is_noexcept', False), data.get('ref_qualifier', ''),
+                   data.get('is_final', False))
+
+class Member:
+    """A data member of a class, static or not."""
+    __slots__ = ('name', 'is_static', 'access')
+    kind = 'Member'
+
+    def __init__(self, name, is_static, access):
+        self.name = intern(name)
+        self.is_static = is_static
+        self.access = access
+
+    def to_dict(self):
+        return {'type': self.kind, 'name': self.name, 'is_static': self.is_static, 'access': self.access}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['is_static'], data.get('access', 'public'))
+
+class Class:
+    """A class or struct definition with its bases, data members and methods.
+
+    A class template lists its template parameters as declared, e.g. `typename T` or `int N`. The qualified
+    name goes through the enclosing namespaces and classes, e.g. `net::Socket::Options`; a class nested in a
+    class template is named through the template's own arguments, e.g. `net::Queue<T>::Listener`, and lists
+    the parameters of its enclosing templates in `scope_template_parameters`."""
+    __slots__ = ('name', 'base_classes', 'members', 'methods', 'static_members', 'usr', 'template_parameters', 'is_struct',
+                 'qualified_name', 'scope_template_parameters', 'is_final')
+    kind = 'Class'
+
+    def __init__(self, name, base_classes=None, members=None, methods=None, static_members=None, usr='',
+                 template_parameters=None, is_struct=False, qualified_name='', scope_template_parameters=None,
+                 is_final=False):
+        self.name = intern(name)
+        self.base_classes = base_classes if base_classes is not None else []
+        self.members = members if members is not None else []
+        self.methods = methods if methods is not None else []
+        self.static_members = static_members if static_members is not None else []
+        # Unified Symbol Resolution of the class, identifying it across translation units
+        self.usr = usr
+        self.template_parameters = template_parameters if template_parameters is not None else []
+        self.is_struct = is_struct
+        self.qualified_name = intern(qualified_name) if qualified_name else self.name
+        self.scope_template_parameters = scope_template_parameters if scope_template_parameters is not None else []
+        # A `final` class cannot be derived from, so it cannot be mocked
+        self.is_final = is_final
+
+    def to_dict(self):
+        return {
+            'type': self.kind,
+            'name': self.name,
+            'base_classes': list(self.base_classes),
+            'members': [member.to_dict() for member in self.members],
+            'methods': [method.to_dict() for method in self.methods],
+            'static_members': [member.to_dict() for member in self.static_members],
+            'usr': self.usr,
+            'template_parameters': list(self.template_parameters),
+            'is_struct': self.is_struct,
+            'qualified_name': self.qualified_name,
+            'scope_template_parameters': list(self.scope_template_parameters),
+            'is_final': self.is_final
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], [intern(base) for base in data['base_classes']],
+                   [Member.from_dict(member) for member in data['members']],
+                   [Method.from_dict(method) for method in data['methods']],
+                   [Member.from_dict(member) for member in data['static_members']], data.get('usr', ''),
+                   data.get('template_parameters', []), data.get('is_struct', False), data.get('qualified_name', ''),
+                   data.get('scope_template_parameters', []), data.get('is_final', False))
+
+class Namespace:
+    """A namespace and the declarations it contains."""
+    __slots__ = ('name', 'children')
+    kind = 'Namespace'
+
+    def __init__(self, name, children=None):
+        self.name = intern(name)
+        self.children = children if children is not None else []
+
+    def to_dict(self):
+        return {'type': self.kind, 'name': self.name, 'children': [child.to_dict() for child in self.children]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], [entity_from_dict(child) for child in data['children']])
+
+class Enum:
+    """An enumeration, scoped (`enum class`) or not."""
+    __slots__ = ('name', 'values', 'is_scoped')
+
+    def __init__(self, name, values, is_scoped=False):
+        self.name = intern(name)
+        self.values = [intern(value) for value in values]
+        self.is_scoped = is_scoped
+
+    @property
+    def kind(self):
+        return 'EnumClass' if self.is_scoped else 'Enum'
+
+    def to_dict(self):
+        return {'type': self.kind, 'name': self.name, 'values': [{'name': value} for value in self.values]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], [value['name'] for value in data['values']], data['type'] == 'EnumClass')
+
+class Typedef:
+    """A typedef declaration."""
+    __slots__ = ('name', 'underlying_type')
+    kind = 'Typedef'
+
+    def __init__(self, name, underlying_type):
+        self.name = intern(name)
+        self.underlying_type = intern(underlying_type)
+
+    def to_dict(self):
+        return {'type': self.kind, 'name': self.name, 'underlying_type': self.underlying_type}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['underlying_type'])
+
+class Template:
+    """A function template, with the names of its template parameters and its explicit specializations,
+    e.g. `add<int>`."""
+    __slots__ = ('name', 'parameters', 'specializations')
+    kind = 'Template'
+
+    def __init__(self, name, parameters, specializations=None):
+        self.name = intern(name)
+        self.parameters = [intern(parameter) for parameter in parameters]
+        self.specializations = specializations if specializations is not None else []
+
+    def to_dict(self):
+        return {'type': self.kind, 'name': self.name, 'parameters': list(self.parameters),
+                'specializations': list(self.specializations)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['parameters'], data.get('specializations', []))
+
+class Using:
+    """A type alias declared with `using`."""
+    __slots__ = ('name', 'underlying_type')
+    kind = 'Using'
+
+    def __init__(self, name, underlying_type):
+        self.name = intern(name)
+        self.underlying_type = intern(underlying_type)
+
+    def to_dict(self):
+        return {'type': self.kind, 'name': self.name, 'underlying_type': self.underlying_type}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['underlying_type'])
+
+class Macro:
+    """A macro definition."""
+    __slots__ = ('name', 'value')
+    kind = 'Macro'
+
+    def __init__(self, name, value):
+        self.name = intern(name)
+        self.value = value
+
+    def to_dict(self):
+        return {'type': self.kind, 'name': self.name, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['value'])
+
+ENTITY_TYPES = {
+    'Function': Function,
+    'Class': Class,
+    'Namespace': Namespace,
+    'Enum': Enum,
+    'EnumClass': Enum,
+    'Typedef': Typedef,
+    'Template': Template,
+    'Using': Using,
+    'Macro': Macro,
+}
+
+def template_argument(template_parameter):
+    """Get the argument passing a template parameter on, e.g. `T` for `typename T` and `Ts...` for `typename... Ts`."""
+    name = template_parameter.rsplit(None, 1)[-1]
+    return f"{name}..." if '...' in template_parameter else name
+
+# Innermost template argument list of a name, removed until none is left by `strip_template_arguments`.
+TEMPLATE_ARGUMENTS = re.compile(r'<[^<>]*>')
+
+def strip_template_arguments(name):
+    """Remove the template arguments of a name, e.g. `net::Queue::Listener` for `net::Queue<T, 4>::Listener`."""
+    name, count = TEMPLATE_ARGUMENTS.subn('', name)
+    while count:
+        name, count = TEMPLATE_ARGUMENTS.subn('', name)
+    return name
+
+def split_template_arguments(name):
+    """Split the template arguments off the end of a name, e.g. `Repo` and `['int', 'Key<int, 4>']` for
+    `Repo<int, Key<int, 4>>`. A name not ending with template arguments gets an empty list."""
+    if not name.endswith('>'):
+        return name, []
+    arguments = []
+    depth = 0
+    end = len(name) - 1
+    for index in range(len(name) - 1, -1, -1):
+        character = name[index]
+        if character in '>)':
+            depth += 1
+        elif character in '<(':
+            depth -= 1
+            if depth == 0:
+                arguments.append(name[index + 1:end].strip())
+                return name[:index].rstrip(), [argument for argument in reversed(arguments) if argument]
+        elif character == ',' and depth == 1:
+            arguments.append(name[index + 1:end].strip())
+            end = index
+    return name, []
+
+def entity_from_dict(data):
+    """Build the entity of a parsed data dict, as produced by `to_dict`."""
+    return ENTITY_TYPES[data['type']].from_dict(data)
@@ -1,184 +1,532 @@
-import clang.cindex
-from clang.cindex import Index, CursorKind, TokenKind
+import json
+import os
+import clang_library
+from class_hierarchy import ClassHierarchy
+from compilation_database import CompileFlags
+from cpp_ir import (Class, Enum, Function, Macro, Member, Method, Namespace, Parameter, Template, Typedef, Using,
+                    template_argument)
+from diagnostics import ERROR, SEVERITIES, check_diagnostics, diagnostic_to_dict
+from manifest import file_digest, file_mtime
+import profiling
 
-clang.cindex.Config.set_library_file('C:/LLVM/bin/libclang.dll')
+# Bump whenever the structure of the parsed data changes, so cached results are invalidated.
+PARSER_VERSION = '8'
+
+DEFAULT_ARGUMENTS = ['-x', 'c++', '-std=c++14']
+
+# Flags of `TranslationUnit` (CXTranslationUnit_Flags in libclang's C API, whose values never change),
+# spelled out so that no libclang is needed until a header is actually parsed.
+PARSE_INCOMPLETE = 0x02
+PARSE_PRECOMPILED_PREAMBLE = 0x04
+PARSE_SKIP_FUNCTION_BODIES = 0x40
+
+# Function bodies are never inspected, and a header is not a complete translation unit.
+DEFAULT_PARSE_OPTIONS = PARSE_SKIP_FUNCTION_BODIES | PARSE_INCOMPLETE
+
+# Names of `clang.cindex` used by the parser, imported by `load_clang` when the first header is parsed.
+AccessSpecifier = CursorKind = TemplateArgumentKind = TokenKind = None
+
+# Kinds of the template parameters of a class or function template, set by `load_clang`.
+TEMPLATE_PARAMETERS = ()
+
+# Kinds of the cursors declaring a class, set by `load_clang`.
+CLASS_KINDS = ()
+
+# Exception specifications of methods that may not throw. `noexcept(expression)` cannot be evaluated
+# here; it is counted as non-throwing, since an override may be stricter than the method it overrides.
+NOEXCEPT_SPECIFICATIONS = ()
+
+REF_QUALIFIERS = {}
+
+def load_clang():
+    """Import `clang.cindex`, looking libclang up as described in `clang_library.find_library`."""
+    global AccessSpecifier, CursorKind, TemplateArgumentKind, TokenKind, NOEXCEPT_SPECIFICATIONS, REF_QUALIFIERS
+    global CLASS_KINDS, TEMPLATE_PARAMETERS
+    if CursorKind is not None:
+        return
+    cindex = clang_library.cindex()
+    NOEXCEPT_SPECIFICATIONS = (
+        cindex.ExceptionSpecificationKind.BASIC_NOEXCEPT,
+        cindex.ExceptionSpecificationKind.COMPUTED_NOEXCEPT,
+        cindex.ExceptionSpecificationKind.DYNAMIC_NONE,
+    )
+    REF_QUALIFIERS = {
+        cindex.RefQualifierKind.LVALUE: '&',
+        cindex.RefQualifierKind.RVALUE: '&&',
+    }
+    CLASS_KINDS = (cindex.CursorKind.CLASS_DECL, cindex.CursorKind.STRUCT_DECL, cindex.CursorKind.CLASS_TEMPLATE)
+    TEMPLATE_PARAMETERS = (
+        cindex.CursorKind.TEMPLATE_TYPE_PARAMETER,
+        cindex.CursorKind.TEMPLATE_NON_TYPE_PARAMETER,
+        cindex.CursorKind.TEMPLATE_TEMPLATE_PARAMETER,
+    )
+    AccessSpecifier = cindex.AccessSpecifier
+    TemplateArgumentKind = cindex.TemplateArgumentKind
+    TokenKind = cindex.TokenKind
+    CursorKind = cindex.CursorKind
+
+def templated_kind(node):
+    """Get the kind of declaration a class template declares, `STRUCT_DECL` or `CLASS_DECL`.
+
+    The bindings register this libclang function without wrapping it in a `Cursor` method."""
+    return CursorKind.from_id(clang_library.cindex().conf.lib.clang_getTemplateCursorKind(node))
+
+def precompiled_header_arguments(args):
+    """Turn the arguments used to parse headers into the ones used to precompile a header."""
+    header_args = list(args)
+    for position, arg in enumerate(header_args[:-1]):
+        if arg == '-x' and header_args[position + 1] == 'c++':
+            header_args[position + 1] = 'c++-header'
+    return header_args
+
+def precompiled_header_is_current(header_path, output_path, args):
+    """Check that a PCH was built from a header with `args`, and is newer than the header and every file it included.
+
+    What it was built from is recorded next to it by `CppParser.build_precompiled_header`."""
+    try:
+        with open(output_path + '.json', 'r', encoding='utf-8') as file:
+            record = json.load(file)
+    except (OSError, ValueError):
+        return False
+    if record.get('header') != os.path.abspath(header_path) or record.get('arguments') != args:
+        return False
+    output_mtime = file_mtime(output_path)
+    for file_path in [header_path] + record.get('files', []):
+        mtime = file_mtime(file_path)
+        if output_mtime is None or mtime is None or mtime > output_mtime:
+            return False
+    return True
+
+def class_prefix(class_data):
+    """Get the prefix qualifying the names declared in a class, e.g. `Queue<T>::` in a class template.
+
+    The template parameters of a class are only known once its children preceding a nested class were visited."""
+    if not class_data.template_parameters:
+        return f"{class_data.qualified_name}::"
+    arguments = ', '.join(template_argument(parameter) for parameter in class_data.template_parameters)
+    return f"{class_data.qualified_name}<{arguments}>::"
+
+def read_source(contents):
+    """Get the content of an in-memory header as a string or bytes, from a string, a bytes-like object
+    or a file-like object."""
+    if hasattr(contents, 'read'):
+        contents = contents.read()
+    if isinstance(contents, (bytearray, memoryview)):
+        contents = bytes(contents)
+    return contents
+
+def normalize_path(path):
+    """Normalize a path so that locations reported by clang can be compared with user supplied paths."""
+    return os.path.normcase(os.path.abspath(path))
 
 class CppParser:
-    def __init__(self):
-        self.index = self.__initialize_index()
+    def __init__(self, args=None, allowed_directories=None, parse_options=DEFAULT_PARSE_OPTIONS,
+                 precompiled_header=None, reuse_translation_units=False, compilation_database=None,
+                 diagnostic_severity='warning', error_budget=None, fail_fast=False):
+        """Create a parser.
+
+        Only declarations located in the parsed header itself, or in a file below one of
+        `allowed_directories`, are processed; everything pulled in from other includes is skipped.
+
+        `precompiled_header` is a PCH file built by `build_precompiled_header`, implicitly included in
+        every header so its content is not parsed again. With `reuse_translation_units`, parsing a header
+        a second time reparses its translation unit, reusing its precompiled preamble.
+
+        `compilation_database` is the directory of a `compile_commands.json`; each header is then parsed
+        with the flags of its directory, `args` only being used for headers the database knows nothing about.
+
+        The diagnostics of each parsed header at or above `diagnostic_severity` are kept in `diagnostics`.
+        A header with more errors than `error_budget`, or with `fail_fast` a fatal error, raises a
+        `diagnostics.DiagnosticsError` before any of its declarations are processed. clang is told to
+        give up as soon as either limit is reached: `fail_fast` turns every error into a fatal one, and
+        with `error_budget` clang stops once the budget is exceeded, sparing the cost of error recovery.
+
+        libclang is only loaded by the first parse, so a parser answering from the parse cache never loads it."""
+        self.__index = None
+        self.args = list(args) if args is not None else list(DEFAULT_ARGUMENTS)
+        self.compile_flags = CompileFlags(compilation_database, self.args) if compilation_database else None
+        self.allowed_directories = [os.path.join(normalize_path(directory), '') for directory in allowed_directories or []]
+        self.parse_options = parse_options
+        self.precompiled_header = precompiled_header
+        self.precompiled_header_hash = file_digest(precompiled_header) if precompiled_header else ''
+        self.reuse_translation_units = reuse_translation_units
+        self.diagnostic_severity = SEVERITIES[diagnostic_severity]
+        self.error_budget = error_budget
+        self.fail_fast = fail_fast
+        # Diagnostics of the last parse of each header, as dicts (see `diagnostics.diagnostic_to_dict`)
+        self.diagnostics = {}
+        # Diagnostics the limits were checked against, errors included whatever `diagnostic_severity`
+        self.checked_diagnostics = {}
+        if reuse_translation_units:
+            self.parse_options |= PARSE_PRECOMPILED_PREAMBLE
+        self.translation_units = {}
+        # Classes of the last parsed headers, by USR so same-named classes of different namespaces are kept apart
         self.processed_classes = {}
+        self.included_files = []
+        # Processors of the declarations that do not open a scope; namespaces and classes are handled by `__iter_visit`.
+        # Keyed by cursor kinds, they are set along with the index.
+        self.node_processors = None
+
+    def __initialize_index(self):
+        """Initialize the Clang index, loading libclang."""
+        load_clang()
+        index = clang_library.create_index()
         self.node_processors = {
             CursorKind.FUNCTION_DECL: self.__process_function,
-            CursorKind.CLASS_DECL: self.__process_class,
-            CursorKind.NAMESPACE: self.__process_namespace,
             CursorKind.ENUM_DECL: self.__process_enum,
             CursorKind.TYPEDEF_DECL: self.__process_typedef,
+            CursorKind.FUNCTION_TEMPLATE: self.__process_function_template,
+            CursorKind.TYPE_ALIAS_DECL: self.__process_type_alias,
+            CursorKind.TYPE_ALIAS_TEMPLATE_DECL: self.__process_alias_template,
             CursorKind.MACRO_DEFINITION: self.__process_macro
         }
+        return index
 
-    def __initialize_index(self):
-        """Initialize the Clang index."""
-        return Index.create()
+    @property
+    def index(self):
+        """The Clang index, initialized on first use."""
+        if self.__index is None:
+            self.__index = self.__initialize_index()
+        return self.__index
+
+    def __process_parameters(self, node):
+        """Process the parameters of a function or method declaration."""
+        return [Parameter(arg.spelling, arg.type.spelling) for arg in node.get_arguments()]
 
     def __process_function(self, node):
         """Process a function declaration."""
-        return {
-            'type': 'Function',
-            'name': node.spelling,
-            'return_type': node.result_type.spelling,
-            'parameters': [
-                {'name': arg.spelling, 'type': arg.type.spelling}
-                for arg in node.get_arguments()
-            ]
-        }
+        return Function(node.spelling, node.result_type.spelling, self.__process_parameters(node))
 
-    def __process_class(self, node):
-        """Process a class declaration."""
-        class_data = {
-            'type': 'Class',
-            'name': node.spelling,
-            'base_classes': [],
-            'members': [],
-            'methods': [],
-            'static_members': []
-        }
+    def __new_class(self, node, prefix):
+        """Create the data of a class, struct or class template, filled in while its children are visited.
 
-        for base in node.get_children():
-            if base.kind == CursorKind.CXX_BASE_SPECIFIER:
-                class_data['base_classes'].append(base.type.spelling)
+        `prefix` qualifies the names declared in the enclosing scope, e.g. `net::Socket::`."""
+        kind = templated_kind(node) if node.kind == CursorKind.CLASS_TEMPLATE else node.kind
+        return Class(node.spelling, usr=node.get_usr(), is_struct=kind == CursorKind.STRUCT_DECL,
+                     qualified_name=prefix + node.spelling)
 
-        for child in node.get_children():
-            if child.kind == CursorKind.CXX_METHOD:
-                method_data = self.__process_method(child)
-                class_data['methods'].append(method_data)
-            elif child.kind == CursorKind.FIELD_DECL:
-                member_data = self.__process_member(child)
-                if member_data['is_static']:
-                    class_data['static_members'].append(member_data)
-                else:
-                    class_data['members'].append(member_data)
-
-        self.processed_classes[node.spelling] = class_data
-        return class_data
+    def __is_processed_class(self, node):
+        """Check that a class cursor defines a named class, struct or class template that is not an explicit
+        specialization: forward declarations have nothing to mock, and specializations are mocked through
+        their template."""
+        if not node.is_definition() or node.is_anonymous():
+            return False
+        return node.kind == CursorKind.CLASS_TEMPLATE or node.get_num_template_arguments() <= 0
+
+    def __process_class_child(self, class_data, child):
+        """Add a base specifier, method or member of a class to its data."""
+        kind = child.kind
+        if kind == CursorKind.CXX_METHOD:
+            class_data.methods.append(self.__process_method(child))
+        elif kind == CursorKind.FIELD_DECL:
+            class_data.members.append(self.__process_member(child))
+        elif kind == CursorKind.VAR_DECL:
+            # Static data members are variables declared in the class scope
+            class_data.static_members.append(self.__process_member(child))
+        elif kind == CursorKind.CXX_BASE_SPECIFIER:
+            class_data.base_classes.append(child.type.spelling)
+        elif kind in TEMPLATE_PARAMETERS:
+            class_data.template_parameters.append(self.__process_template_parameter(child))
+        elif kind == CursorKind.CXX_FINAL_ATTR:
+            class_data.is_final = True
 
     def __process_method(self, node):
         """Process a method declaration."""
-        return {
-            'type': 'Method',
-            'name': node.spelling,
-            'return_type': node.result_type.spelling,
-            'parameters': [
-                {'name': arg.spelling, 'type': arg.type.spelling}
-                for arg in node.get_arguments()
-            ],
-            'is_virtual': 'virtual' in node.type.spelling,
-            'is_static': node.is_static_method(),
-            'is_const': node.is_const_method(),
-            'access': self.__get_access_specifier(node)
-        }
+        return Method(
+            node.spelling,
+            node.result_type.spelling,
+            self.__process_parameters(node),
+            is_virtual=node.is_virtual_method(),
+            is_static=node.is_static_method(),
+            is_const=node.is_const_method(),
+            access=self.__get_access_specifier(node),
+            is_pure_virtual=node.is_pure_virtual_method(),
+            is_noexcept=node.exception_specification_kind in NOEXCEPT_SPECIFICATIONS,
+            ref_qualifier=REF_QUALIFIERS.get(node.type.get_ref_qualifier(), ''),
+            is_final=node.is_virtual_method() and any(child.kind == CursorKind.CXX_FINAL_ATTR
+                                                      for child in node.get_children())
+        )
 
     def __get_access_specifier(self, node):
         """Get the access specifier of a node."""
         access_specifier = node.access_specifier
-        if access_specifier == clang.cindex.AccessSpecifier.PUBLIC:
+        if access_specifier == AccessSpecifier.PUBLIC:
             return 'public'
-        elif access_specifier == clang.cindex.AccessSpecifier.PROTECTED:
+        elif access_specifier == AccessSpecifier.PROTECTED:
             return 'protected'
-        elif access_specifier == clang.cindex.AccessSpecifier.PRIVATE:
+        elif access_specifier == AccessSpecifier.PRIVATE:
             return 'private'
         else:
             return 'public'  # default to public if unknown
 
     def __process_member(self, node):
         """Process a member declaration."""
-        return {
-            'type': 'Member',
-            'name': node.spelling,
-            'is_static': node.is_static_field(),
-            'access': self.__get_access_specifier(node)
-        }
-
-    def __process_namespace(self, node):
-        """Process a namespace declaration."""
-        namespace_data = {
-            'type': 'Namespace',
-            'name': node.spelling,
-            'children': []
-        }
-        for child in node.get_children():
-            child_data = self.__process_node(child)
-            if child_data:
-                namespace_data['children'].append(child_data)
-        return namespace_data
+        return Member(node.spelling, is_static=node.kind == CursorKind.VAR_DECL, access=self.__get_access_specifier(node))
 
     def __process_enum(self, node):
         """Process an enum declaration."""
-        enum_data = {
-            'type': 'Enum',
-            'name': node.spelling,
-            'values': []
-        }
+        values = [enum_value.spelling for enum_value in node.get_children()
+                  if enum_value.kind == CursorKind.ENUM_CONSTANT_DECL]
+        return Enum(node.spelling, values, is_scoped=node.is_scoped_enum())
 
-        if node.is_scoped_enum():
-            enum_data['type'] = 'EnumClass'
+    def __process_typedef(self, node):
+        """Process a typedef declaration."""
+        return Typedef(node.spelling, node.underlying_typedef_type.spelling)
 
-        for enum_value in node.get_children():
-            if enum_value.kind == CursorKind.ENUM_CONSTANT_DECL:
-                enum_data['values'].append({
-                    'name': enum_value.spelling
-                })
+    def __process_template_parameter(self, node):
+        """Get the declaration of a template parameter without its default argument, e.g. `typename T`.
 
-        return enum_data
+        Only the tokens of the parameter are read: nothing is instantiated."""
+        if node.kind == CursorKind.TEMPLATE_NON_TYPE_PARAMETER:
+            return f"{node.type.spelling} {node.spelling}"
+        tokens = []
+        depth = 0
+        for token in node.get_tokens():
+            spelling = token.spelling
+            if spelling == '=' and depth == 0:
+                break
+            depth += (spelling == '<') - (spelling == '>')
+            tokens.append(spelling)
+        return ' '.join(tokens).replace('< ', '<').replace(' >', '>')
 
-    def __process_typedef(self, node):
-        """Process a typedef declaration."""
-        return {
-            'type': 'Typedef',
-            'name': node.spelling,
-            'underlying_type': node.underlying_typedef_type.spelling
-        }
+    def __process_function_template(self, node):
+        """Process a function template, keeping the names of its template parameters."""
+        return Template(node.spelling, [child.spelling for child in node.get_children() if child.kind in TEMPLATE_PARAMETERS])
+
+    def __process_specialization(self, container, node):
+        """Record an explicit specialization of a function template declared in the same scope.
+
+        Returns False if the template is not found there, e.g. when it is declared in another header."""
+        arguments = []
+        for position in range(node.get_num_template_arguments()):
+            if node.get_template_argument_kind(position) == TemplateArgumentKind.INTEGRAL:
+                arguments.append(str(node.get_template_argument_value(position)))
+            else:
+                arguments.append(node.get_template_argument_type(position).spelling)
+        for entity in reversed(container):
+            if entity.kind == 'Template' and entity.name == node.spelling:
+                entity.specializations.append(f"{node.spelling}<{', '.join(arguments)}>")
+                return True
+        return False
+
+    def __process_type_alias(self, node):
+        """Process a `using` type alias."""
+        return Using(node.spelling, node.underlying_typedef_type.spelling)
+
+    def __process_alias_template(self, node):
+        """Process a `using` alias template, as the alias it declares."""
+        for child in node.get_children():
+            if child.kind == CursorKind.TYPE_ALIAS_DECL:
+                return self.__process_type_alias(child)
+        return None
 
     def __process_macro(self, node):
         """Process a macro definition."""
-        return {
-            'type': 'Macro',
-            'name': node.spelling,
-            'value': ''.join([t.spelling for t in node.get_tokens() if t.kind == TokenKind.LITERAL])
-        }
+        return Macro(node.spelling, ''.join([t.spelling for t in node.get_tokens() if t.kind == TokenKind.LITERAL]))
 
-    def __process_node(self, node):
-        """Process a generic AST node."""
-        processor = self.node_processors.get(node.kind)
-        if processor:
-            if node.kind == CursorKind.CLASS_DECL:
-                return processor(node)
-            return processor(node)
-        return None
+    def __iter_visit(self, nodes):
+        """Process declarations and everything nested in them in a single pass, yielding each declaration
+        of `nodes` once it is complete.
+
+        Namespaces and classes are scopes: the traversal keeps an explicit stack of the scopes being
+        visited rather than recursing, so deeply nested namespaces cannot hit Python's recursion limit,
+        and the children of each cursor are listed exactly once. Children of a class (base specifiers,
+        methods, members) are dispatched as they come; other declarations go through `node_processors`.
+
+        Each scope carries the prefix qualifying the names declared in it. Public classes nested in a
+        class are collected with the classes of the enclosing namespace, right after their outer class,
+        so that they are mocked like any other class. Those of a class template are named through its
+        arguments, e.g. `Queue<T>::Listener`, and mocked as templates; class templates nested in a class
+        template are skipped, and counted as `skipped nested templates` by the profiler."""
+        completed = []
+        visited = 0
+        # Each entry holds the remaining children of a scope, the scope's data, the list collecting them
+        # (None for a class) and the prefix of the names declared in the scope.
+        stack = [(iter(nodes), None, completed, '')]
+        while stack:
+            if len(stack) == 1 and completed:
+                # Back at the top level: every declaration collected so far is complete.
+                yield from completed
+                completed.clear()
+
+            children, scope_data, container, prefix = stack[-1]
+            node = next(children, None)
+            if node is None:
+                stack.pop()
+                continue
+
+            visited += 1
+            kind = node.kind
+            if container is None:
+                if kind not in CLASS_KINDS:
+                    self.__process_class_child(scope_data, node)
+                elif node.access_specifier == AccessSpecifier.PUBLIC and self.__is_processed_class(node):
+                    scope_template_parameters = scope_data.scope_template_parameters + scope_data.template_parameters
+                    if scope_template_parameters and node.kind == CursorKind.CLASS_TEMPLATE:
+                        profiling.count('skipped nested templates')
+                        continue
+                    # The nested class goes to the namespace of its outermost class.
+                    container = next(entry[2] for entry in reversed(stack) if entry[2] is not None)
+                    class_data = self.__open_class(node, class_prefix(scope_data), container, stack)
+                    class_data.scope_template_parameters = scope_template_parameters
+            elif kind == CursorKind.NAMESPACE:
+                namespace_data = Namespace(node.spelling)
+                container.append(namespace_data)
+                # Anonymous namespaces add no component to qualified names.
+                stack.append((node.get_children(), namespace_data, namespace_data.children,
+                               f"{prefix}{node.spelling}::" if node.spelling else prefix))
+            elif kind in CLASS_KINDS:
+                if self.__is_processed_class(node):
+                    self.__open_class(node, prefix, container, stack)
+            elif (kind == CursorKind.FUNCTION_DECL and node.get_num_template_arguments() > 0
+                  and self.__process_specialization(container, node)):
+                continue
+            else:
+                processor = self.node_processors.get(kind)
+                if processor:
+                    node_data = processor(node)
+                    if node_data:
+                        container.append(node_data)
+        profiling.count('cursors', visited)
+
+    def __open_class(self, node, prefix, container, stack):
+        """Add a class to `container` and push it on the traversal stack, so its children are visited next."""
+        class_data = self.__new_class(node, prefix)
+        self.processed_classes[class_data.usr] = class_data
+        container.append(class_data)
+        stack.append((node.get_children(), class_data, None, None))
+        return class_data
 
-    def __consolidate_classes(self, output_data):
-        """Consolidate class inheritance in the output data."""
-        for class_data in output_data:
-            if class_data['type'] == 'Class':
-                for base_class in class_data['base_classes']:
-                    if base_class in self.processed_classes:
-                        base_class_data = self.processed_classes[base_class]
-                        class_data['members'] = base_class_data['members'] + class_data['members']
-                        class_data['methods'] = base_class_data['methods'] + class_data['methods']
-                        class_data['static_members'] = base_class_data['static_members'] + class_data['static_members']
-
-    def parse_header(self, file_paths):
-        """Parse the header files and extract relevant information."""
-        output_data = []
-
-        def process_translation_unit(tu):
-            for node in tu.cursor.get_children():
-                node_data = self.__process_node(node)
-                if node_data:
-                    output_data.append(node_data)
+    def __is_wanted_location(self, node, header_path):
+        """Check whether a top-level cursor is located in the parsed header or an allowed directory."""
+        location_file = node.location.file
+        if location_file is None:
+            return False
+        location_path = normalize_path(location_file.name)
+        if location_path == header_path:
+            return True
+        return any(location_path.startswith(directory) for directory in self.allowed_directories)
+
+    def arguments_for(self, file_path):
+        """Return the clang arguments used to parse a header file."""
+        args = self.compile_flags.arguments_for(file_path) if self.compile_flags else self.args
+        if self.fail_fast:
+            args = args + ['-Wfatal-errors']
+        if self.error_budget is not None:
+            # clang reports a fatal error once it reaches the limit; 0 would mean no limit.
+            args = args + [f'-ferror-limit={self.error_budget + 1}']
+        if self.precompiled_header:
+            return args + ['-include-pch', self.precompiled_header]
+        return args
+
+    def cache_signature(self, file_path):
+        """Return a string identifying every parser setting that affects the result for a header file, its
+        diagnostics included."""
+        return '\0'.join([PARSER_VERSION, str(self.parse_options), self.precompiled_header_hash, str(self.diagnostic_severity)]
+                          + self.allowed_directories + self.arguments_for(file_path))
+
+    def build_precompiled_header(self, header_path, output_path):
+        """Precompile a header gathering the heavy includes shared by the parsed headers.
+
+        The PCH is built with this parser's arguments, so it can be passed as `precompiled_header`
+        to parsers created with the same arguments. A PCH built by a previous run is kept when it is
+        current (see `precompiled_header_is_current`): rebuilding it would change its digest, part of
+        the signature of every cached parse."""
+        args = precompiled_header_arguments(self.args)
+        if precompiled_header_is_current(header_path, output_path, args):
+            return output_path
+        tu = self.index.parse(header_path, args=args, options=PARSE_INCOMPLETE)
+        tu.save(output_path)
+        record = {'header': os.path.abspath(header_path), 'arguments': args,
+                  'files': sorted({inclusion.include.name for inclusion in tu.get_includes()})}
+        with open(output_path + '.json', 'w', encoding='utf-8') as file:
+            json.dump(record, file)
+        return output_path
+
+    def __translation_unit(self, file_path, unsaved_files=()):
+        """Parse a header file, or reparse it if its translation unit is kept from a previous call.
+
+        `unsaved_files` are `(path, content)` pairs of files read from memory instead of the disk."""
+        tu = self.translation_units.get(file_path)
+        if tu is not None:
+            tu.reparse(unsaved_files)
+            return tu
+        tu = self.index.parse(file_path, args=self.arguments_for(file_path), unsaved_files=unsaved_files,
+                              options=self.parse_options)
+        if self.reuse_translation_units:
+            self.translation_units[file_path] = tu
+        return tu
+
+    def __check_diagnostics(self, tu, file_path):
+        """Record the diagnostics of a translation unit (see `record_diagnostics`)."""
+        self.record_diagnostics(file_path, [diagnostic_to_dict(diagnostic) for diagnostic in tu.diagnostics
+                                            if diagnostic.severity >= self.diagnostic_severity or diagnostic.severity >= ERROR])
+
+    def record_diagnostics(self, file_path, diagnostics):
+        """Record the diagnostics of a header, as dicts, raising a `DiagnosticsError` if they are over the limits.
+
+        The diagnostics of a header found in the parse cache are replayed through here, so they are
+        reported and checked as if the header had been parsed."""
+        self.checked_diagnostics[file_path] = diagnostics
+        self.diagnostics[file_path] = [diagnostic for diagnostic in diagnostics
+                                       if SEVERITIES[diagnostic['severity']] >= self.diagnostic_severity]
+        check_diagnostics(file_path, diagnostics, self.error_budget, self.fail_fast)
+
+    def process_translation_unit(self, tu, header_path):
+        """Extract the declarations located in a header (or an allowed directory) from its translation unit."""
+        return list(self.iter_translation_unit(tu, header_path))
+
+    def iter_translation_unit(self, tu, header_path):
+        """Yield the declarations located in a header (or an allowed directory) one at a time."""
+        nodes = (node for node in tu.cursor.get_children() if self.__is_wanted_location(node, header_path))
+        return self.__iter_visit(nodes)
+
+    def parse_header(self, file_paths, consolidate=True):
+        """Parse the header files and extract relevant information, as plain dicts."""
+        entities = self.parse(file_paths, consolidate)
+        with profiling.stage('to dict'):
+            return [entity.to_dict() for entity in entities]
+
+    def parse_unsaved(self, file_paths, unsaved_files, consolidate=True):
+        """Parse header files whose content, or the content of the files they include, is held in memory.
+
+        `unsaved_files` maps paths to their content, as a string, a bytes-like object or a file-like
+        object; those files need not exist on disk, nothing is read from the disk for them. The headers
+        may include each other by these paths."""
+        unsaved_files = [(path, read_source(contents)) for path, contents in unsaved_files.items()]
+        return [entity.to_dict() for entity in self.iter_header(file_paths, consolidate, unsaved_files)]
+
+    def parse(self, file_paths, consolidate=True):
+        """Parse the header files and extract relevant information, as `cpp_ir` entities.
+
+        With `consolidate`, the classes list the members and methods inherited from the classes
+        declared in `file_paths`; otherwise they only list their own, to be consolidated later with
+        a `ClassHierarchy` spanning more headers."""
+        return list(self.iter_header(file_paths, consolidate))
+
+    def iter_header(self, file_paths, consolidate=True, unsaved_files=()):
+        """Parse the header files, yielding the top-level `cpp_ir` entities one at a time.
+
+        Classes are consolidated as they are yielded: C++ requires a base class to be defined before
+        a class derives from it, so its bases have already been seen. `unsaved_files` are `(path,
+        content)` pairs of files read from memory instead of the disk."""
+        # The parser may be reused for several calls, so start each one from a clean class table.
+        self.processed_classes = {}
+        hierarchy = ClassHierarchy()
+        included_files = set()
 
         for file_path in file_paths:
-            tu = self.index.parse(file_path, args=['-x', 'c++', '-std=c++14'])
-            process_translation_unit(tu)
+            with profiling.stage('libclang parse', file_path):
+                tu = self.__translation_unit(file_path, unsaved_files)
+            self.__check_diagnostics(tu, file_path)
+            entities = self.iter_translation_unit(tu, normalize_path(file_path))
+            for entity in profiling.iterate('traverse', entities, file_path):
+                if consolidate:
+                    with profiling.stage('consolidate', file_path):
+                        hierarchy.add_entities([entity])
+                        hierarchy.consolidate([entity])
+                yield entity
+            for inclusion in tu.get_includes():
+                included_files.add(inclusion.include.name)
 
-        self.__consolidate_classes(output_data)
-        return output_data
+        self.included_files = sorted(included_files)
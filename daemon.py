@@ -0,0 +1,281 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import clang_library
+from cppparser import CppParser
+from parse_cache import ParseCache
+from gtest_mock_generator import generate_mock_files, mock_layout_argument
+from main import consolidate_all, generate_mock_texts, parse_cached, save_all, update_manifest
+from symbol_index import update_symbol_index
+from serialization import OUTPUT_FORMATS
+
+DEFAULT_SOCKET = os.path.join('outputs', 'daemon.sock')
+HEADER_EXTENSIONS = ('.h', '.hh', '.hpp', '.hxx')
+
+class MockDaemon:
+    """Regenerate outputs and mocks on request, keeping the parser and parse cache warm between requests.
+
+    The served headers are the headers given explicitly plus those found in the watched directories,
+    all as absolute paths since requests may come from other working directories.
+    The clang index, the translation units of the parsed headers (reparsed when they change) and the
+    parse cache live as long as the daemon, so a request only pays for the headers that changed.
+    """
+
+    def __init__(self, header_files, output_directory, parent_output_file, cache_directory=None, parser_options=None,
+                 output_format='yaml', watch_directories=(), mock_layout=None, mock_umbrella=False):
+        self.header_files = [os.path.abspath(header_file) for header_file in header_files]
+        self.output_directory = output_directory
+        self.parent_output_file = parent_output_file
+        self.output_format = output_format
+        self.mock_layout = mock_layout
+        self.mock_umbrella = mock_umbrella
+        self.watch_directories = [os.path.abspath(watch_directory) for watch_directory in watch_directories]
+        os.makedirs(output_directory, exist_ok=True)
+        self.parser = CppParser(reuse_translation_units=True, **(parser_options or {}))
+        self.cache = ParseCache(cache_directory or os.path.join(output_directory, 'cache'))
+        # Requests and the watcher run on different threads; libclang objects must not be used concurrently.
+        self.lock = threading.Lock()
+
+    def watched_headers(self):
+        """Get the modification time of every header in the watched directories."""
+        headers = {}
+        for watch_directory in self.watch_directories:
+            for directory, _, file_names in os.walk(watch_directory):
+                for file_name in sorted(file_names):
+                    if file_name.endswith(HEADER_EXTENSIONS):
+                        file_path = os.path.join(directory, file_name)
+                        try:
+                            headers[file_path] = os.stat(file_path).st_mtime_ns
+                        except OSError:
+                            pass
+        return headers
+
+    def served_headers(self, watched_headers=None):
+        """Get the headers the daemon generates mocks for, explicit ones first."""
+        if watched_headers is None:
+            watched_headers = self.watched_headers()
+        return self.header_files + sorted(set(watched_headers) - set(self.header_files))
+
+    def regenerate(self, header_files=()):
+        """Regenerate the outputs and mocks of the served headers, first adding `header_files` to them.
+
+        Returns the mock headers that were rewritten."""
+        with self.lock:
+            for header_file in map(os.path.abspath, header_files):
+                if header_file not in self.header_files:
+                    self.header_files.append(header_file)
+            served_headers = self.served_headers()
+            parsed_files = consolidate_all([parse_cached(header_file, self.parser, self.cache)
+                                            for header_file in served_headers])
+            output_files = save_all(served_headers, parsed_files, self.output_directory, self.output_format)
+            update_manifest(served_headers, output_files, self.parent_output_file)
+            update_symbol_index(os.path.join(self.output_directory, 'symbol_index.json'), served_headers, output_files,
+                                parsed_files)
+            return generate_mock_files(self.parent_output_file, self.output_directory, self.mock_layout,
+                                       self.mock_umbrella)
+
+    def mock_texts(self, sources):
+        """Generate the mock headers of headers held in memory with the warm parser, writing nothing.
+
+        `sources` maps the absolute paths of headers to their content. Only the translation units of
+        served headers are kept, so editor buffers of served headers are reparsed quickly while one-off
+        sources do not accumulate."""
+        with self.lock:
+            try:
+                return generate_mock_texts(sources, self.parser)
+            finally:
+                served_headers = set(self.served_headers())
+                for header_file in sources:
+                    if header_file not in served_headers:
+                        self.parser.translation_units.pop(header_file, None)
+
+    def handle_request(self, request):
+        """Handle a decoded request, returning the response to send back."""
+        command = request.get('command')
+        if command == 'ping':
+            return {'status': 'ok'}
+        if command == 'regenerate':
+            start_time = time.perf_counter()
+            mock_files = self.regenerate(request.get('headers', []))
+            return {'status': 'ok', 'mock_files': mock_files, 'elapsed': time.perf_counter() - start_time}
+        if command == 'mock':
+            return {'status': 'ok', 'mocks': self.mock_texts(request.get('sources', {}))}
+        return {'status': 'error', 'message': f"Unknown command: {command}"}
+
+    def watch(self, interval, stop_event):
+        """Regenerate the mocks whenever a watched header is added, modified or removed, until `stop_event` is set.
+
+        The watched directories are polled every `interval` seconds."""
+        snapshot = self.watched_headers()
+        while not stop_event.wait(interval):
+            current = self.watched_headers()
+            if current == snapshot:
+                continue
+            snapshot = current
+            try:
+                self.regenerate()
+            except Exception as error:
+                print(f"Error while regenerating mocks: {error}", file=sys.stderr)
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer requests of a connection, one JSON object per line in each direction."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            request = {}
+            try:
+                request = json.loads(line)
+                if request.get('command') == 'shutdown':
+                    response = {'status': 'ok'}
+                else:
+                    response = self.server.mock_daemon.handle_request(request)
+            except Exception as error:
+                response = {'status': 'error', 'message': str(error)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            if request.get('command') == 'shutdown':
+                # `shutdown` waits for the serving loop, so it cannot run on the loop's own threads.
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+class MockServer(socketserver.ThreadingUnixStreamServer):
+    """Unix socket server answering the requests of a `MockDaemon`.
+
+    A request makes the daemon parse any header and write outputs and mocks, so the socket is created
+    readable and writable by its owner only. A socket left behind by a daemon that is no longer running
+    is replaced; raises OSError if a daemon is still serving on it."""
+
+    daemon_threads = True
+
+    def __init__(self, mock_daemon, socket_path=DEFAULT_SOCKET):
+        if os.path.dirname(socket_path):
+            os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+        if os.path.exists(socket_path):
+            try:
+                send_request({'command': 'ping'}, socket_path, timeout=1)
+            except OSError:
+                os.remove(socket_path)
+            else:
+                raise OSError(f"A daemon is already serving on {socket_path}")
+        # The socket is created with the permissions the umask leaves, so no other user can connect in between.
+        previous_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(previous_umask)
+        self.mock_daemon = mock_daemon
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
+
+def serve(mock_daemon, socket_path=DEFAULT_SOCKET, watch_interval=None, ready=None):
+    """Serve requests until a shutdown request, watching the daemon's directories if `watch_interval` is set.
+
+    `ready` is called with the path of the socket once it accepts connections."""
+    stop_event = threading.Event()
+    with MockServer(mock_daemon, socket_path) as server:
+        if watch_interval is not None:
+            threading.Thread(target=mock_daemon.watch, args=(watch_interval, stop_event), daemon=True).start()
+        if ready is not None:
+            ready(server.server_address)
+        try:
+            server.serve_forever()
+        finally:
+            stop_event.set()
+
+def send_request(request, socket_path=DEFAULT_SOCKET, timeout=None):
+    """Send a request to a running daemon and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with connection.makefile('rb') as response:
+            return json.loads(response.readline())
+
+def parse_arguments(argv):
+    """Parse the command line arguments."""
+    argument_parser = argparse.ArgumentParser(description="Keep a warm parser serving mock regeneration requests.")
+    argument_parser.add_argument('--socket', dest='socket_path', default=DEFAULT_SOCKET,
+                                 help=f"Unix socket of the daemon, only accessible to its owner (default: {DEFAULT_SOCKET}).")
+    commands = argument_parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="Start the daemon.")
+    serve_parser.add_argument('header_files', nargs='*', help="Header files to generate mocks for.")
+    serve_parser.add_argument('--watch', dest='watch_directories', action='append', default=[],
+                              help="Also generate mocks for the headers of this directory, regenerating them when "
+                                   "they change (may be repeated).")
+    serve_parser.add_argument('--interval', type=float, default=0.5,
+                              help="Seconds between two polls of the watched directories (default: 0.5).")
+    serve_parser.add_argument('--cache-dir', dest='cache_directory',
+                              help="Directory of the parse cache (default: outputs/cache).")
+    serve_parser.add_argument('--allow-dir', dest='allowed_directories', action='append', default=[],
+                              help="Also process declarations from headers included from this directory (may be repeated).")
+    serve_parser.add_argument('-p', '--compile-commands', dest='compilation_database',
+                              help="Directory holding a compile_commands.json.")
+    serve_parser.add_argument('--libclang', help="libclang shared library to use, or the directory holding it.")
+    serve_parser.add_argument('--format', dest='output_format', choices=sorted(OUTPUT_FORMATS), default='yaml',
+                              help="Format of the individual output files (default: yaml).")
+    serve_parser.add_argument('--mock-layout', type=mock_layout_argument,
+                              help="Write the mock of each class to its own header, at this path relative to the "
+                                   "output directory, e.g. '{header}/Mock{name}.h'.")
+    serve_parser.add_argument('--mock-umbrella', action='store_true',
+                              help="With --mock-layout, also write <header>_mock.h including the class mocks.")
+
+    regenerate_parser = commands.add_parser('regenerate', help="Ask a running daemon to regenerate the mocks.")
+    regenerate_parser.add_argument('header_files', nargs='*', help="Header files to add to the served headers.")
+
+    mock_parser = commands.add_parser('mock', help="Print the mock header of a header whose content is read from "
+                                                   "the standard input, e.g. an unsaved editor buffer.")
+    mock_parser.add_argument('header_file', help="Path of the header the content belongs to.")
+
+    commands.add_parser('ping', help="Check that a daemon is running.")
+    commands.add_parser('shutdown', help="Stop a running daemon.")
+    return argument_parser.parse_args(argv)
+
+if __name__ == '__main__':
+    arguments = parse_arguments(sys.argv[1:])
+
+    if arguments.command == 'serve':
+        if arguments.libclang:
+            clang_library.configure(arguments.libclang)
+        output_directory = 'outputs'  # Directory to save individual output files and mocks
+        parent_output_file = os.path.join(output_directory, 'parent_output.yaml')
+        parser_options = {
+            'allowed_directories': arguments.allowed_directories,
+            'compilation_database': arguments.compilation_database,
+        }
+        mock_daemon = MockDaemon(arguments.header_files, output_directory, parent_output_file, arguments.cache_directory,
+                                 parser_options, arguments.output_format, arguments.watch_directories,
+                                 arguments.mock_layout, arguments.mock_umbrella)
+        if mock_daemon.served_headers():
+            mock_daemon.regenerate()
+        serve(mock_daemon, arguments.socket_path, arguments.interval if arguments.watch_directories else None,
+              lambda socket_path: print(f"Serving on {socket_path}", flush=True))
+    else:
+        request = {'command': arguments.command}
+        if arguments.command == 'regenerate':
+            request['headers'] = [os.path.abspath(header_file) for header_file in arguments.header_files]
+        elif arguments.command == 'mock':
+            request['sources'] = {os.path.abspath(arguments.header_file): sys.stdin.read()}
+        try:
+            response = send_request(request, arguments.socket_path)
+        except OSError as error:
+            print(f"Cannot reach the daemon: {error}")
+            sys.exit(1)
+        if arguments.command == 'mock' and response.get('status') == 'ok':
+            sys.stdout.write(next(iter(response['mocks'].values())))
+        else:
+            print(json.dumps(response))
+        if response.get('status') != 'ok':
+            sys.exit(1)
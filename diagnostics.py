@@ -0,0 +1,92 @@
+import json
+
+# Severities of libclang diagnostics (`clang.cindex.Diagnostic`), from the least to the most severe.
+SEVERITIES = {'ignored': 0, 'note': 1, 'warning': 2, 'error': 3, 'fatal': 4}
+SEVERITY_NAMES = {level: name for name, level in SEVERITIES.items()}
+ERROR = SEVERITIES['error']
+FATAL = SEVERITIES['fatal']
+
+# Option of the "too many errors emitted" fatal error clang stops with, which reports no error of the header.
+ERROR_LIMIT_OPTION = '-ferror-limit='
+
+class DiagnosticsError(RuntimeError):
+    """Raised when the diagnostics of a header exceed what the parser lets through.
+
+    `diagnostics` are the errors of the header, as returned by `diagnostic_to_dict`."""
+
+    def __init__(self, file_path, reason, diagnostics):
+        # Passing every argument to `RuntimeError` keeps the exception picklable across worker processes.
+        super().__init__(file_path, reason, diagnostics)
+        self.file_path = file_path
+        self.reason = reason
+        self.diagnostics = diagnostics
+
+    def __str__(self):
+        return '\n'.join([f"{self.file_path}: {self.reason}"]
+                         + ['    ' + format_diagnostic(diagnostic) for diagnostic in self.diagnostics])
+
+def diagnostic_to_dict(diagnostic):
+    """Convert a libclang diagnostic to a plain dict."""
+    location = diagnostic.location
+    return {
+        'severity': SEVERITY_NAMES.get(diagnostic.severity, str(diagnostic.severity)),
+        'file': location.file.name if location.file else '',
+        'line': location.line,
+        'column': location.column,
+        'message': diagnostic.spelling,
+        'option': diagnostic.option,
+    }
+
+def format_diagnostic(diagnostic):
+    """Format a diagnostic the way compilers do."""
+    location = f"{diagnostic['file']}:{diagnostic['line']}:{diagnostic['column']}: " if diagnostic['file'] else ''
+    option = f" [{diagnostic['option']}]" if diagnostic['option'] else ''
+    return f"{location}{diagnostic['severity']}: {diagnostic['message']}{option}"
+
+def check_diagnostics(file_path, diagnostics, error_budget=None, fail_fast=False):
+    """Raise a `DiagnosticsError` if a header has a fatal error with `fail_fast`, or more errors than
+    `error_budget`. Fatal errors count as errors, except the one clang emits when it reaches its error limit."""
+    errors = [diagnostic for diagnostic in diagnostics if SEVERITIES.get(diagnostic['severity'], 0) >= ERROR]
+    counted_errors = [diagnostic for diagnostic in errors if diagnostic['option'] != ERROR_LIMIT_OPTION]
+    if fail_fast and any(diagnostic['severity'] == 'fatal' for diagnostic in counted_errors):
+        raise DiagnosticsError(file_path, "fatal error", errors)
+    if error_budget is not None and len(counted_errors) > error_budget:
+        raise DiagnosticsError(file_path, f"{len(counted_errors)} errors, over the budget of {error_budget}", errors)
+
+def summarize_diagnostics(diagnostics_per_file):
+    """Count the diagnostics of each header by severity, returning a summary that can be saved as JSON."""
+    totals = {}
+    files = {}
+    for file_path, diagnostics in diagnostics_per_file.items():
+        counts = {}
+        for diagnostic in diagnostics:
+            counts[diagnostic['severity']] = counts.get(diagnostic['severity'], 0) + 1
+            totals[diagnostic['severity']] = totals.get(diagnostic['severity'], 0) + 1
+        files[file_path] = {'counts': counts, 'diagnostics': diagnostics}
+    return {'counts': totals, 'files': files}
+
+def format_summary(summary, max_diagnostics=5):
+    """Format a diagnostics summary, listing the first diagnostics of each header that has any."""
+    lines = []
+    for file_path, file_summary in summary['files'].items():
+        if not file_summary['diagnostics']:
+            continue
+        lines.append(f"{file_path}: {format_counts(file_summary['counts'])}")
+        for diagnostic in file_summary['diagnostics'][:max_diagnostics]:
+            lines.append('    ' + format_diagnostic(diagnostic))
+        if len(file_summary['diagnostics']) > max_diagnostics:
+            lines.append(f"    ... and {len(file_summary['diagnostics']) - max_diagnostics} more")
+    if lines:
+        lines.append(f"Total: {format_counts(summary['counts'])}")
+    return '\n'.join(lines)
+
+def format_counts(counts):
+    """Format diagnostic counts from the most severe, e.g. '2 errors, 1 warning'."""
+    return ', '.join(f"{counts[name]} {name}{'s' if counts[name] > 1 else ''}"
+                     for name in sorted(counts, key=lambda name: -SEVERITIES.get(name, 0)))
+
+def write_summary(summary, summary_file):
+    """Save a diagnostics summary as JSON."""
+    with open(summary_file, 'w') as file:
+        json.dump(summary, file, indent=2)
+        file.write('\n')
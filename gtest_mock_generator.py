@@ -1,43 +1,466 @@
+import argparse
+import os
+import re
+import string
+from cpp_ir import strip_template_arguments, template_argument
+from manifest import data_digest, file_mtime, load_manifest, save_manifest, write_if_changed
+from serialization import load_parsed_data
+import profiling
+
+# Bump whenever the mocks rendered from the same parsed data change, so existing mocks are regenerated.
+GENERATOR_VERSION = '4'
+
+# Default templates of a mock header; see `MockTemplates` for the fields each one is rendered with.
+DEFAULT_TEMPLATES = {
+    'header': "#ifndef {guard}\n#define {guard}\n\n#include <gmock/gmock.h>\n\n",
+    'footer': "\n\n#endif // {guard}\n",
+    'class_separator': "\n\n",
+    'namespace_open': "namespace {name} {{\n\n",
+    'namespace_close': "\n\n}}  // namespace {name}",
+    'class_template': "template <{parameters}>\n",
+    'class_open': "class {mock_name} : public {name} {{\npublic:\n",
+    'class_close': "\n}};",
+    'method_separator': "\n",
+    'method': "    MOCK_METHOD({return_type}, {name}, ({parameters}), ({qualifiers}));",
+    'parameter_separator': ", ",
+    'parameter': "{type} {name}",
+}
+
+class MockTemplates:
+    """Templates of a mock header.
+
+    Templates use the `str.format` syntax, with the fields listed in `FIELDS`. They are checked once when
+    created, so a template using an unknown field is reported when the generator is created rather than
+    in the middle of a run."""
+
+    FIELDS = {
+        'header': ('guard',),
+        'footer': ('guard',),
+        'class_separator': (),
+        'namespace_open': ('name',),
+        'namespace_close': ('name',),
+        'class_template': ('parameters',),
+        'class_open': ('name', 'mock_name'),
+        'class_close': ('name', 'mock_name'),
+        'method_separator': (),
+        'method': ('return_type', 'name', 'parameters', 'qualifiers'),
+        'parameter_separator': (),
+        'parameter': ('type', 'name'),
+    }
+
+    def __init__(self, **templates):
+        unknown_templates = set(templates) - set(self.FIELDS)
+        if unknown_templates:
+            raise ValueError(f"Unknown mock templates: {', '.join(sorted(unknown_templates))}")
+        self.sources = {**DEFAULT_TEMPLATES, **templates}
+        for template_name, source in self.sources.items():
+            self.__check(template_name, source)
+
+        self.class_separator = self.sources['class_separator'].format()
+        self.method_separator = self.sources['method_separator'].format()
+        self.parameter_separator = self.sources['parameter_separator'].format()
+        # Methods make up most of a mock header, so the default templates are rendered by a plain function.
+        self.__default_methods = all(self.sources[template_name] == DEFAULT_TEMPLATES[template_name]
+                                     for template_name in ('method_separator', 'method', 'parameter_separator', 'parameter'))
+
+    def __check(self, template_name, source):
+        """Raise a ValueError if a template uses a field it is not rendered with, or a conversion or format spec."""
+        for _, field, format_spec, conversion in string.Formatter().parse(source):
+            if field is not None and (field not in self.FIELDS[template_name] or format_spec or conversion):
+                raise ValueError(f"Unsupported field in the {template_name} template: {{{field}}}")
+
+    def header(self, guard):
+        return self.sources['header'].format(guard=guard)
+
+    def footer(self, guard):
+        return self.sources['footer'].format(guard=guard)
+
+    def namespace_open(self, name):
+        return self.sources['namespace_open'].format(name=name)
+
+    def namespace_close(self, name):
+        return self.sources['namespace_close'].format(name=name)
+
+    def class_template(self, parameters):
+        return self.sources['class_template'].format(parameters=parameters)
+
+    def class_open(self, name, mock_name):
+        return self.sources['class_open'].format(name=name, mock_name=mock_name)
+
+    def class_close(self, name, mock_name):
+        return self.sources['class_close'].format(name=name, mock_name=mock_name)
+
+    def methods(self, methods):
+        """Render the mocks of a list of methods, joined by the method separator."""
+        if self.__default_methods:
+            return render_default_methods(methods)
+        render_method = self.sources['method'].format_map
+        render_parameter = self.sources['parameter'].format_map
+        rendered = []
+        for method in methods:
+            parameters = self.parameter_separator.join([
+                render_parameter({'type': protect_commas(parameter['type']),
+                                  'name': '' if DECLARATOR_WRAPS_NAME.search(parameter['type']) else parameter['name']})
+                for parameter in method['parameters']])
+            rendered.append(render_method({
+                'return_type': protect_commas(method['return_type']), 'name': method['name'], 'parameters': parameters,
+                'qualifiers': QUALIFIERS[method['is_const'], method.get('is_noexcept', False),
+                                         method.get('ref_qualifier', '')]}))
+        return self.method_separator.join(rendered)
+
 class GMockGenerator:
-    def generate_mock_file(self, parsed_data, output_file):
-        header_guard = self.__generate_header_guard(output_file)
-        mocks = []
-        for item in parsed_data:
-            if item['type'] == 'Class':
-                mocks.append(self.__generate_class_mock(item))
+    def __init__(self, templates=None):
+        self.templates = templates or MockTemplates()
 
+    def generate_mock_file(self, parsed_data, output_file):
+        """Render the mocks of the classes of `parsed_data` and write them to `output_file` at once."""
+        content = self.mock_text(parsed_data, output_file)
         with open(output_file, 'w') as f:
-            f.write(f"#ifndef {header_guard}\n")
-            f.write(f"#define {header_guard}\n\n")
-            f.write('#include <gmock/gmock.h>\n\n')
-            f.write('\n\n'.join(mocks))
-            f.write(f"\n\n#endif // {header_guard}\n")
+            f.write(content)
+
+    def mock_text(self, parsed_data, mock_file):
+        """Render the content `generate_mock_file` writes to `mock_file`, without writing it."""
+        return self.render(parsed_data, self.__generate_header_guard(os.path.basename(mock_file)))
+
+    def generate_mock_files(self, mock_files):
+        """Generate several mock files in one run from `(parsed_data, output_file)` pairs."""
+        for parsed_data, output_file in mock_files:
+            self.generate_mock_file(parsed_data, output_file)
+
+    def render(self, parsed_data, header_guard):
+        """Render the mock header of the classes of `parsed_data`, including those nested in namespaces."""
+        return self.render_classes(iter_namespaced_classes(parsed_data), header_guard)
+
+    def render_classes(self, classes, header_guard):
+        """Render the mock header of `(namespaces, class_data)` pairs, as yielded by `iter_namespaced_classes`.
 
-    def __generate_class_mock(self, class_data):
-        class_name = class_data['name']
-        mock_class_name = f'Mock{class_name}'
-        mock_methods = [self.__generate_method_mock(method) for method in class_data['methods']]
+        Each mock is declared in the namespace of its class, so same-named classes of different namespaces
+        get mocks that do not clash. Every piece of the header is appended to a single list, joined once
+        at the end."""
+        templates = self.templates
+        parts = [templates.header(header_guard)]
+        open_namespaces = ()
+        first_class = True
+        for namespaces, class_data in classes:
+            if namespaces != open_namespaces:
+                common = 0
+                while common < min(len(namespaces), len(open_namespaces)) and namespaces[common] == open_namespaces[common]:
+                    common += 1
+                for name in reversed(open_namespaces[common:]):
+                    parts.append(templates.namespace_close(name))
+                for name in namespaces[common:]:
+                    if not first_class:
+                        parts.append(templates.class_separator)
+                    first_class = True
+                    parts.append(templates.namespace_open(name))
+                open_namespaces = namespaces
+            if not first_class:
+                parts.append(templates.class_separator)
+            first_class = False
+            self.__render_class(class_data, namespaces, parts)
+        for name in reversed(open_namespaces):
+            parts.append(templates.namespace_close(name))
+        parts.append(templates.footer(header_guard))
+        return ''.join(parts)
 
-        mock_class = f"class {mock_class_name} : public {class_name} {{\npublic:\n"
-        mock_class += '\n'.join(mock_methods)
-        mock_class += "\n};"
+    def __render_class(self, class_data, namespaces, parts):
+        templates = self.templates
+        # A nested class is mocked next to its outer class, e.g. `MockWidget_Part` deriving from `Widget::Part`.
+        class_name = relative_name(class_data, namespaces)
+        mock_class_name = f"Mock{flat_name(class_name)}"
+        template_parameters = class_data.get('template_parameters')
+        scope_template_parameters = class_data.get('scope_template_parameters')
+        if template_parameters or scope_template_parameters:
+            # The mock of a class template, or of a class nested in one, is a class template deriving from
+            # the same instantiation, e.g. from `Queue<T>::Listener`.
+            parts.append(templates.class_template(', '.join((scope_template_parameters or []) + (template_parameters or []))))
+        if template_parameters:
+            class_name = f"{class_name}<{', '.join(map(template_argument, template_parameters))}>"
+        parts.append(templates.class_open(class_name, mock_class_name))
+        parts.append(templates.methods([method for method in class_data['methods'] if is_mockable(method)]))
+        parts.append(templates.class_close(class_name, mock_class_name))
 
-        return mock_class
+    def generate_class_mock_files(self, parsed_data, output_directory, layout, header_name, umbrella_file=None):
+        """Write the mock of each class of `parsed_data` to its own header, returning the headers in class order.
 
-    def __generate_method_mock(self, method_data):
-        method_name = method_data['name']
-        return_type = method_data['return_type']
-        params = ', '.join([f"{param['type']} {param['name']}" for param in method_data['parameters']])
-        return f"    MOCK_METHOD({return_type}, {method_name}, ({params}), (override));"
+        `layout` is the path of a class mock header relative to `output_directory`, where `{header}` is
+        replaced by `header_name` and `{name}` by the qualified class name, e.g. `net_Socket` for `net::Socket`
+        (see `flat_name`). A test then only compiles the mocks it includes, and a class change only touches
+        the header of that class: headers whose content is unchanged are not rewritten. With `umbrella_file`, a header including all the class mock headers
+        is written too.
+
+        Raises a ValueError, before writing anything, if `layout` is invalid (see `check_mock_layout`) or
+        gives two classes the same header."""
+        check_mock_layout(layout)
+        classes = list(iter_namespaced_classes(parsed_data))
+        # Distinct classes may have the same flat name, e.g. `a::B_C` and `a::B::C`: refuse to write either
+        # rather than let one mock overwrite the other.
+        class_mock_names = {}
+        for _, item in classes:
+            qualified_name = item.get('qualified_name', item['name'])
+            class_mock_file = os.path.join(output_directory,
+                                           layout.format(header=header_name, name=flat_name(qualified_name)))
+            if class_mock_file in class_mock_names:
+                raise ValueError(f"The mocks of {class_mock_names[class_mock_file]} and {qualified_name} would both "
+                                 f"be written to {class_mock_file}")
+            class_mock_names[class_mock_file] = qualified_name
+
+        class_mock_files = []
+        for (namespaces, item), class_mock_file in zip(classes, class_mock_names):
+            os.makedirs(os.path.dirname(class_mock_file), exist_ok=True)
+            header_guard = self.__generate_header_guard(os.path.relpath(class_mock_file, output_directory))
+            write_if_changed(class_mock_file, self.render_classes([(namespaces, item)], header_guard))
+            class_mock_files.append(class_mock_file)
+
+        if umbrella_file is not None:
+            write_if_changed(umbrella_file, self.render_umbrella(class_mock_files, umbrella_file))
+        return class_mock_files
+
+    def render_umbrella(self, mock_files, umbrella_file):
+        """Render a header including every header of `mock_files`, by their path relative to `umbrella_file`."""
+        templates = self.templates
+        header_guard = self.__generate_header_guard(os.path.basename(umbrella_file))
+        umbrella_directory = os.path.dirname(umbrella_file)
+        includes = [f'#include "{os.path.relpath(mock_file, umbrella_directory).replace(os.sep, "/")}"'
+                    for mock_file in mock_files]
+        return ''.join([templates.header(header_guard), '\n'.join(includes), templates.footer(header_guard)])
 
     def __generate_header_guard(self, file_path):
-        base_name = os.path.basename(file_path).replace('.', '_').upper()
-        return f"MOCK_{base_name}"
+        return 'MOCK_' + re.sub(r'\W', '_', file_path).upper()
+
+def render_default_methods(methods):
+    """Render the mocks of a list of methods with the default method and parameter templates."""
+    rendered = []
+    for method in methods:
+        declarations = []
+        for parameter in method['parameters']:
+            type_spelling = parameter['type']
+            declaration = PARAMETER_DECLARATIONS.get(type_spelling)
+            if declaration is None:
+                declaration = PARAMETER_DECLARATIONS[type_spelling] = parameter_prefix(type_spelling)
+            prefix, named = declaration
+            declarations.append(prefix + parameter['name'] if named else prefix)
+        return_type = method['return_type']
+        if ',' in return_type:
+            return_type = protect_commas(return_type)
+        qualifiers = QUALIFIERS[method['is_const'], method.get('is_noexcept', False), method.get('ref_qualifier', '')]
+        rendered.append(f"    MOCK_METHOD({return_type}, {method['name']}, ({', '.join(declarations)}), ({qualifiers}));")
+    return '\n'.join(rendered)
+
+def iter_namespaced_classes(parsed_data):
+    """Yield the enclosing namespaces, as a tuple of names, and the data of every mocked class of parsed data.
+
+    Classes of anonymous namespaces are skipped: they cannot be named outside of their own header."""
+    stack = [((), iter(parsed_data))]
+    while stack:
+        namespaces, items = stack[-1]
+        item = next(items, None)
+        if item is None:
+            stack.pop()
+        elif item['type'] == 'Class':
+            if is_mocked(item):
+                yield namespaces, item
+        elif item['type'] == 'Namespace' and item['name']:
+            stack.append((namespaces + (item['name'],), iter(item['children'])))
+
+def relative_name(class_data, namespaces):
+    """Get the name of a class relative to its enclosing namespaces, e.g. `Widget::Part` for `ui::Widget::Part`."""
+    qualified_name = class_data.get('qualified_name', class_data['name'])
+    prefix = ''.join(f"{name}::" for name in namespaces)
+    return qualified_name[len(prefix):] if qualified_name.startswith(prefix) else class_data['name']
+
+def flat_name(qualified_name):
+    """Turn a qualified class name into an identifier, e.g. `net_Queue_Listener` for `net::Queue<T>::Listener`."""
+    return strip_template_arguments(qualified_name).replace('::', '_')
+
+# Operators and conversion functions, whose names MOCK_METHOD cannot paste into the names it declares.
+OPERATOR = re.compile(r'operator\b')
+
+# Types whose declarator wraps the parameter name, such as `void (*)(int)`, `int (&)[4]` or `int [4]`.
+DECLARATOR_WRAPS_NAME = re.compile(r'\((?:[\w:<>, ]*::)?[*&^]|\[')
+
+# Parameter declarations by type, as returned by `parameter_prefix`. The same few types make up most
+# parameters, so each type is only examined once.
+PARAMETER_DECLARATIONS = {}
+
+def is_mockable(method_data):
+    """Check that a method can be mocked: static, non-virtual and `final` methods cannot be overridden, and
+    MOCK_METHOD cannot declare operators nor expand parameter packs."""
+    return (method_data['is_virtual'] and not method_data['is_static'] and not method_data.get('is_final', False)
+            and not (method_data['name'].startswith('operator') and OPERATOR.match(method_data['name']))
+            and not expands_pack(method_data))
+
+def expands_pack(method_data):
+    """Check whether a method expands a parameter pack, e.g. `void take(Ts... args)`."""
+    if '...' in method_data['return_type']:
+        return True
+    for parameter in method_data['parameters']:
+        if '...' in parameter['type']:
+            return True
+    return False
+
+def parameter_declaration(type_spelling, name):
+    """Declare a parameter of MOCK_METHOD. A type whose declarator wraps the name, such as a function pointer,
+    is declared without the name, which gmock does not use."""
+    prefix, named = parameter_prefix(type_spelling)
+    return prefix + name if named else prefix
+
+def parameter_prefix(type_spelling):
+    """Get the declaration of a parameter of MOCK_METHOD up to its name, and whether the name is appended."""
+    if DECLARATOR_WRAPS_NAME.search(type_spelling):
+        return protect_commas(type_spelling), False
+    return f"{protect_commas(type_spelling)} ", True
+
+def is_mocked(class_data):
+    """Check that a mock is generated for a class. Structs and class templates are only mocked if they have
+    a mockable method: plain data structs and containers are far more common than interfaces among them.
+    `final` classes cannot be derived from."""
+    if class_data.get('is_final', False):
+        return False
+    if (not class_data.get('is_struct', False) and not class_data.get('template_parameters')
+            and not class_data.get('scope_template_parameters')):
+        return True
+    return any(is_mockable(method) for method in class_data['methods'])
+
+def protect_commas(type_spelling):
+    """Parenthesize a type holding a comma outside of parentheses, such as `std::map<int, int>`, which
+    MOCK_METHOD would otherwise take for two arguments."""
+    if ',' not in type_spelling:
+        return type_spelling
+    depth = 0
+    for character in type_spelling:
+        if character == '(':
+            depth += 1
+        elif character == ')':
+            depth -= 1
+        elif character == ',' and depth == 0:
+            return f"({type_spelling})"
+    return type_spelling
+
+def method_qualifiers(is_const, is_noexcept, ref_qualifier):
+    """Get the MOCK_METHOD qualifiers of a method, which must match those of the mocked method."""
+    qualifiers = []
+    if is_const:
+        qualifiers.append('const')
+    if is_noexcept:
+        qualifiers.append('noexcept')
+    if ref_qualifier:
+        qualifiers.append(f"ref({ref_qualifier})")
+    qualifiers.append('override')
+    return ', '.join(qualifiers)
+
+# MOCK_METHOD qualifiers by (is_const, is_noexcept, ref_qualifier), rendered once for every combination.
+QUALIFIERS = {(is_const, is_noexcept, ref_qualifier): method_qualifiers(is_const, is_noexcept, ref_qualifier)
+              for is_const in (False, True) for is_noexcept in (False, True) for ref_qualifier in ('', '&', '&&')}
+
+def check_mock_layout(layout):
+    """Check that a class mock layout only uses the `{header}` and `{name}` fields, and `{name}` so every
+    class gets its own header, returning the layout. Raises a ValueError otherwise."""
+    try:
+        fields = [(field, format_spec, conversion) for _, field, format_spec, conversion in string.Formatter().parse(layout)
+                  if field is not None]
+    except ValueError as error:
+        raise ValueError(f"Invalid mock layout {layout!r}: {error}") from None
+    for field, format_spec, conversion in fields:
+        if field not in ('header', 'name') or format_spec or conversion:
+            raise ValueError(f"Invalid mock layout {layout!r}: unsupported field {{{field}}}, use {{header}} and {{name}}")
+    if 'name' not in [field for field, _, _ in fields]:
+        raise ValueError(f"Invalid mock layout {layout!r}: {{name}} is required so each class gets its own header")
+    return layout
+
+def mock_layout_argument(layout):
+    """Argument type of the `--mock-layout` options, reporting an invalid layout as a usage error."""
+    try:
+        return check_mock_layout(layout)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error)) from None
+
+def header_name_for(output_file):
+    """Get the name of the header a parsed output file was generated from, without its extension."""
+    base_name = os.path.splitext(os.path.basename(output_file))[0]
+    if base_name.endswith('_output'):
+        base_name = base_name[:-len('_output')]
+    return base_name
+
+def mock_file_for(output_file, output_directory):
+    """Get the mock header generated for a parsed output file."""
+    return os.path.join(output_directory, f"{header_name_for(output_file)}_mock.h")
+
+def mocks_are_current(entry, class_hash, layout, umbrella):
+    """Check that the mocks recorded in a manifest entry were generated from `class_hash` with the same
+    settings, and were not modified since."""
+    return (entry.get('class_hash') == class_hash and entry.get('mock_layout') == layout
+            and entry.get('mock_umbrella', False) == umbrella and entry.get('mock_files') is not None
+            and entry.get('mock_mtimes') == [file_mtime(mock_file) for mock_file in entry['mock_files']])
+
+def generate_mock_files(parent_output_file, output_directory, layout=None, umbrella=False):
+    """Generate the mock headers listed in a parent output manifest.
+
+    By default the mocks of the classes of a header are written to a single `<header>_mock.h`. With
+    `layout`, each class mock gets its own header instead (see `GMockGenerator.generate_class_mock_files`),
+    and with `umbrella` the `<header>_mock.h` includes them all.
+
+    Mock headers are only rewritten when the class data they were generated from, the generator (see
+    `GENERATOR_VERSION`) or its templates changed, or when a file is missing or was modified since it was generated; untouched mocks keep their mtime so the C++
+    build does not recompile the tests including them. Mock headers a header no longer produces are
+    removed. The manifest is updated with the class data hash and the mtime of each mock header.
+    Returns the mock headers that were generated."""
+    entries = load_manifest(parent_output_file)
+    mock_generator = GMockGenerator()
+    generated_files = []
+
+    for entry in entries:
+        with profiling.stage('load output', entry['file']):
+            parsed_data = load_parsed_data(entry['output_file'])
+        generated_files.extend(update_mocks(entry, parsed_data, output_directory, layout, umbrella, mock_generator))
+
+    save_manifest(entries, parent_output_file)
+    return generated_files
+
+def update_mocks(entry, parsed_data, output_directory, layout=None, umbrella=False, mock_generator=None):
+    """Generate the mock headers of a manifest entry from its parsed data, unless they are current.
+
+    The entry is updated as described in `generate_mock_files`. Returns the mock headers that were generated."""
+    umbrella = bool(layout and umbrella)
+    if mock_generator is None:
+        mock_generator = GMockGenerator()
+    # The hash covers how mocks are rendered too, so mocks written by another generator or templates are replaced.
+    class_hash = data_digest([GENERATOR_VERSION, mock_generator.templates.sources,
+                              list(iter_namespaced_classes(parsed_data))])
+    if mocks_are_current(entry, class_hash, layout, umbrella):
+        return []
+
+    mock_file = mock_file_for(entry['output_file'], output_directory)
+    with profiling.stage('write mocks', entry['file']):
+        if layout is None:
+            mock_generator.generate_mock_file(parsed_data, mock_file)
+            mock_files = [mock_file]
+        else:
+            mock_files = mock_generator.generate_class_mock_files(parsed_data, output_directory, layout,
+                                                                  header_name_for(entry['output_file']),
+                                                                  mock_file if umbrella else None)
+            if umbrella:
+                mock_files.append(mock_file)
+
+    for previous_mock_file in entry.get('mock_files', []):
+        if previous_mock_file not in mock_files and os.path.exists(previous_mock_file):
+            os.remove(previous_mock_file)
+            try:
+                os.rmdir(os.path.dirname(previous_mock_file))  # Only succeeds if the directory is now empty
+            except OSError:
+                pass
+
+    entry['mock_files'] = mock_files
+    entry['mock_mtimes'] = [file_mtime(mock_file) for mock_file in mock_files]
+    entry['mock_layout'] = layout
+    entry['mock_umbrella'] = umbrella
+    entry['class_hash'] = class_hash
+    return mock_files
 
 # Usage example:
 # Assume `parser` is an instance of `CppParser` and `parsed_data` is obtained by calling `parser.parse_header(["path_to_header.h"])`.
-
-parser = CppParser()
-parsed_data = parser.parse_header(['path_to_header.h'])
-mock_generator = GMockGenerator()
-mock_generator.generate_mock_file(parsed_data, 'MockOutput.h')
+#
+# parser = CppParser()
+# parsed_data = parser.parse_header(['path_to_header.h'])
+# mock_generator = GMockGenerator()
+# mock_generator.generate_mock_file(parsed_data, 'MockOutput.h')
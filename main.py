@@ -1,51 +1,479 @@
+import argparse
+import contextlib
 import os
 import sys
-import yaml
-from cppparser import CppParser
-from mock_generator import generate_mock_files  # Assurez-vous que cette importation est correcte
-
-def save_to_yaml(data, output_file):
-    """Save the parsed data to a YAML file."""
-    with open(output_file, 'w') as file:
-        yaml.dump(data, file, sort_keys=False)
-
-def parse_and_save(file_path, output_directory):
-    """Parse a single header file and save the result to a YAML file."""
-    parsed_data = CppParser().parse_header([file_path])
+import clang_library
+from class_hierarchy import ClassHierarchy, consolidate_all
+from cpp_ir import entity_from_dict
+from cppparser import CppParser, normalize_path, read_source
+from diagnostics import SEVERITIES, DiagnosticsError, format_summary, summarize_diagnostics, write_summary
+from parse_cache import ParseCache
+from pipeline import Pipeline
+import profiling
+from gtest_mock_generator import GMockGenerator, generate_mock_files, mock_file_for, mock_layout_argument, update_mocks
+from manifest import file_mtime, input_digest, load_manifest, save_manifest
+from serialization import OUTPUT_FORMATS, save_parsed_data, stream_to_file
+from sharding import parse_shard, select_shard
+from symbol_index import update_symbol_index
+
+# Parser and parse cache owned by a pool worker process, created once by `_initialize_worker`.
+_worker_parser = None
+_worker_cache = None
+
+def _initialize_worker(cache_directory, parser_options):
+    """Create the long-lived parser (and clang index) and parse cache of a pool worker."""
+    global _worker_parser, _worker_cache
+    _worker_parser = CppParser(**parser_options)
+    _worker_cache = ParseCache(cache_directory) if cache_directory else None
+
+def _parse_in_worker(file_path):
+    """Parse a header file using the worker's parser and parse cache, returning the item `iter_parse`
+    yields for it, and its diagnostics."""
+    parsed_data = parse_cached(file_path, _worker_parser, _worker_cache)
+    included_files = included_files_of(file_path, _worker_parser, _worker_cache)
+    return (file_path, parsed_data, included_files), _worker_parser.diagnostics.pop(file_path, [])
+
+def _stream_in_worker(file_path, output_directory, output_format):
+    """Parse a header file and stream its entities to its output file using the worker's parser, also
+    returning its diagnostics."""
+    output_file = stream_and_save(file_path, output_directory, _worker_parser, output_format)
+    return output_file, _worker_parser.diagnostics.pop(file_path, [])
+
+def _iter_pool(futures, diagnostics):
+    """Yield the results of `(header_file, future)` pairs of a pool in order, gathering their diagnostics.
+
+    If a header fails, or the caller stops early, the headers that have not started yet are cancelled
+    rather than parsed for nothing. Shutting the pool down is left to the thread that created it."""
+    try:
+        for header_file, future in futures:
+            result, file_diagnostics = future.result()
+            if diagnostics is not None:
+                diagnostics[header_file] = file_diagnostics
+            yield result
+    except BaseException:
+        for _, future in futures:
+            future.cancel()
+        raise
+
+def parse_pool(jobs, header_files, cache_directory=None, parser_options=None):
+    """Create the pool of worker processes parsing `header_files` with `jobs` > 1, as a context manager
+    shutting it down on exit. Returns a context manager giving None when the headers are parsed serially.
+
+    Each worker keeps a single parser, created with `parser_options`, for its whole lifetime."""
+    if jobs <= 1 or len(header_files) <= 1:
+        return contextlib.nullcontext()
+    from concurrent.futures import ProcessPoolExecutor  # Only imported when needed, as it is slow to import
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_initialize_worker,
+                               initargs=(cache_directory, parser_options or {}))
+
+def parse_cached(file_path, parser, cache=None):
+    """Parse a single header file, reusing the cached result when the header and its includes are unchanged.
+
+    The classes are not consolidated, so that bases declared in other headers can be resolved later. The
+    diagnostics of a cached header are replayed into `parser.diagnostics`, and checked against its limits."""
+    with profiling.stage('parse header', file_path):
+        if cache is None:
+            return parser.parse_header([file_path], consolidate=False)
+
+        with profiling.stage('cache lookup'):
+            signature = parser.cache_signature(file_path)
+            entry = cache.load(file_path, signature)
+        if entry is not None:
+            profiling.count('cache hits')
+            parsed_data, diagnostics = entry
+            parser.record_diagnostics(file_path, diagnostics)
+            return parsed_data
+
+        parsed_data = parser.parse_header([file_path], consolidate=False)
+        with profiling.stage('cache store'):
+            cache.store(file_path, signature, parser.included_files, parsed_data, parser.checked_diagnostics[file_path])
+        return parsed_data
+
+def included_files_of(file_path, parser, cache=None):
+    """Get the files a header included when `parse_cached` last parsed it, or None if unknown."""
+    if cache is None:
+        return parser.included_files
+    return cache.dependencies(file_path)
+
+def output_file_for(file_path, output_directory, output_format='yaml'):
+    """Get the file the parsed data of a header is saved to."""
     base_name = os.path.basename(file_path)
-    output_file = os.path.join(output_directory, f"{os.path.splitext(base_name)[0]}_output.yaml")
-    save_to_yaml(parsed_data, output_file)
+    return os.path.join(output_directory, f"{os.path.splitext(base_name)[0]}_output{OUTPUT_FORMATS[output_format]}")
+
+def parse_all(header_files, jobs=1, cache_directory=None, parser_options=None, diagnostics=None):
+    """Parse every header file, returning their unconsolidated parsed data in the order of `header_files`.
+
+    With `jobs` > 1 the headers are spread across a pool of worker processes (see `parse_pool`).
+    `parser_options` are the keyword arguments used to create the parsers.
+    The `diagnostics` dict, if given, is filled with the diagnostics of each parsed header, even when
+    the parse stops on a `DiagnosticsError`; those of headers found in the parse cache are replayed."""
+    with parse_pool(jobs, header_files, cache_directory, parser_options) as executor:
+        return [parsed_data for _, parsed_data, _ in iter_parse(header_files, cache_directory, parser_options,
+                                                                diagnostics, executor)]
+
+def iter_parse(header_files, cache_directory=None, parser_options=None, diagnostics=None, executor=None):
+    """Parse every header file as `parse_all` does, returning an iterator over `(header_file, parsed_data,
+    included_files)` in the order of `header_files`, each header coming as soon as it is parsed.
+
+    `included_files` lists every file the header includes, directly or not, or is None if unknown. Given
+    the `executor` of `parse_pool`, the headers are submitted to its workers right away, on the calling
+    thread: the iterator only collects their results, so another thread, such as a stage of a
+    `pipeline.Pipeline`, can consume it while the pool stays owned by the calling thread. Otherwise the
+    headers are parsed by the thread consuming the iterator."""
+    if executor is not None:
+        return _iter_pool([(header_file, executor.submit(_parse_in_worker, header_file)) for header_file in header_files],
+                          diagnostics)
+    return _iter_parse_serially(header_files, cache_directory, parser_options or {}, diagnostics)
+
+def _iter_parse_serially(header_files, cache_directory, parser_options, diagnostics):
+    """Parse every header file with a single parser, yielding the items of `iter_parse`."""
+    parser = CppParser(**parser_options)
+    cache = ParseCache(cache_directory) if cache_directory else None
+    try:
+        for header_file in header_files:
+            parsed_data = parse_cached(header_file, parser, cache)
+            yield header_file, parsed_data, included_files_of(header_file, parser, cache)
+    finally:
+        if diagnostics is not None:
+            diagnostics.update(parser.diagnostics)
+
+def stream_and_save(file_path, output_directory, parser, output_format='yaml'):
+    """Parse a single header file and write each entity to its output file as soon as it is processed.
+
+    Only the classes of the header itself are used to consolidate inheritance."""
+    output_file = output_file_for(file_path, output_directory, output_format)
+    with profiling.stage('stream header', file_path):
+        stream_to_file((entity.to_dict() for entity in parser.iter_header([file_path])), output_file)
     return output_file
 
-def main(header_files, output_directory, parent_output_file):
+def stream_all(header_files, output_directory, jobs=1, parser_options=None, output_format='yaml', diagnostics=None):
+    """Stream the entities of every header file to its output file, returning the output files in order.
+
+    The `diagnostics` dict is filled as in `parse_all`."""
+    with parse_pool(jobs, header_files, None, parser_options) as executor:
+        if executor is not None:
+            return list(_iter_pool([(header_file, executor.submit(_stream_in_worker, header_file, output_directory,
+                                                                  output_format))
+                                    for header_file in header_files], diagnostics))
+
+    parser = CppParser(**(parser_options or {}))
+    try:
+        return [stream_and_save(header_file, output_directory, parser, output_format) for header_file in header_files]
+    finally:
+        if diagnostics is not None:
+            diagnostics.update(parser.diagnostics)
+
+def consolidate_ready(parsed_items, header_files):
+    """Consolidate class inheritance across headers parsed by `iter_parse`, yielding `(header_file,
+    parsed_data)` for each header as soon as its bases can be resolved.
+
+    The bases of the classes of a header are declared in the header itself or in the files it includes,
+    so a header is consolidated once every header of the run it includes has been parsed; headers whose
+    included files are unknown wait for all the others. The result matches `consolidate_all` as long as
+    no two headers of the run declare classes with the same name."""
+    run_headers = {normalize_path(header_file) for header_file in header_files}
+    received_headers = set()
+    hierarchy = ClassHierarchy()
+    pending = []  # (header file, entities, headers of the run it includes) of the headers not yet consolidated
+    for header_file, parsed_data, included_files in parsed_items:
+        with profiling.stage('consolidate', header_file):
+            entities = [entity_from_dict(item) for item in parsed_data]
+            hierarchy.add_entities(entities)
+        received_headers.add(normalize_path(header_file))
+        if included_files is not None:
+            included_files = {path for path in map(normalize_path, included_files) if path in run_headers}
+        pending.append((header_file, entities, included_files))
+
+        still_pending = []
+        for header_file, entities, included_files in pending:
+            if included_files is not None and included_files <= received_headers:
+                yield header_file, consolidate_entities(hierarchy, header_file, entities)
+            else:
+                still_pending.append((header_file, entities, included_files))
+        pending = still_pending
+
+    for header_file, entities, _ in pending:
+        yield header_file, consolidate_entities(hierarchy, header_file, entities)
+
+def consolidate_entities(hierarchy, header_file, entities):
+    """Consolidate the entities of a header with a class hierarchy, returning its parsed data."""
+    with profiling.stage('consolidate', header_file):
+        hierarchy.consolidate(entities)
+        return [entity.to_dict() for entity in entities]
+
+def save_each(consolidated_items, output_directory, output_format='yaml'):
+    """Save the parsed data of headers to their output files as they come, yielding `(header_file,
+    output_file, parsed_data)`."""
+    for header_file, parsed_data in consolidated_items:
+        output_file = output_file_for(header_file, output_directory, output_format)
+        with profiling.stage('save output', header_file):
+            save_parsed_data(parsed_data, output_file)
+        yield header_file, output_file, parsed_data
+
+def update_mocks_of_each(saved_items, parent_output_file, output_directory, mock_layout=None, mock_umbrella=False):
+    """Generate the mocks of headers whose output files were just saved, as they come, yielding their
+    manifest entry and parsed data.
+
+    The entries are made from those of the current manifest as by `update_manifest`, and updated as by
+    `gtest_mock_generator.generate_mock_files`; saving them is left to the caller."""
+    previous_entries = {entry['file']: entry for entry in load_manifest(parent_output_file)}
+    mock_generator = GMockGenerator()
+    for header_file, output_file, parsed_data in saved_items:
+        entry = manifest_entry(header_file, output_file, previous_entries.get(header_file, {}))
+        update_mocks(entry, parsed_data, output_directory, mock_layout, mock_umbrella, mock_generator)
+        yield entry, parsed_data
+
+def generate_mock_texts(sources, parser=None, mock_generator=None):
+    """Generate the mock headers of headers held in memory, without reading or writing any file for them.
+
+    `sources` maps header paths to their content (see `CppParser.parse_unsaved`); the headers may
+    include each other, and inheritance is consolidated across all of them. Returns the content of the
+    mock header of each header, by header path. Passing a long-lived `parser` created with
+    `reuse_translation_units` keeps the translation units of the headers warm between calls."""
+    if parser is None:
+        parser = CppParser()
+    if mock_generator is None:
+        mock_generator = GMockGenerator()
+    # File-like contents can only be read once, but every header is parsed with all of them.
+    sources = {header_file: read_source(contents) for header_file, contents in sources.items()}
+    parsed_files = consolidate_all([parser.parse_unsaved([header_file], sources, consolidate=False)
+                                    for header_file in sources])
+    return {header_file: mock_generator.mock_text(parsed_data, mock_file_for(header_file, ''))
+            for header_file, parsed_data in zip(sources, parsed_files)}
+
+def save_all(header_files, parsed_files, output_directory, output_format='yaml'):
+    """Save the parsed data of every header file to its output file, returning the output files in order."""
+    output_files = []
+    for header_file, parsed_data in zip(header_files, parsed_files):
+        output_file = output_file_for(header_file, output_directory, output_format)
+        with profiling.stage('save output', header_file):
+            save_parsed_data(parsed_data, output_file)
+        output_files.append(output_file)
+    return output_files
+
+def update_manifest(header_files, output_files, parent_output_file):
+    """Save the parent output manifest listing the output file of every header file.
+
+    What is known about the mock of each header is carried over from the previous manifest, so mocks
+    are only regenerated if their classes changed."""
+    previous_entries = {entry['file']: entry for entry in load_manifest(parent_output_file)}
+    entries = [manifest_entry(header_file, output_file, previous_entries.get(header_file, {}))
+               for header_file, output_file in zip(header_files, output_files)]
+    save_manifest(entries, parent_output_file)
+
+def manifest_entry(header_file, output_file, previous_entry):
+    """Make the manifest entry of a header whose output file was saved, carrying over what is known of its mocks."""
+    entry = {
+        'file': header_file,
+        'output_file': output_file,
+        'file_hash': input_digest(header_file, previous_entry),
+        'file_mtime': file_mtime(header_file),
+        'output_mtime': file_mtime(output_file),
+    }
+    for key in ('mock_files', 'mock_mtimes', 'mock_layout', 'mock_umbrella', 'class_hash'):
+        if key in previous_entry:
+            entry[key] = previous_entry[key]
+    return entry
+
+def main(header_files, output_directory, parent_output_file, jobs=1, cache_directory=None, parser_options=None,
+         precompiled_prelude=None, output_format='yaml', stream=False, mock_layout=None, mock_umbrella=False,
+         index_file=None, diagnostics=None):
     """Parse multiple header files and generate a parent YAML file that includes all individual outputs,
-    then generate mock files based on the parent output YAML file."""
-    all_data = []
+    then generate mock files based on the parent output YAML file.
+
+    `precompiled_prelude` is a header gathering the heavy includes shared by the headers; it is
+    precompiled once and reused by every parse. It cannot be combined with a compilation database in
+    `parser_options`: headers are then parsed with the flags of their directory, which clang would refuse
+    to load the single PCH with, so a ValueError is raised. `output_format` is the format of the individual outputs
+    (see `serialization.OUTPUT_FORMATS`). With `stream`, entities are written as they are parsed instead
+    of being collected first; the parse cache is not used and inheritance is only consolidated within
+    each header. `mock_layout` and `mock_umbrella` write one mock header per class, see
+    `gtest_mock_generator.generate_mock_files`. The classes of the headers are recorded in the symbol
+    index `index_file`, if given.
+
+    Without `stream`, parsing, consolidation and saving, and mock generation form a `pipeline.Pipeline`:
+    a header is saved and gets its mocks while the following ones are still being parsed (see
+    `consolidate_ready` for when a header can be consolidated). The manifest is saved at the end.
 
+    The `diagnostics` dict, if given, is filled with the diagnostics of each parsed header (see
+    `parse_all`). A header over the error budget set in `parser_options` stops the run with a
+    `DiagnosticsError`, leaving the manifest unchanged.
+
+    Each stage is measured by the active profiler, see `profiling.enable`."""
     os.makedirs(output_directory, exist_ok=True)
+    parser_options = dict(parser_options or {})
+    if precompiled_prelude and parser_options.get('compilation_database'):
+        raise ValueError("A precompiled prelude cannot be combined with a compilation database")
+    if precompiled_prelude:
+        # Precompile the shared includes once; every parser of the run then loads the PCH.
+        precompiled_header = os.path.join(output_directory, 'prelude.pch')
+        with profiling.stage('precompile prelude', precompiled_prelude):
+            CppParser(**parser_options).build_precompiled_header(precompiled_prelude, precompiled_header)
+        parser_options['precompiled_header'] = precompiled_header
+
+    if stream:
+        with profiling.stage('stream'):
+            output_files = stream_all(header_files, output_directory, jobs, parser_options, output_format, diagnostics)
+        if index_file:
+            with profiling.stage('symbol index'):
+                update_symbol_index(index_file, header_files, output_files)
+
+        # Save the combined data to the parent output YAML file
+        with profiling.stage('manifest'):
+            update_manifest(header_files, output_files, parent_output_file)
+
+        # Generate mock files from the parent output YAML file
+        with profiling.stage('generate mocks'):
+            generate_mock_files(parent_output_file, output_directory, mock_layout, mock_umbrella)
+        return
 
-    for header_file in header_files:
-        output_file = parse_and_save(header_file, output_directory)
-        all_data.append({
-            'file': header_file,
-            'output_file': output_file,
-        })
+    # The pool is created and shut down here, on the main thread; the pipeline only consumes its results.
+    with parse_pool(jobs, header_files, cache_directory, parser_options) as executor, profiling.stage('pipeline'):
+        results = Pipeline().run(
+            iter_parse(header_files, cache_directory, parser_options, diagnostics, executor),
+            lambda parsed_items: consolidate_ready(parsed_items, header_files),
+            lambda consolidated_items: save_each(consolidated_items, output_directory, output_format),
+            lambda saved_items: update_mocks_of_each(saved_items, parent_output_file, output_directory, mock_layout,
+                                                     mock_umbrella))
+    # Headers come out of the pipeline in the order they could be consolidated; the manifest follows `header_files`.
+    results = {entry['file']: (entry, parsed_data) for entry, parsed_data in results}
+    entries = [results[header_file][0] for header_file in header_files]
 
-    # Save the combined data to the parent output YAML file
-    save_to_yaml(all_data, parent_output_file)
+    if index_file:
+        with profiling.stage('symbol index'):
+            update_symbol_index(index_file, header_files, [entry['output_file'] for entry in entries],
+                                [results[header_file][1] for header_file in header_files])
 
-    # Generate mock files from the parent output YAML file
-    generate_mock_files(parent_output_file, output_directory)
+    with profiling.stage('manifest'):
+        save_manifest(entries, parent_output_file)
+
+def parse_arguments(argv):
+    """Parse the command line arguments."""
+    argument_parser = argparse.ArgumentParser(description="Parse C++ headers and generate gMock mocks.")
+    argument_parser.add_argument('header_files', nargs='*', help="Header files to parse.")
+    argument_parser.add_argument('-j', '--jobs', type=int, default=1,
+                                 help="Number of worker processes used to parse headers (default: 1).")
+    argument_parser.add_argument('--cache-dir', dest='cache_directory',
+                                 help="Directory of the parse cache; unchanged headers are not parsed again.")
+    argument_parser.add_argument('--allow-dir', dest='allowed_directories', action='append', default=[],
+                                 help="Also process declarations from headers included from this directory "
+                                      "(may be repeated). By default only the parsed headers themselves are processed.")
+    argument_parser.add_argument('-p', '--compile-commands', dest='compilation_database',
+                                 help="Directory holding a compile_commands.json; headers are parsed with the "
+                                      "flags of the sources compiled from their directory.")
+    argument_parser.add_argument('--pch', dest='precompiled_prelude',
+                                 help="Header including the heavy headers shared by the parsed headers; it is "
+                                      "precompiled once and implicitly included in every parsed header. Cannot be "
+                                      "combined with -p, whose per-directory flags clang would not load the PCH with.")
+    argument_parser.add_argument('--format', dest='output_format', choices=sorted(OUTPUT_FORMATS), default='yaml',
+                                 help="Format of the individual output files (default: yaml); jsonl and binary "
+                                      "load many times faster than yaml.")
+    argument_parser.add_argument('--stream', action='store_true',
+                                 help="Write entities to the output files as they are parsed, without the parse "
+                                      "cache and consolidating inheritance within each header only.")
+    argument_parser.add_argument('--mock-layout', type=mock_layout_argument,
+                                 help="Write the mock of each class to its own header, at this path relative to the "
+                                      "output directory where {header} is the parsed header name and {name} the class "
+                                      "name, e.g. '{header}/Mock{name}.h'. By default the mocks of a header share one file.")
+    argument_parser.add_argument('--mock-umbrella', action='store_true',
+                                 help="With --mock-layout, also write <header>_mock.h including the mocks of all "
+                                      "the classes of the header.")
+    argument_parser.add_argument('-o', '--output-dir', dest='output_directory', default='outputs',
+                                 help="Directory to save the individual outputs, the manifest and the mocks to "
+                                      "(default: outputs).")
+    argument_parser.add_argument('--shard', type=parse_shard,
+                                 help="Only process shard i/N (i from 1 to N) of the headers, split by size the same "
+                                      "way on every machine; merge the outputs of the shards with 'sharding.py merge'.")
+    argument_parser.add_argument('--libclang',
+                                 help=f"libclang shared library to use, or the directory holding it. By default "
+                                      f"${clang_library.LIBRARY_ENVIRONMENT_VARIABLE} is used if set, then the "
+                                      f"library bundled with the clang Python package, then the usual install locations.")
+    argument_parser.add_argument('--diagnostics', dest='diagnostic_severity', choices=list(SEVERITIES)[1:],
+                                 default='warning',
+                                 help="Least severe diagnostic of the parsed headers to report (default: warning).")
+    argument_parser.add_argument('--error-budget', type=int,
+                                 help="Stop with an error when a header has more than this many errors, instead of "
+                                      "generating mocks from what clang could recover of it.")
+    argument_parser.add_argument('--fail-fast', action='store_true',
+                                 help="Stop at the first error of a header: clang does not try to recover from it.")
+    argument_parser.add_argument('--diagnostics-report', dest='diagnostics_file',
+                                 help="Write the diagnostics of every parsed header to this file, as JSON.")
+    argument_parser.add_argument('--profile', action='store_true',
+                                 help="Print the wall and CPU time of each stage and file, the number of cursors "
+                                      "visited and the peak memory. With --jobs, the stages run by the worker "
+                                      "processes are only measured as a whole.")
+    argument_parser.add_argument('--trace', dest='trace_file',
+                                 help="Write the timed stages to this file as trace events (JSON), to be loaded "
+                                      "in chrome://tracing or https://ui.perfetto.dev.")
+    argument_parser.add_argument('--cprofile', dest='cprofile_file',
+                                 help="Run under cProfile and write the statistics to this file, to be read with pstats.")
+    arguments = argument_parser.parse_args(argv)
+    if arguments.precompiled_prelude and arguments.compilation_database:
+        argument_parser.error("--pch cannot be combined with -p/--compile-commands")
+    return arguments
 
 if __name__ == '__main__':
     # Get the header files from command line arguments
-    header_files = sys.argv[1:]
+    arguments = parse_arguments(sys.argv[1:])
+    header_files = arguments.header_files
 
     if not header_files:
         print("Please provide at least one header file to parse.")
         sys.exit(1)
 
-    output_directory = 'outputs'  # Directory to save individual output files and mocks
+    if arguments.jobs < 1:
+        print("The number of jobs must be at least 1.")
+        sys.exit(1)
+
+    if arguments.shard:
+        header_files = select_shard(header_files, *arguments.shard)
+
+    output_directory = arguments.output_directory  # Directory to save individual output files and mocks
     parent_output_file = os.path.join(output_directory, 'parent_output.yaml')  # File to save the combined output data
+    index_file = os.path.join(output_directory, 'symbol_index.json')  # Index of the classes, see symbol_index.py
+
+    parser_options = {
+        'allowed_directories': arguments.allowed_directories,
+        'compilation_database': arguments.compilation_database,
+        'diagnostic_severity': arguments.diagnostic_severity,
+        'error_budget': arguments.error_budget,
+        'fail_fast': arguments.fail_fast,
+    }
+    diagnostics = {}
+    if arguments.libclang:
+        # Through the environment, worker processes use the same library.
+        os.environ[clang_library.LIBRARY_ENVIRONMENT_VARIABLE] = arguments.libclang
+
+    if arguments.profile or arguments.trace_file:
+        profiler = profiling.enable()
+    if arguments.cprofile_file:
+        import cProfile
+        function_profiler = cProfile.Profile()
+        function_profiler.enable()
 
-    main(header_files, output_directory, parent_output_file)
+    error = None
+    try:
+        main(header_files, output_directory, parent_output_file, arguments.jobs, arguments.cache_directory,
+             parser_options, arguments.precompiled_prelude, arguments.output_format, arguments.stream,
+             arguments.mock_layout, arguments.mock_umbrella, index_file, diagnostics)
+    except DiagnosticsError as diagnostics_error:
+        error = diagnostics_error
+        # A worker process reports the diagnostics of the header it stopped at through the error only.
+        diagnostics.setdefault(error.file_path, error.diagnostics)
+
+    if arguments.cprofile_file:
+        function_profiler.disable()
+        function_profiler.dump_stats(arguments.cprofile_file)
+    if arguments.trace_file:
+        profiler.write_trace(arguments.trace_file)
+    if arguments.profile:
+        print(profiler.summary(), file=sys.stderr)
+
+    summary = summarize_diagnostics(diagnostics)
+    if arguments.diagnostics_file:
+        write_summary(summary, arguments.diagnostics_file)
+    if summary['counts']:
+        print(format_summary(summary), file=sys.stderr)
+    if error is not None:
+        print(f"Stopped at {error.file_path}: {error.reason}", file=sys.stderr)
+        sys.exit(1)
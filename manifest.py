@@ -0,0 +1,54 @@
+import hashlib
+import os
+import yaml
+
+def file_digest(file_path):
+    """Return the SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def data_digest(data):
+    """Return the SHA-256 digest of parsed data, independent of how it was serialized."""
+    return hashlib.sha256(repr(data).encode('utf-8')).hexdigest()
+
+def file_mtime(file_path):
+    """Return the modification time of a file in nanoseconds, or None if it does not exist."""
+    try:
+        return os.stat(file_path).st_mtime_ns
+    except OSError:
+        return None
+
+def write_if_changed(file_path, content):
+    """Write `content` to a file unless it already holds exactly that, so unchanged files keep their mtime.
+
+    `content` may be text or bytes. Returns True if the file was written."""
+    binary = isinstance(content, bytes)
+    try:
+        with open(file_path, 'rb' if binary else 'r') as file:
+            if file.read() == content:
+                return False
+    except OSError:
+        pass
+    with open(file_path, 'wb' if binary else 'w') as file:
+        file.write(content)
+    return True
+
+def load_manifest(manifest_file):
+    """Load a parent output manifest, returning an empty list if it does not exist."""
+    if not os.path.exists(manifest_file):
+        return []
+    with open(manifest_file, 'r') as file:
+        return yaml.safe_load(file) or []
+
+def save_manifest(entries, manifest_file):
+    """Save a parent output manifest, leaving the file untouched if nothing changed."""
+    return write_if_changed(manifest_file, yaml.dump(entries, sort_keys=False))
+
+def input_digest(file_path, previous_entry=None):
+    """Return the digest of an input file, reusing the previous manifest entry when its mtime is unchanged."""
+    if previous_entry and previous_entry.get('file_mtime') == file_mtime(file_path) and previous_entry.get('file_hash'):
+        return previous_entry['file_hash']
+    return file_digest(file_path)
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+class ParseCache:
+    """On-disk cache of `CppParser` results, keyed by the contents of a header and everything it includes.
+
+    Two kinds of files live in the cache directory:
+    - `<path hash>.deps.json` lists the files a header included the last time it was parsed;
+    - `<key>.json` holds the parsed data and the diagnostics of the header, where the key hashes the parser
+      signature together with the path and contents of the header and of each of those includes.
+    A header is therefore only parsed again when itself, one of its includes or the parser settings change.
+    """
+
+    def __init__(self, cache_directory):
+        self.cache_directory = cache_directory
+        os.makedirs(cache_directory, exist_ok=True)
+
+    def __dependencies_file(self, file_path):
+        """Get the file recording the includes of a header."""
+        path_hash = hashlib.sha256(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_directory, f"{path_hash}.deps.json")
+
+    def __entry_file(self, key):
+        """Get the file holding the entry of a cache key."""
+        return os.path.join(self.cache_directory, f"{key}.json")
+
+    def __compute_key(self, file_path, dependencies, signature):
+        """Hash the parser signature with the path and contents of a header and its includes.
+
+        Returns None when one of the files can no longer be read."""
+        digest = hashlib.sha256(signature.encode('utf-8'))
+        for path in [file_path] + dependencies:
+            digest.update(b'\0' + os.path.abspath(path).encode('utf-8') + b'\0')
+            try:
+                with open(path, 'rb') as file:
+                    digest.update(file.read())
+            except OSError:
+                return None
+        return digest.hexdigest()
+
+    def __read_json(self, path):
+        """Read a JSON file, returning None if it is missing or unreadable."""
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def __write_json(self, path, data):
+        """Atomically write a JSON file, so concurrent workers never observe partial entries."""
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, separators=(',', ':'))
+        os.replace(temporary_path, path)
+
+    def dependencies(self, file_path):
+        """Return the files a header included the last time it was parsed, or None if it never was."""
+        return self.__read_json(self.__dependencies_file(file_path))
+
+    def load(self, file_path, signature):
+        """Return the cached parsed data and diagnostics of a header, or None on a cache miss."""
+        dependencies = self.dependencies(file_path)
+        if dependencies is None:
+            return None
+        key = self.__compute_key(file_path, dependencies, signature)
+        if key is None:
+            return None
+        entry = self.__read_json(self.__entry_file(key))
+        if not isinstance(entry, dict):
+            return None  # Missing, or written by a version caching the parsed data alone
+        return entry['parsed_data'], entry['diagnostics']
+
+    def store(self, file_path, signature, dependencies, parsed_data, diagnostics=()):
+        """Store the parsed data and diagnostics of a header along with the files it included."""
+        dependencies = sorted(dependencies)
+        key = self.__compute_key(file_path, dependencies, signature)
+        if key is None:
+            return
+        self.__write_json(self.__entry_file(key), {'parsed_data': parsed_data, 'diagnostics': list(diagnostics)})
+        self.__write_json(self.__dependencies_file(file_path), dependencies)
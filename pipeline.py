@@ -0,0 +1,87 @@
+import queue
+import threading
+
+# Items waiting between two stages; a stage that gets this far ahead of the next one waits for it.
+DEFAULT_QUEUE_SIZE = 8
+
+# Put in a queue after the last item of a stage.
+_END = object()
+
+class Pipeline:
+    """Run stages on their own threads, each feeding the next through a bounded queue.
+
+    A stage is a function taking an iterator over the items of the previous stage and yielding its
+    own items, so it may hold some back until it has seen others. The first stage is an iterable.
+    The queues being bounded, a fast stage stays at most `queue_size` items ahead of a slow one, so
+    memory stays flat whatever the number of items. libclang releases the GIL while it parses, so
+    Python stages writing files overlap with parsing.
+
+    If a stage raises, every stage stops and `run` raises the first error.
+    """
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.failed = threading.Event()
+        self.errors = []
+
+    def __put(self, output_queue, item):
+        """Put an item in a queue, giving up if a stage failed while waiting for room."""
+        while not self.failed.is_set():
+            try:
+                output_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter_queue(self, input_queue):
+        """Yield the items of a queue until the end of the stage feeding it, or a failure."""
+        while not self.failed.is_set():
+            try:
+                item = input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def __run_stage(self, items, output_queue):
+        """Move the items of a stage to its output queue, recording the error that stops it, if any."""
+        try:
+            for item in items:
+                if not self.__put(output_queue, item):
+                    return
+            self.__put(output_queue, _END)
+        except BaseException as error:
+            self.errors.append(error)
+            self.failed.set()
+        finally:
+            # Let a generator stopped early release its resources, e.g. cancel the work of a process pool.
+            close = getattr(items, 'close', None)
+            if close is not None:
+                close()
+
+    def run(self, source, *stages):
+        """Run the stages on `source`, returning the items of the last stage as a list."""
+        threads = []
+        items = source
+        for stage in stages:
+            output_queue = queue.Queue(self.queue_size)
+            thread = threading.Thread(target=self.__run_stage, args=(items, output_queue), daemon=True)
+            thread.start()
+            threads.append(thread)
+            items = stage(self.__iter_queue(output_queue))
+
+        # The last stage runs on the calling thread.
+        results = []
+        try:
+            for item in items:
+                results.append(item)
+        except BaseException as error:
+            self.errors.append(error)
+            self.failed.set()
+        for thread in threads:
+            thread.join()
+        if self.errors:
+            raise self.errors[0]
+        return results
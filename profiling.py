@@ -0,0 +1,256 @@
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+class _NullStage:
+    """Context manager doing nothing, shared by every stage while profiling is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class NullProfiler:
+    """Profiler used while profiling is disabled: instrumented code pays a single call per stage."""
+
+    enabled = False
+
+    def stage(self, name, file=None):
+        return _NULL_STAGE
+
+    def iterate(self, name, iterable, file=None):
+        return iterable
+
+    def count(self, name, value=1):
+        pass
+
+class _Stage:
+    """Record the wall and CPU time of a stage of a `Profiler` on exit."""
+
+    __slots__ = ('profiler', 'name', 'file')
+
+    def __init__(self, profiler, name, file):
+        self.profiler = profiler
+        self.name = name
+        self.file = file
+
+    def __enter__(self):
+        self.profiler._start(self.name, self.file)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._stop()
+        return False
+
+class Profiler:
+    """Wall and CPU time of the stages of a run, per file, with counters and peak memory.
+
+    Stages nest: a stage started while another one runs on the same thread is recorded as its child.
+    Stages given a file are also attributed to that file, and counters are attributed to the file of
+    the innermost stage. CPU times are those of the whole process: libclang parses on threads of its
+    own. Stages run by worker processes are not recorded."""
+
+    enabled = True
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        # (name, file, names of the enclosing stages and its own, start, wall, cpu, peak memory, nested in a
+        # stage of the same file, thread) of every stage
+        self.records = []
+        self.counters = {}
+        self.file_counters = {}
+        self.local = threading.local()
+
+    @property
+    def stack(self):
+        """Stages running on the current thread, innermost last."""
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+    def stage(self, name, file=None):
+        """Context manager measuring a stage, optionally processing `file`."""
+        return _Stage(self, name, file)
+
+    def iterate(self, name, iterable, file=None):
+        """Iterate over `iterable`, measuring the time spent producing its items as one stage.
+
+        The time the caller spends on each item is left out, so a generator interleaved with other
+        work (the traversal of a translation unit consumed by consolidation, say) is measured alone."""
+        iterator = iter(iterable)
+        wall = cpu = 0.0
+        start = None
+        while True:
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            self.stack.append((name, file, wall_start, cpu_start))
+            if start is None:
+                start = wall_start
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                wall += time.perf_counter() - wall_start
+                cpu += time.process_time() - cpu_start
+                self.stack.pop()
+            yield item
+        self._record(name, file, start, wall, cpu)
+
+    def count(self, name, value=1):
+        """Add `value` to a counter, also attributing it to the file of the innermost stage."""
+        self.counters[name] = self.counters.get(name, 0) + value
+        file = next((entry[1] for entry in reversed(self.stack) if entry[1]), None)
+        if file:
+            file_counters = self.file_counters.setdefault(file, {})
+            file_counters[name] = file_counters.get(name, 0) + value
+
+    def _start(self, name, file):
+        self.stack.append((name, file, time.perf_counter(), time.process_time()))
+
+    def _stop(self):
+        name, file, wall_start, cpu_start = self.stack.pop()
+        self._record(name, file, wall_start, time.perf_counter() - wall_start, time.process_time() - cpu_start)
+
+    def _record(self, name, file, start, wall, cpu):
+        stack = self.stack
+        path = tuple(entry[0] for entry in stack) + (name,)
+        # A stage nested in a stage of the same file is already counted in the time of that file.
+        nested = file is not None and any(entry[1] == file for entry in stack)
+        self.records.append((name, file, path, start - self.origin, wall, cpu, peak_memory(), nested,
+                             threading.get_ident()))
+
+    def stage_totals(self):
+        """Aggregate the records by stage, each stage followed by the stages nested in it, in the order
+        they first started.
+
+        Returns tuples of the stage name, its depth, number of calls, total wall and CPU seconds,
+        and the peak memory in bytes when it last ended."""
+        totals = {}
+        first_starts = {}
+        for _, _, path, start, wall, cpu, memory, _, _ in sorted(self.records, key=lambda record: record[3]):
+            calls, total_wall, total_cpu, _ = totals.get(path, (0, 0.0, 0.0, None))
+            totals[path] = (calls + 1, total_wall + wall, total_cpu + cpu, memory)
+            first_starts.setdefault(path, start)
+
+        def tree_order(path):
+            return [first_starts.get(path[:length], first_starts[path]) for length in range(1, len(path) + 1)]
+
+        return [(path[-1], len(path) - 1) + totals[path] for path in sorted(totals, key=tree_order)]
+
+    def file_totals(self):
+        """Aggregate the wall and CPU seconds spent on each file."""
+        totals = {}
+        for _, file, _, _, wall, cpu, _, nested, _ in self.records:
+            if file is not None and not nested:
+                total_wall, total_cpu = totals.get(file, (0.0, 0.0))
+                totals[file] = (total_wall + wall, total_cpu + cpu)
+        return totals
+
+    def summary(self, max_files=20):
+        """Format a report of the time spent in each stage and on the slowest files."""
+        lines = [f"{'Stage':<36} {'Calls':>7} {'Wall (ms)':>11} {'CPU (ms)':>11} {'Peak RSS (MB)':>14}"]
+        for name, depth, calls, wall, cpu, memory in self.stage_totals():
+            lines.append(f"{'  ' * depth + name:<36} {calls:>7} {wall * 1000:>11.1f} {cpu * 1000:>11.1f} "
+                         f"{format_megabytes(memory):>14}")
+
+        file_totals = sorted(self.file_totals().items(), key=lambda item: item[1][0], reverse=True)
+        if file_totals:
+            counter_names = sorted({name for counters in self.file_counters.values() for name in counters})
+            lines.append('')
+            lines.append(f"{'File':<36} {'Wall (ms)':>11} {'CPU (ms)':>11}"
+                         + ''.join(f" {name.capitalize():>11}" for name in counter_names))
+            for file, (wall, cpu) in file_totals[:max_files]:
+                counters = self.file_counters.get(file, {})
+                lines.append(f"{shorten(file, 36):<36} {wall * 1000:>11.1f} {cpu * 1000:>11.1f}"
+                             + ''.join(f" {counters.get(name, 0):>11}" for name in counter_names))
+            if len(file_totals) > max_files:
+                lines.append(f"... and {len(file_totals) - max_files} more files")
+
+        if self.counters:
+            lines.append('')
+            lines.append('Counters: ' + ', '.join(f"{name} {value}" for name, value in sorted(self.counters.items())))
+        lines.append(f"Peak memory: {format_megabytes(peak_memory())} MB"
+                     + (f" (worker processes: {format_megabytes(peak_memory(children=True))} MB)"
+                        if peak_memory(children=True) else ''))
+        return '\n'.join(lines)
+
+    def trace_events(self):
+        """Get the stages and counters as trace events, in the Trace Event Format of Chrome's trace viewer."""
+        process_id = os.getpid()
+        events = []
+        threads = {}
+        for name, file, _, start, wall, cpu, memory, _, thread in self.records:
+            thread_id = threads.setdefault(thread, len(threads))
+            arguments = {'cpu_ms': round(cpu * 1000, 3)}
+            if file:
+                arguments['file'] = file
+            events.append({'name': name, 'cat': 'stage', 'ph': 'X', 'ts': round(start * 1e6, 1),
+                           'dur': round(wall * 1e6, 1), 'pid': process_id, 'tid': thread_id, 'args': arguments})
+            if memory is not None:
+                events.append({'name': 'peak memory', 'ph': 'C', 'ts': round((start + wall) * 1e6, 1),
+                               'pid': process_id, 'tid': 0, 'args': {'MB': round(memory / 2 ** 20, 1)}})
+        events.sort(key=lambda event: event['ts'])
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'counters': self.counters}}
+
+    def write_trace(self, trace_file):
+        """Write the trace events to a JSON file, to be loaded in chrome://tracing or Perfetto."""
+        with open(trace_file, 'w') as file:
+            json.dump(self.trace_events(), file)
+
+def peak_memory(children=False):
+    """Get the peak resident set size of the process (or of its terminated children) in bytes, if known."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Linux reports kilobytes, macOS bytes.
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+def format_megabytes(size):
+    return '-' if size is None else f"{size / 2 ** 20:.1f}"
+
+def shorten(path, width):
+    """Keep the end of a path that does not fit in `width` characters."""
+    return path if len(path) <= width else '...' + path[-(width - 3):]
+
+# Profiler used by the instrumented code, replaced by `enable`.
+_profiler = NullProfiler()
+
+def enable():
+    """Start profiling the stages run from now on, returning the `Profiler` recording them."""
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+def disable():
+    """Stop profiling."""
+    global _profiler
+    _profiler = NullProfiler()
+
+def profiler():
+    """Get the active profiler, a `NullProfiler` while profiling is disabled."""
+    return _profiler
+
+def stage(name, file=None):
+    """Measure a stage with the active profiler."""
+    return _profiler.stage(name, file)
+
+def iterate(name, iterable, file=None):
+    """Measure the iteration over `iterable` as a stage with the active profiler."""
+    return _profiler.iterate(name, iterable, file)
+
+def count(name, value=1):
+    """Add to a counter of the active profiler."""
+    _profiler.count(name, value)
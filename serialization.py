@@ -0,0 +1,137 @@
+import json
+import os
+import yaml
+import binary_format
+from manifest import write_if_changed
+
+# The libyaml bindings are much faster than the pure-Python dumper and loader, and produce the same output.
+try:
+    from yaml import CSafeDumper as YamlDumper, CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeDumper as YamlDumper, SafeLoader as YamlLoader
+
+OUTPUT_FORMATS = {
+    'yaml': '.yaml',
+    'jsonl': '.jsonl',
+    'binary': '.cmgb',
+}
+
+def dump_yaml(data):
+    """Dump parsed data to a YAML string."""
+    return yaml.dump(data, Dumper=YamlDumper, sort_keys=False)
+
+class YamlEmitter:
+    """Write the items of a YAML list one at a time.
+
+    Each item is dumped as a one-item list; their concatenation is the block sequence `yaml.dump`
+    would produce for the whole list."""
+
+    mode = 'w'
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def emit(self, item):
+        self.file.write(dump_yaml([item]))
+        self.count += 1
+
+    def close(self):
+        if self.count == 0:
+            self.file.write(dump_yaml([]))
+
+class JsonLinesEmitter:
+    """Write items as JSON Lines, one item per line."""
+
+    mode = 'w'
+
+    def __init__(self, file):
+        self.file = file
+
+    def emit(self, item):
+        self.file.write(json.dumps(item, separators=(',', ':')))
+        self.file.write('\n')
+
+    def close(self):
+        pass
+
+class BinaryEmitter:
+    """Collect items and write them in the binary format when closed.
+
+    The string and shape tables precede the body, so the file cannot be written before the last item."""
+
+    mode = 'wb'
+
+    def __init__(self, file):
+        self.file = file
+        self.items = []
+
+    def emit(self, item):
+        self.items.append(item)
+
+    def close(self):
+        self.file.write(binary_format.dumps(self.items))
+
+EMITTERS = {
+    'yaml': YamlEmitter,
+    'jsonl': JsonLinesEmitter,
+    'binary': BinaryEmitter,
+}
+
+def output_format_of(file_path):
+    """Get the output format of a parsed data file from its extension."""
+    extension = os.path.splitext(file_path)[1]
+    for output_format, format_extension in OUTPUT_FORMATS.items():
+        if extension == format_extension:
+            return output_format
+    return 'yaml'
+
+def stream_to_file(items, output_file):
+    """Write items to a file as they are produced, in the format given by the file extension.
+
+    The items are written to a temporary file, which only replaces `output_file` when its content
+    changed, so unchanged outputs keep their mtime."""
+    temporary_file = f"{output_file}.{os.getpid()}.tmp"
+    emitter_class = EMITTERS[output_format_of(output_file)]
+    with open(temporary_file, emitter_class.mode) as file:
+        emitter = emitter_class(file)
+        for item in items:
+            emitter.emit(item)
+        emitter.close()
+
+    if files_are_equal(temporary_file, output_file):
+        os.remove(temporary_file)
+        return False
+    os.replace(temporary_file, output_file)
+    return True
+
+def files_are_equal(first_file, second_file):
+    """Compare the contents of two files, a missing file being different from any other."""
+    try:
+        if os.path.getsize(first_file) != os.path.getsize(second_file):
+            return False
+        with open(first_file, 'rb') as first, open(second_file, 'rb') as second:
+            return first.read() == second.read()
+    except OSError:
+        return False
+
+def save_parsed_data(data, output_file):
+    """Save parsed data in the format given by the file extension, leaving an unchanged file untouched."""
+    output_format = output_format_of(output_file)
+    if output_format == 'binary':
+        content = binary_format.dumps(data)
+    elif output_format == 'jsonl':
+        content = ''.join(json.dumps(item, separators=(',', ':')) + '\n' for item in data)
+    else:
+        content = dump_yaml(data)
+    return write_if_changed(output_file, content)
+
+def load_parsed_data(input_file):
+    """Load parsed data saved in any of the output formats."""
+    output_format = output_format_of(input_file)
+    if output_format == 'binary':
+        return binary_format.load(input_file)
+    with open(input_file, 'r') as file:
+        if output_format == 'jsonl':
+            return [json.loads(line) for line in file if line.strip()]
+        return yaml.load(file, Loader=YamlLoader) or []
@@ -0,0 +1,157 @@
+import argparse
+import os
+import sys
+from class_hierarchy import consolidate_all
+from gtest_mock_generator import GMockGenerator, mock_layout_argument, update_mocks
+from manifest import file_mtime, load_manifest, save_manifest, write_if_changed
+import profiling
+from serialization import load_parsed_data, save_parsed_data
+from symbol_index import update_symbol_index
+
+def parse_shard(text):
+    """Parse a `i/N` shard specification, where shards are numbered from 1 to N, into `(i, N)`."""
+    index, _, count = text.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{text}', expected i/N, e.g. 1/4") from None
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{text}', i must be between 1 and N")
+    return index, count
+
+def header_size(header_file):
+    """Get the size of a header, the estimate of its parse time used to balance shards."""
+    try:
+        return os.path.getsize(header_file)
+    except OSError:
+        return 0
+
+def partition(header_files, count):
+    """Split headers into `count` shards of about the same total size.
+
+    The largest headers are placed first, each in the shard with the smallest total so far. Ties are broken
+    by path and by shard number, so every machine of a CI run computes the same shards from the same checkout,
+    whatever the order the headers are listed in. Each shard keeps the headers in the order they are listed."""
+    shard_of = {}
+    totals = [0] * count
+    for header_file in sorted(set(header_files), key=lambda header_file: (-header_size(header_file), header_file)):
+        shard = totals.index(min(totals))
+        shard_of[header_file] = shard
+        totals[shard] += header_size(header_file)
+    shards = [[] for _ in range(count)]
+    for header_file in header_files:
+        shards[shard_of[header_file]].append(header_file)
+    return shards
+
+def select_shard(header_files, index, count):
+    """Get the headers of shard `index` out of `count`, numbered from 1."""
+    return partition(header_files, count)[index - 1]
+
+def merge_shards(manifest_files, output_directory, parent_output_file, mock_layout=None, mock_umbrella=False,
+                 index_file=None):
+    """Merge the outputs and mocks of sharded runs into a single output directory and manifest.
+
+    `manifest_files` are the parent output manifests of the shards, each next to the output files and mocks
+    of its shard, e.g. as downloaded from CI runners. The output files are consolidated again across all
+    the shards, so classes get the methods of bases parsed by other shards, and the mocks whose classes
+    changed are regenerated; the others are copied. Unchanged files keep their mtime. The merged manifest
+    lists the headers by path, whatever the order the shards are given in, and the classes of the headers
+    are recorded in the symbol index `index_file`, if given.
+
+    Raises ValueError if two shards produced the same header or output file."""
+    os.makedirs(output_directory, exist_ok=True)
+    shard_entries = {}
+    output_files = {}
+    for manifest_file in manifest_files:
+        for entry in load_manifest(manifest_file):
+            if entry['file'] in shard_entries:
+                raise ValueError(f"{entry['file']} is in both {shard_entries[entry['file']][1]} and {manifest_file}")
+            output_file = os.path.basename(entry['output_file'])
+            if output_file in output_files:
+                raise ValueError(f"{entry['file']} and {output_files[output_file]} are both saved to {output_file}")
+            output_files[output_file] = entry['file']
+            shard_entries[entry['file']] = (entry, manifest_file)
+
+    header_files = sorted(shard_entries)
+    parsed_files = []
+    for header_file in header_files:
+        entry, manifest_file = shard_entries[header_file]
+        with profiling.stage('load output', header_file):
+            parsed_files.append(load_parsed_data(os.path.join(os.path.dirname(manifest_file),
+                                                              os.path.basename(entry['output_file']))))
+    with profiling.stage('consolidate'):
+        parsed_files = consolidate_all(parsed_files)
+
+    entries = []
+    mock_generator = GMockGenerator()
+    for header_file, parsed_data in zip(header_files, parsed_files):
+        entry, manifest_file = shard_entries[header_file]
+        entry = dict(entry)
+        # Paths are recorded relative to where the shard ran; its files now sit next to its manifest.
+        recorded_directory = os.path.dirname(entry['output_file'])
+        entry['output_file'] = os.path.join(output_directory, os.path.basename(entry['output_file']))
+        with profiling.stage('save output', header_file):
+            save_parsed_data(parsed_data, entry['output_file'])
+        entry['output_mtime'] = file_mtime(entry['output_file'])
+
+        if 'mock_files' in entry:
+            with profiling.stage('copy mocks', header_file):
+                mock_files = []
+                for mock_file in entry['mock_files']:
+                    relative_path = os.path.relpath(mock_file, recorded_directory)
+                    with open(os.path.join(os.path.dirname(manifest_file), relative_path), 'rb') as file:
+                        content = file.read()
+                    mock_file = os.path.join(output_directory, relative_path)
+                    os.makedirs(os.path.dirname(mock_file), exist_ok=True)
+                    write_if_changed(mock_file, content)
+                    mock_files.append(mock_file)
+            entry['mock_files'] = mock_files
+            entry['mock_mtimes'] = [file_mtime(mock_file) for mock_file in mock_files]
+        update_mocks(entry, parsed_data, output_directory, mock_layout, mock_umbrella, mock_generator)
+        entries.append(entry)
+
+    if index_file:
+        with profiling.stage('symbol index'):
+            update_symbol_index(index_file, header_files, [entry['output_file'] for entry in entries], parsed_files)
+    with profiling.stage('manifest'):
+        save_manifest(entries, parent_output_file)
+    return entries
+
+def parse_arguments(argv):
+    """Parse the command line arguments."""
+    argument_parser = argparse.ArgumentParser(description="Split the headers of a run into shards and merge the "
+                                                          "results of sharded runs (see main.py --shard).")
+    commands = argument_parser.add_subparsers(dest='command', required=True)
+
+    list_parser = commands.add_parser('list', help="Print the headers of a shard, one per line.")
+    list_parser.add_argument('shard', type=parse_shard, help="Shard to print, as i/N with i from 1 to N.")
+    list_parser.add_argument('header_files', nargs='*', help="Header files of the whole run.")
+
+    merge_parser = commands.add_parser('merge', help="Merge the outputs and mocks of sharded runs.")
+    merge_parser.add_argument('manifest_files', nargs='+',
+                              help="parent_output.yaml of each shard, next to the outputs and mocks of the shard.")
+    merge_parser.add_argument('-o', '--output-dir', dest='output_directory', default='outputs',
+                              help="Directory to merge the shards into (default: outputs).")
+    merge_parser.add_argument('--mock-layout', type=mock_layout_argument,
+                              help="Mock layout the shards were run with, see main.py --mock-layout.")
+    merge_parser.add_argument('--mock-umbrella', action='store_true',
+                              help="With --mock-layout, also write <header>_mock.h including the class mocks.")
+    return argument_parser.parse_args(argv)
+
+if __name__ == '__main__':
+    arguments = parse_arguments(sys.argv[1:])
+
+    if arguments.command == 'list':
+        for header_file in select_shard(arguments.header_files, *arguments.shard):
+            print(header_file)
+    else:
+        output_directory = arguments.output_directory
+        parent_output_file = os.path.join(output_directory, 'parent_output.yaml')
+        index_file = os.path.join(output_directory, 'symbol_index.json')
+        try:
+            entries = merge_shards(arguments.manifest_files, output_directory, parent_output_file,
+                                   arguments.mock_layout, arguments.mock_umbrella, index_file)
+        except (OSError, ValueError) as error:
+            print(f"Cannot merge the shards: {error}")
+            sys.exit(1)
+        print(f"Merged {len(entries)} headers from {len(arguments.manifest_files)} shards into {parent_output_file}")
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import sys
+from cpp_ir import strip_template_arguments
+from gtest_mock_generator import GMockGenerator, flat_name, is_mocked
+from manifest import write_if_changed
+from serialization import load_parsed_data
+
+# Bump whenever the layout of the index changes; an index of another version is rebuilt from scratch.
+# Version 2 records absolute paths.
+INDEX_VERSION = 2
+
+class SymbolIndex:
+    """Persistent index of the classes of all the headers parsed so far, by qualified name and USR.
+
+    For each header, the index records its output file and the qualified name and USR of each of its
+    classes, so the parsed data of a class is found by loading a single output file. Headers of earlier
+    runs are kept, so the index covers the whole project even when a run only parses the headers that
+    changed; headers that no longer exist are dropped. Paths are recorded as absolute paths, so the index
+    can be used and updated from any directory.
+
+    Names are looked up without their template arguments, so `net::Queue::Observer` finds the class
+    nested in the class template `net::Queue<T, N>`.
+    """
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self.files = {}
+        try:
+            with open(index_file, 'r') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            index = None
+        if index and index.get('version') == INDEX_VERSION:
+            self.files = index['files']
+        # Built on the first lookup, and dropped whenever the indexed files change
+        self.by_name = None
+        self.by_usr = None
+
+    def __build_lookups(self):
+        """Map every qualified name, without template arguments, and USR to the entries of the classes bearing it."""
+        self.by_name = {}
+        self.by_usr = {}
+        for header_file, file_entry in self.files.items():
+            for class_entry in file_entry['classes']:
+                entry = {'file': header_file, 'output_file': file_entry['output_file'], **class_entry}
+                self.by_name.setdefault(strip_template_arguments(class_entry['name']), []).append(entry)
+                if class_entry['usr']:
+                    self.by_usr[class_entry['usr']] = entry
+
+    def update(self, header_file, output_file, parsed_data):
+        """Replace the classes indexed for a header by those of its parsed data."""
+        self.files[os.path.abspath(header_file)] = {
+            'output_file': os.path.abspath(output_file),
+            'classes': [{'name': name, 'usr': class_data.get('usr', '')}
+                        for name, class_data in iter_qualified_classes(parsed_data)],
+        }
+        self.by_name = self.by_usr = None
+
+    def lookup(self, name):
+        """Find the classes matching a USR, a qualified name or, failing those, an unqualified name."""
+        if self.by_name is None:
+            self.__build_lookups()
+        if name in self.by_usr:
+            return [self.by_usr[name]]
+        name = strip_template_arguments(name)
+        if name in self.by_name:
+            return self.by_name[name]
+        return [entry for qualified_name, entries in self.by_name.items()
+                if qualified_name.rsplit('::', 1)[-1] == name for entry in entries]
+
+    def save(self):
+        """Save the index, dropping the headers that no longer exist."""
+        self.files = {header_file: file_entry for header_file, file_entry in self.files.items()
+                      if os.path.exists(header_file)}
+        self.by_name = self.by_usr = None
+        write_if_changed(self.index_file, json.dumps({'version': INDEX_VERSION, 'files': self.files}, indent=1) + '\n')
+
+def iter_qualified_classes(parsed_data):
+    """Yield the qualified name and data of every class of parsed data, including those nested in namespaces
+    and classes."""
+    stack = [('', iter(parsed_data))]
+    while stack:
+        prefix, items = stack[-1]
+        item = next(items, None)
+        if item is None:
+            stack.pop()
+        elif item['type'] == 'Class':
+            yield item.get('qualified_name') or prefix + item['name'], item
+        elif item['type'] == 'Namespace':
+            # Anonymous namespaces add no component; their classes are told apart by their USR.
+            stack.append((f"{prefix}{item['name']}::" if item['name'] else prefix, iter(item['children'])))
+
+def update_symbol_index(index_file, header_files, output_files, parsed_files=None):
+    """Index the classes of the output files of a run, loading them if their parsed data is not given."""
+    index = SymbolIndex(index_file)
+    if parsed_files is None:
+        parsed_files = (load_parsed_data(output_file) for output_file in output_files)
+    for header_file, output_file, parsed_data in zip(header_files, output_files, parsed_files):
+        index.update(header_file, output_file, parsed_data)
+    index.save()
+    return index
+
+def find_class_data(entry):
+    """Load the parsed data of an indexed class and its enclosing namespaces from the output file of its header.
+
+    An anonymous namespace is listed as an empty name. Returns `(None, None)` if the class is no longer there."""
+    stack = [((), iter(load_parsed_data(entry['output_file'])))]
+    while stack:
+        namespaces, items = stack[-1]
+        item = next(items, None)
+        if item is None:
+            stack.pop()
+        elif item['type'] == 'Class':
+            name = item.get('qualified_name') or '::'.join([namespace for namespace in namespaces if namespace] + [item['name']])
+            if name == entry['name'] and item.get('usr', '') == entry['usr']:
+                return namespaces, item
+        elif item['type'] == 'Namespace':
+            stack.append((namespaces + (item['name'],), iter(item['children'])))
+    return None, None
+
+def generate_class_mock(index, name, output_file=None):
+    """Generate the mock of a single class looked up in the index, without parsing any header.
+
+    The mock is written to `output_file`, by default `<qualified name>_mock.h` next to the index.
+    Returns the index entry of the class and the mock file; raises a `LookupError` if no class or
+    several classes match `name`, or if the class is not mockable (see `gtest_mock_generator.is_mocked`)."""
+    entries = index.lookup(name)
+    if not entries:
+        raise LookupError(f"No class named {name} in the symbol index")
+    if len(entries) > 1:
+        candidates = ', '.join(f"{entry['name']} ({entry['usr']}, {entry['file']})" for entry in entries)
+        raise LookupError(f"Several classes match {name}, pass one of their USRs: {candidates}")
+
+    namespaces, class_data = find_class_data(entries[0])
+    if class_data is None:
+        raise LookupError(f"{name} is no longer in {entries[0]['output_file']}, parse {entries[0]['file']} again")
+    if '' in namespaces or not is_mocked(class_data):
+        raise LookupError(f"{entries[0]['name']} is not mockable: it is final, declared in an anonymous namespace, "
+                          f"or a struct or class template without mockable methods")
+    if output_file is None:
+        output_file = os.path.join(os.path.dirname(index.index_file), f"{flat_name(entries[0]['name'])}_mock.h")
+    # The mock is declared in the namespaces of the class, as in the mock header of the whole header.
+    parsed_data = [class_data]
+    for namespace in reversed(namespaces):
+        parsed_data = [{'type': 'Namespace', 'name': namespace, 'children': parsed_data}]
+    GMockGenerator().generate_mock_file(parsed_data, output_file)
+    return entries[0], output_file
+
+def parse_arguments(argv):
+    """Parse the command line arguments."""
+    argument_parser = argparse.ArgumentParser(description="Generate the mock of a single class found in the symbol index.")
+    argument_parser.add_argument('class_name', help="Qualified or unqualified name, or USR, of the class to mock.")
+    argument_parser.add_argument('--index', dest='index_file', default=os.path.join('outputs', 'symbol_index.json'),
+                                 help="Symbol index written by main.py (default: outputs/symbol_index.json).")
+    argument_parser.add_argument('-o', '--output', dest='output_file',
+                                 help="Mock header to write (default: <qualified class name>_mock.h next to the index).")
+    return argument_parser.parse_args(argv)
+
+if __name__ == '__main__':
+    arguments = parse_arguments(sys.argv[1:])
+    index = SymbolIndex(arguments.index_file)
+
+    try:
+        entry, output_file = generate_class_mock(index, arguments.class_name, arguments.output_file)
+    except LookupError as error:
+        print(error)
+        sys.exit(1)
+    print(f"Generated the mock of {entry['name']} from {entry['file']} in {output_file}")
@@ -0,0 +1,87 @@
+import unittest
+import os
+import struct
+import tempfile
+import binary_format
+from binary_format import BinaryFormatError, dumps, loads
+from cppparser import CppParser
+from serialization import load_parsed_data, save_parsed_data, stream_to_file
+
+class TestBinaryFormat(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+
+    def output_file(self, name):
+        return os.path.join(self.temporary_directory.name, name)
+
+    def test_round_trip_values(self):
+        """
+        **Test Name:** `test_round_trip_values`
+
+        **Purpose:**
+        To verify that every kind of value found in parsed data is decoded unchanged, including empty containers,
+        integers that do not fit in a token, non-ASCII strings, dicts of one shape nested at different depths and
+        values that are not containers.
+        """
+        data = [None, True, False, 0, 7, -5, 2 ** 40, 1.5, '', 'Größe', [], {}, [[[]]],
+                {'name': 'a', 'children': [{'name': 'b', 'children': []}]}, {'other': 'shape'}]
+        self.assertEqual(loads(dumps(data)), data)
+        self.assertEqual(loads(dumps([])), [])
+        for value in (None, 'name', 2 ** 40, -1.5):
+            self.assertEqual(loads(dumps(value)), value)
+
+    def test_round_trip_parser_output(self):
+        """
+        **Test Name:** `test_round_trip_parser_output`
+
+        **Purpose:**
+        To verify that the full output of `CppParser` round-trips through a binary file, saved at once or streamed.
+
+        **Validation:**
+        1. The loaded data equals the parsed data, key order included.
+        2. Saving the same data again leaves the file untouched.
+        """
+        parser = CppParser()
+        parsed_data = parser.parse_header([os.path.join('test_files', 'test_namespace.h'),
+                                           os.path.join('test_files', 'test_class.h')])
+
+        output_file = self.output_file('saved_output.cmgb')
+        self.assertTrue(save_parsed_data(parsed_data, output_file))
+        loaded_data = load_parsed_data(output_file)
+        self.assertEqual(loaded_data, parsed_data)
+        self.assertEqual([list(entity) for entity in loaded_data], [list(entity) for entity in parsed_data])
+        self.assertFalse(save_parsed_data(parsed_data, output_file))
+
+        stream_to_file(iter(parsed_data), self.output_file('streamed_output.cmgb'))
+        self.assertEqual(load_parsed_data(self.output_file('streamed_output.cmgb')), parsed_data)
+
+    def test_rejects_other_files(self):
+        """
+        **Test Name:** `test_rejects_other_files`
+
+        **Purpose:**
+        To verify that files of another format, of another version of the format, truncated or referring to a
+        container they do not hold, are rejected.
+        """
+        encoded = dumps([{'type': 'Macro', 'name': 'MAX', 'value': '1'}])
+        newer_version = encoded[:4] + struct.pack('<H', binary_format.VERSION + 1) + encoded[6:]
+        missing_root = encoded[:binary_format.HEADER.size - 4] + struct.pack('<I', binary_format.TAG_CONTAINER | 0xFF0) \
+            + encoded[binary_format.HEADER.size:]
+
+        for buffer in (b'', b'- type: Macro\n', newer_version, encoded[:-4], missing_root):
+            with self.assertRaises(BinaryFormatError):
+                loads(buffer)
+
+        with open(self.output_file('empty_output.cmgb'), 'wb'):
+            pass
+        with self.assertRaises(BinaryFormatError):
+            load_parsed_data(self.output_file('empty_output.cmgb'))
+
+        with open(self.output_file('corrupted_output.cmgb'), 'wb') as file:
+            file.write(missing_root)
+        with self.assertRaises(BinaryFormatError):
+            load_parsed_data(self.output_file('corrupted_output.cmgb'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+import clang_library
+from clang_library import LIBRARY_ENVIRONMENT_VARIABLE, SEARCH_PATTERNS, find_library, search_library
+
+class TestClangLibrary(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+        # `configure` refuses to change the library once loaded, as it is after the parser tests ran.
+        configured_library = mock.patch.object(clang_library, '_configured_library', None)
+        configured_library.start()
+        self.addCleanup(configured_library.stop)
+        environment = mock.patch.dict(os.environ)
+        environment.start()
+        self.addCleanup(environment.stop)
+        os.environ.pop(LIBRARY_ENVIRONMENT_VARIABLE, None)
+
+    def touch(self, *path):
+        file_path = os.path.join(self.temporary_directory.name, *path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        open(file_path, 'w').close()
+        return file_path
+
+    def test_find_library_precedence(self):
+        """
+        **Test Name:** `test_find_library_precedence`
+
+        **Purpose:**
+        To verify the order in which the library to load is chosen.
+
+        **Validation:**
+        1. The configured library comes first, then the environment variable.
+        2. Without either, the library `clang.cindex` would load is kept if it exists.
+        3. A default library that does not exist is not returned.
+        """
+        bundled_library = self.touch('native', 'libclang.so')
+        os.environ[LIBRARY_ENVIRONMENT_VARIABLE] = '/opt/llvm/lib'
+        with mock.patch.object(clang_library, '_configured_library', '/custom/libclang.so'):
+            self.assertEqual(find_library(bundled_library), '/custom/libclang.so')
+        self.assertEqual(find_library(bundled_library), '/opt/llvm/lib')
+
+        del os.environ[LIBRARY_ENVIRONMENT_VARIABLE]
+        self.assertEqual(find_library(bundled_library), bundled_library)
+        with mock.patch.object(clang_library, 'search_library', return_value=None):
+            self.assertIsNone(find_library('libclang.so'))
+
+    def test_search_library_prefers_newest_version(self):
+        """
+        **Test Name:** `test_search_library_prefers_newest_version`
+
+        **Purpose:**
+        To verify that the search of the usual locations picks the newest version, comparing versions numerically.
+        """
+        self.touch('llvm-9', 'lib', 'libclang.so.1')
+        newest_library = self.touch('llvm-18', 'lib', 'libclang.so.1')
+        patterns = {'linux': [os.path.join(self.temporary_directory.name, 'llvm-*', 'lib', 'libclang.so*')]}
+        with mock.patch.object(clang_library, 'SEARCH_PATTERNS', patterns):
+            self.assertEqual(search_library('linux'), newest_library)
+            self.assertIsNone(search_library('darwin'))
+
+    def test_search_library_skips_cpp_library(self):
+        """
+        **Test Name:** `test_search_library_skips_cpp_library`
+
+        **Purpose:**
+        To verify that the usual locations never yield `libclang-cpp.so`, the C++ API library, which cannot serve
+        `clang.cindex`, but do yield a versioned C API library next to it.
+        """
+        root = self.temporary_directory.name
+        patterns = {'linux': [root + pattern for pattern in SEARCH_PATTERNS['linux']]}
+        self.touch('usr', 'lib', 'llvm-14', 'lib', 'libclang-cpp.so.14')
+        self.touch('usr', 'lib', 'x86_64-linux-gnu', 'libclang-cpp.so.14')
+        with mock.patch.object(clang_library, 'SEARCH_PATTERNS', patterns):
+            self.assertIsNone(search_library('linux'))
+            c_library = self.touch('usr', 'lib', 'llvm-14', 'lib', 'libclang-14.so.1')
+            self.assertEqual(search_library('linux'), c_library)
+
+    def test_libclang_is_loaded_lazily(self):
+        """
+        **Test Name:** `test_libclang_is_loaded_lazily`
+
+        **Purpose:**
+        To verify that importing the parser, creating one and computing its cache signatures (all a cached run
+        does) neither imports `clang.cindex` nor loads libclang.
+        """
+        package_directory = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        script = ("import sys\n"
+                  "from cppparser import CppParser\n"
+                  "CppParser().cache_signature('header.h')\n"
+                  "print('clang.cindex' in sys.modules)\n")
+        environment = dict(os.environ, PYTHONPATH=package_directory)
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env=environment)
+        self.assertEqual(result.stdout.strip(), 'False', result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
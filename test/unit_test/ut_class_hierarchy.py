@@ -0,0 +1,145 @@
+import unittest
+from class_hierarchy import ClassHierarchy
+from cpp_ir import Class, Member, Method, Namespace, Parameter
+
+def method(name, *parameter_types):
+    return Method(name, 'void', [Parameter(f"p{index}", parameter_type) for index, parameter_type in enumerate(parameter_types)],
+                  is_virtual=True, is_static=False, is_const=False, access='public')
+
+def method_names(class_data):
+    return [method.name for method in class_data.methods]
+
+class TestClassHierarchy(unittest.TestCase):
+    def test_deep_hierarchy(self):
+        """
+        **Test Name:** `test_deep_hierarchy`
+
+        **Purpose:**
+        To verify that a class inherits the methods and members of all its ancestors, not only its direct bases,
+        regardless of the order the classes are declared in.
+
+        **Validation:**
+        1. The most derived class lists the methods of its three ancestors, bases first.
+        2. Members are consolidated the same way.
+        """
+        level2 = Class('Level2', ['Level1'], [Member('level2Member', False, 'private')], [method('level2Method')])
+        level1 = Class('Level1', ['Level0'], [], [method('level1Method')])
+        level0 = Class('Level0', [], [Member('level0Member', False, 'private')], [method('level0Method')])
+        entities = [level2, level1, level0]
+
+        hierarchy = ClassHierarchy()
+        hierarchy.add_entities(entities)
+        hierarchy.consolidate(entities)
+
+        self.assertEqual(method_names(level2), ['level0Method', 'level1Method', 'level2Method'])
+        self.assertEqual([member.name for member in level2.members], ['level0Member', 'level2Member'])
+        self.assertEqual(method_names(level0), ['level0Method'])
+
+    def test_diamond_and_overrides(self):
+        """
+        **Test Name:** `test_diamond_and_overrides`
+
+        **Purpose:**
+        To verify that a method inherited through several paths is listed once, that an override replaces
+        the inherited declaration and that overloads are kept apart.
+
+        **Setup:**
+        1. `Top` declares `run()` and `run(int)`; `Left` and `Right` derive from `Top`; `Bottom` derives from both
+           and overrides `run()`.
+
+        **Validation:**
+        1. `Bottom` lists `run(int)`, `left`, `right` then its own `run()`, each once.
+        """
+        top = Class('Top', [], [], [method('run'), method('run', 'int')])
+        left = Class('Left', ['Top'], [], [method('left')])
+        right = Class('Right', ['Top'], [], [method('right')])
+        bottom = Class('Bottom', ['Left', 'Right'], [], [method('run')])
+
+        hierarchy = ClassHierarchy([top, left, right, bottom])
+        hierarchy.consolidate([bottom])
+
+        self.assertEqual([(method.name, len(method.parameters)) for method in bottom.methods],
+                         [('run', 1), ('left', 0), ('right', 0), ('run', 0)])
+        self.assertIs(bottom.methods[-1], hierarchy.classes['Bottom'][2][0])
+
+    def test_bases_across_files(self):
+        """
+        **Test Name:** `test_bases_across_files`
+
+        **Purpose:**
+        To verify that a class declared in a namespace of one header inherits from a base declared in another
+        header, looked up by its qualified spelling, and that consolidating twice gives the same result.
+        """
+        base_header = [Namespace('ns', [Class('Base', [], [], [method('baseMethod')])])]
+        derived_header = [Class('Derived', ['ns::Base'], [], [method('derivedMethod')])]
+
+        hierarchy = ClassHierarchy()
+        hierarchy.add_entities(base_header)
+        hierarchy.add_entities(derived_header)
+        hierarchy.consolidate(derived_header)
+        hierarchy.consolidate(derived_header)
+
+        self.assertEqual(method_names(derived_header[0]), ['baseMethod', 'derivedMethod'])
+
+    def test_same_names_in_namespaces(self):
+        """
+        **Test Name:** `test_same_names_in_namespaces`
+
+        **Purpose:**
+        To verify that same-named classes of different namespaces are kept apart, and that a base is looked up
+        through the scopes enclosing the derived class, innermost first.
+
+        **Validation:**
+        1. `b::Widget` derives from `a::Widget`, and `b::Gadget` from `b::Widget` spelled `Widget`.
+        2. `b::Sub` derives from the nested class `b::Widget::Part` spelled `Widget::Part`.
+        """
+        a_widget = Class('Widget', [], [], [method('draw')], qualified_name='a::Widget')
+        b_widget = Class('Widget', ['a::Widget'], [], [method('resize')], qualified_name='b::Widget')
+        part = Class('Part', [], [], [method('id')], qualified_name='b::Widget::Part')
+        gadget = Class('Gadget', ['Widget'], [], [method('go')], qualified_name='b::Gadget')
+        sub = Class('Sub', ['Widget::Part'], [], [], qualified_name='b::Sub')
+        entities = [Namespace('a', [a_widget]), Namespace('b', [b_widget, part, gadget, sub])]
+
+        hierarchy = ClassHierarchy()
+        hierarchy.add_entities(entities)
+        hierarchy.consolidate(entities)
+
+        self.assertEqual(method_names(a_widget), ['draw'])
+        self.assertEqual(method_names(b_widget), ['draw', 'resize'])
+        self.assertEqual(method_names(gadget), ['draw', 'resize', 'go'])
+        self.assertEqual(method_names(sub), ['id'])
+
+    def test_instantiated_template_bases(self):
+        """
+        **Test Name:** `test_instantiated_template_bases`
+
+        **Purpose:**
+        To verify that a base spelled as an instantiation of a class template is resolved to the template, and
+        that the methods inherited from it get the template arguments in place of its parameters.
+
+        **Validation:**
+        1. `IntRepo`, deriving from `Repo<int, Key<int, 4>>`, inherits `put` and `find` with `int` and
+           `Key<int, 4>` as parameter and return types.
+        2. `Repo` itself keeps its template parameters.
+        3. A method expanding a parameter pack keeps its pack.
+        """
+        repo = Class('Repo', [], [], [method('put', 'const T &', 'int'), method('find', 'const K &'), method('take', 'Ts...')],
+                     qualified_name='store::Repo', template_parameters=['typename T', 'typename K', 'typename... Ts'])
+        repo.methods[1].return_type = 'T *'
+        int_repo = Class('IntRepo', ['Repo<int, Key<int, 4>, char>'], [], [method('clear')], qualified_name='store::IntRepo')
+        entities = [Namespace('store', [repo, int_repo])]
+
+        hierarchy = ClassHierarchy()
+        hierarchy.add_entities(entities)
+        hierarchy.consolidate(entities)
+
+        self.assertEqual(method_names(int_repo), ['put', 'find', 'take', 'clear'])
+        put, find, take = int_repo.methods[:3]
+        self.assertEqual([parameter.type for parameter in put.parameters], ['const int &', 'int'])
+        self.assertEqual([parameter.type for parameter in find.parameters], ['const Key<int, 4> &'])
+        self.assertEqual(find.return_type, 'int *')
+        self.assertEqual([parameter.type for parameter in take.parameters], ['Ts...'])
+        self.assertEqual([parameter.type for parameter in repo.methods[0].parameters], ['const T &', 'int'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+from collections import namedtuple
+from compilation_database import header_arguments
+
+CompileCommand = namedtuple('CompileCommand', ['directory', 'filename', 'arguments'])
+
+class TestCompilationDatabase(unittest.TestCase):
+    def test_header_arguments(self):
+        """
+        **Test Name:** `test_header_arguments`
+
+        **Purpose:**
+        To verify that a compile command is turned into arguments suitable to parse a header.
+
+        **Setup:**
+        1. Define a compile command with include paths, defines, output and dependency options and the source file.
+
+        **Execution:**
+        1. Call `header_arguments` on the command.
+
+        **Validation:**
+        1. The compiler, `-c`, output and dependency options and the source file are dropped.
+        2. Relative include paths are made relative to the command directory.
+        3. The language is forced to C++ and the other flags are kept in order.
+        """
+        build_directory = os.path.abspath('build')
+        command = CompileCommand(build_directory, '../src/a.cpp', [
+            '/usr/bin/c++', '-Iinclude', '-isystem', 'third_party', '-DFEATURE=1', '-std=c++17',
+            '-MD', '-MF', 'a.o.d', '-o', 'a.o', '-c', '../src/a.cpp'])
+
+        self.assertEqual(header_arguments(command), [
+            '-x', 'c++',
+            '-I' + os.path.join(build_directory, 'include'),
+            '-isystem', os.path.join(build_directory, 'third_party'),
+            '-DFEATURE=1', '-std=c++17'])
+
+    def test_header_arguments_stops_at_input_separator(self):
+        """
+        **Test Name:** `test_header_arguments_stops_at_input_separator`
+
+        **Purpose:**
+        To verify that the driver mode and the inputs following `--`, as inferred by libclang for headers, are dropped.
+        """
+        command = CompileCommand('/build', '/src/a.h', [
+            '/usr/bin/c++', '--driver-mode=g++', '-c', '-x', 'c++-header', '-std=c++17', '--', '/src/a.h'])
+
+        self.assertEqual(header_arguments(command), ['-x', 'c++', '-std=c++17'])
+
+if __name__ == '__main__':
+    unittest.main()
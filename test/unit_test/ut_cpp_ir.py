@@ -0,0 +1,81 @@
+import unittest
+from cpp_ir import (Class, Enum, Member, Method, Namespace, Parameter, Template, Using, entity_from_dict,
+                    split_template_arguments, strip_template_arguments)
+
+class TestCppIr(unittest.TestCase):
+    def setUp(self):
+        self.method = Method('getValue', 'int', [Parameter('index', 'int')],
+                             is_virtual=True, is_static=False, is_const=True, access='public')
+        self.class_data = Class('Base', [], [Member('value', False, 'private')], [self.method],
+                                [Member('instances', True, 'public')])
+
+    def test_to_dict(self):
+        """
+        **Test Name:** `test_to_dict`
+
+        **Purpose:**
+        To verify that entities convert to the dicts consumed by the YAML output and `GMockGenerator`.
+
+        **Validation:**
+        1. The class dict has the keys of the former parser output, in the same order, followed by its USR, its
+           template parameters, whether it is a struct, its qualified name, the template parameters of its scope
+           and whether it is final.
+        2. Methods, members and parameters are converted recursively.
+        """
+        class_dict = self.class_data.to_dict()
+        self.assertEqual(list(class_dict), ['type', 'name', 'base_classes', 'members', 'methods', 'static_members', 'usr',
+                                           'template_parameters', 'is_struct', 'qualified_name',
+                                           'scope_template_parameters', 'is_final'])
+        self.assertEqual(class_dict['methods'][0], {
+            'type': 'Method', 'name': 'getValue', 'return_type': 'int',
+            'parameters': [{'name': 'index', 'type': 'int'}],
+            'is_virtual': True, 'is_static': False, 'is_const': True, 'access': 'public',
+            'is_pure_virtual': False, 'is_noexcept': False, 'ref_qualifier': '', 'is_final': False})
+        self.assertEqual(class_dict['static_members'][0], {'type': 'Member', 'name': 'instances', 'is_static': True, 'access': 'public'})
+
+    def test_from_dict_round_trip(self):
+        """
+        **Test Name:** `test_from_dict_round_trip`
+
+        **Purpose:**
+        To verify that `entity_from_dict` rebuilds entities, including scoped enums, templates and aliases nested
+        in namespaces.
+        """
+        class_template = Class('Box', methods=[self.method], template_parameters=['typename T', 'int N'], is_struct=True)
+        namespace = Namespace('TestNamespace', [self.class_data, Enum('TestEnumClass', ['Value1', 'Value2'], is_scoped=True),
+                                                class_template, Template('add', ['T'], ['add<int>']),
+                                                Using('String', 'std::string')])
+        namespace_dict = namespace.to_dict()
+        self.assertEqual(namespace_dict['children'][1]['type'], 'EnumClass')
+        self.assertEqual(entity_from_dict(namespace_dict).to_dict(), namespace_dict)
+
+    def test_entities_have_no_instance_dict(self):
+        """
+        **Test Name:** `test_entities_have_no_instance_dict`
+
+        **Purpose:**
+        To verify that entities use `__slots__`, keeping the memory of a whole parsed project small.
+        """
+        for entity in (self.method, self.class_data, self.method.parameters[0]):
+            self.assertFalse(hasattr(entity, '__dict__'))
+
+    def test_template_arguments(self):
+        """
+        **Test Name:** `test_template_arguments`
+
+        **Purpose:**
+        To verify that template arguments are removed from names, and split off the end of a name.
+
+        **Validation:**
+        1. Every template argument list of a qualified name is removed, nested ones included.
+        2. The arguments at the end of a name are split at top-level commas only.
+        3. A name not ending with template arguments has none.
+        """
+        self.assertEqual(strip_template_arguments('net::Queue<T, Key<int, 4>>::Observer'), 'net::Queue::Observer')
+        self.assertEqual(split_template_arguments('Repo<int, Key<int, 4>, void (int, int)>'),
+                         ('Repo', ['int', 'Key<int, 4>', 'void (int, int)']))
+        self.assertEqual(split_template_arguments('net::Queue<T>::Observer'), ('net::Queue<T>::Observer', []))
+        self.assertEqual(split_template_arguments('Repo'), ('Repo', []))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from daemon import MockDaemon, MockServer, send_request, serve
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+        self.header_directory = os.path.join(self.temporary_directory.name, 'include')
+        self.output_directory = os.path.join(self.temporary_directory.name, 'outputs')
+        os.makedirs(self.header_directory)
+        shutil.copy(os.path.join('test_files', 'test_class.h'), self.header_directory)
+        self.mock_daemon = MockDaemon([], self.output_directory, os.path.join(self.output_directory, 'parent_output.yaml'),
+                                      watch_directories=[self.header_directory])
+
+    def start_server(self, watch_interval=None):
+        """Serve the daemon on a socket of the temporary directory in a background thread, returning the socket."""
+        socket_path = os.path.join(self.temporary_directory.name, 'daemon.sock')
+        address_ready = threading.Event()
+        server_thread = threading.Thread(target=serve, args=(self.mock_daemon, socket_path, watch_interval,
+                                                             lambda address: address_ready.set()))
+        server_thread.start()
+        self.assertTrue(address_ready.wait(10))
+        def stop():
+            send_request({'command': 'shutdown'}, socket_path, timeout=10)
+            server_thread.join(10)
+        self.addCleanup(stop)
+        return socket_path
+
+    def test_regenerate_request(self):
+        """
+        **Test Name:** `test_regenerate_request`
+
+        **Purpose:**
+        To verify that the daemon generates the mocks of the watched headers on request, and only rewrites the
+        mocks of headers that changed on the following requests.
+
+        **Validation:**
+        1. The first request writes the mock of the watched header.
+        2. A second request writes nothing.
+        3. Adding a header through a request writes its mock only.
+        4. Unknown commands are answered with an error.
+        """
+        socket_path = self.start_server()
+        self.assertEqual(send_request({'command': 'ping'}, socket_path, timeout=10), {'status': 'ok'})
+
+        response = send_request({'command': 'regenerate'}, socket_path, timeout=30)
+        self.assertEqual(response['status'], 'ok')
+        self.assertEqual(response['mock_files'], [os.path.join(self.output_directory, 'test_class_mock.h')])
+
+        response = send_request({'command': 'regenerate'}, socket_path, timeout=30)
+        self.assertEqual(response['mock_files'], [])
+
+        namespace_header = os.path.abspath(os.path.join('test_files', 'test_namespace.h'))
+        response = send_request({'command': 'regenerate', 'headers': [namespace_header]}, socket_path, timeout=30)
+        self.assertEqual(response['mock_files'], [os.path.join(self.output_directory, 'test_namespace_mock.h')])
+
+        self.assertEqual(send_request({'command': 'unknown'}, socket_path, timeout=10)['status'], 'error')
+
+    def test_socket_is_private(self):
+        """
+        **Test Name:** `test_socket_is_private`
+
+        **Purpose:**
+        To verify that only the owner of the daemon can connect to its socket, and that a second daemon cannot take
+        over a socket in use.
+        """
+        socket_path = self.start_server()
+        self.assertEqual(stat.S_IMODE(os.stat(socket_path).st_mode), 0o600)
+        with self.assertRaises(OSError):
+            MockServer(self.mock_daemon, socket_path)
+
+    def test_mock_request(self):
+        """
+        **Test Name:** `test_mock_request`
+
+        **Purpose:**
+        To verify that the daemon answers the mock text of a header sent in the request, writing no file, and
+        only keeps the translation units of served headers.
+        """
+        socket_path = self.start_server()
+        header_file = os.path.join(self.temporary_directory.name, 'unsaved.h')
+        source = "class Unsaved {\npublic:\n    virtual bool check(int value) const = 0;\n};\n"
+        response = send_request({'command': 'mock', 'sources': {header_file: source}}, socket_path, timeout=30)
+
+        self.assertEqual(response['status'], 'ok')
+        self.assertIn("MOCK_METHOD(bool, check, (int value), (const, override));", response['mocks'][header_file])
+        self.assertFalse(os.path.exists(header_file))
+        self.assertFalse(os.path.exists(self.output_directory + '/unsaved_mock.h'))
+        self.assertNotIn(header_file, self.mock_daemon.parser.translation_units)
+
+    def test_watch_regenerates_changed_headers(self):
+        """
+        **Test Name:** `test_watch_regenerates_changed_headers`
+
+        **Purpose:**
+        To verify that a header added to a watched directory gets its mock without any request.
+        """
+        self.start_server(watch_interval=0.05)
+        mock_file = os.path.join(self.output_directory, 'interface_mock.h')
+        with open(os.path.join(self.header_directory, 'interface.h'), 'w') as f:
+            f.write("class Interface {\npublic:\n    virtual int run(int count) = 0;\n};\n")
+
+        expected_method = "MOCK_METHOD(int, run, (int count), (override));"
+        content = ''
+        for _ in range(200):
+            if os.path.exists(mock_file):
+                with open(mock_file) as f:
+                    content = f.read()
+                if expected_method in content:
+                    break
+            threading.Event().wait(0.05)
+        self.assertIn(expected_method, content)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import unittest
+import os
+import pickle
+import tempfile
+from unittest import mock
+from cppparser import CppParser
+from diagnostics import DiagnosticsError, check_diagnostics, format_diagnostic, format_summary, summarize_diagnostics
+from main import parse_cached
+from parse_cache import ParseCache
+
+BROKEN_HEADER = """\
+class Interface {
+public:
+    virtual int method(undefined_t value);
+};
+int first = ;
+int second = ;
+#warning incomplete header
+"""
+
+def diagnostic(severity, message, line=1):
+    return {'severity': severity, 'file': 'header.h', 'line': line, 'column': 1, 'message': message, 'option': ''}
+
+class TestDiagnostics(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+        self.header = os.path.join(self.temporary_directory.name, 'broken.h')
+        with open(self.header, 'w') as file:
+            file.write(BROKEN_HEADER)
+
+    def test_check_diagnostics(self):
+        """
+        **Test Name:** `test_check_diagnostics`
+
+        **Purpose:**
+        To verify that the error budget counts errors and fatal errors, and that `fail_fast` only stops at fatal errors.
+
+        **Validation:**
+        1. Warnings never count against the budget.
+        2. Two errors exceed a budget of 1 but not a budget of 2.
+        3. With `fail_fast`, errors are let through but a fatal error raises.
+        4. The fatal error clang stops with once it reaches its error limit is reported but not counted.
+        """
+        warnings = [diagnostic('warning', 'unused')] * 3
+        check_diagnostics('header.h', warnings, error_budget=0, fail_fast=True)
+
+        errors = [diagnostic('error', 'expected expression'), diagnostic('fatal', 'file not found', 2)]
+        check_diagnostics('header.h', errors, error_budget=2)
+        with self.assertRaises(DiagnosticsError) as context:
+            check_diagnostics('header.h', errors + warnings, error_budget=1)
+        self.assertEqual(context.exception.diagnostics, errors)
+
+        check_diagnostics('header.h', errors[:1], fail_fast=True)
+        with self.assertRaises(DiagnosticsError):
+            check_diagnostics('header.h', errors, fail_fast=True)
+
+        error_limit = {**diagnostic('fatal', 'too many errors emitted, stopping now'), 'option': '-ferror-limit='}
+        check_diagnostics('header.h', errors + [error_limit], error_budget=2, fail_fast=False)
+        with self.assertRaises(DiagnosticsError) as context:
+            check_diagnostics('header.h', errors + [error_limit], error_budget=1)
+        self.assertEqual(context.exception.reason, "2 errors, over the budget of 1")
+        self.assertEqual(context.exception.diagnostics, errors + [error_limit])
+
+    def test_error_is_picklable(self):
+        """
+        **Test Name:** `test_error_is_picklable`
+
+        **Purpose:**
+        To verify that a `DiagnosticsError` raised in a worker process reaches the main process intact.
+        """
+        error = DiagnosticsError('header.h', 'fatal error', [diagnostic('fatal', 'file not found')])
+        copy = pickle.loads(pickle.dumps(error))
+        self.assertEqual((copy.file_path, copy.reason, copy.diagnostics), (error.file_path, error.reason, error.diagnostics))
+        self.assertEqual(str(copy), "header.h: fatal error\n    header.h:1:1: fatal: file not found")
+
+    def test_summary(self):
+        """
+        **Test Name:** `test_summary`
+
+        **Purpose:**
+        To verify that diagnostics are counted by severity per header and overall, and formatted from the most severe.
+        """
+        summary = summarize_diagnostics({
+            'a.h': [diagnostic('warning', 'unused'), diagnostic('error', 'expected expression', 2)],
+            'b.h': [diagnostic('error', 'unknown type name')],
+            'c.h': [],
+        })
+        self.assertEqual(summary['counts'], {'warning': 1, 'error': 2})
+        self.assertEqual(summary['files']['a.h']['counts'], {'warning': 1, 'error': 1})
+        self.assertEqual(format_diagnostic(summary['files']['b.h']['diagnostics'][0]),
+                         "header.h:1:1: error: unknown type name")
+
+        report = format_summary(summary)
+        self.assertIn("a.h: 1 error, 1 warning", report)
+        self.assertNotIn("c.h", report)
+        self.assertTrue(report.endswith("Total: 2 errors, 1 warning"))
+
+    def test_parser_collects_diagnostics(self):
+        """
+        **Test Name:** `test_parser_collects_diagnostics`
+
+        **Purpose:**
+        To verify that the parser keeps the diagnostics of a header at or above the configured severity,
+        and still extracts what clang recovered when no budget is set.
+        """
+        parser = CppParser()
+        parsed_data = parser.parse_header([self.header])
+        self.assertEqual([item['name'] for item in parsed_data if item['type'] == 'Class'], ['Interface'])
+        severities = [item['severity'] for item in parser.diagnostics[self.header]]
+        self.assertEqual(severities, ['error', 'error', 'error', 'warning'])
+
+        parser = CppParser(diagnostic_severity='error')
+        parser.parse_header([self.header])
+        self.assertEqual(len(parser.diagnostics[self.header]), 3)
+
+    def test_parser_error_budget(self):
+        """
+        **Test Name:** `test_parser_error_budget`
+
+        **Purpose:**
+        To verify that a header over the error budget raises before any declaration is processed, clang
+        stopping as soon as the budget is exceeded.
+        """
+        parser = CppParser(error_budget=1)
+        with self.assertRaises(DiagnosticsError) as context:
+            parser.parse_header([self.header])
+        self.assertEqual(context.exception.file_path, self.header)
+        self.assertEqual(context.exception.diagnostics[-1]['severity'], 'fatal')
+        self.assertEqual(context.exception.reason, "2 errors, over the budget of 1")
+        self.assertEqual(parser.processed_classes, {})
+
+        with self.assertRaises(DiagnosticsError):
+            CppParser(fail_fast=True).parse_header([self.header])
+        CppParser(error_budget=3).parse_header([self.header])
+
+    def test_cached_diagnostics_are_replayed(self):
+        """
+        **Test Name:** `test_cached_diagnostics_are_replayed`
+
+        **Purpose:**
+        To verify that a header found in the parse cache reports the diagnostics of the parse that cached it.
+
+        **Validation:**
+        1. A second parser reading the cached header, without parsing it, gets the same diagnostics.
+        2. The diagnostics are still checked against the error budget.
+        """
+        cache = ParseCache(os.path.join(self.temporary_directory.name, 'cache'))
+        parser = CppParser(error_budget=3)
+        parsed_data = parse_cached(self.header, parser, cache)
+
+        cached_parser = CppParser(error_budget=3)
+        with mock.patch.object(CppParser, 'parse_header', side_effect=AssertionError("parsed again")), \
+             mock.patch('cppparser.check_diagnostics') as check:
+            self.assertEqual(parse_cached(self.header, cached_parser, cache), parsed_data)
+        self.assertEqual(cached_parser.diagnostics, parser.diagnostics)
+        self.assertEqual(len(cached_parser.diagnostics[self.header]), 4)
+        check.assert_called_once_with(self.header, parser.checked_diagnostics[self.header], 3, False)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,25 @@
 import unittest
+import argparse
 import os
+import shutil
+import subprocess
+import tempfile
+from unittest import mock
+import gtest_mock_generator
 from cppparser import CppParser
-from gtest_mock_generator import GMockGenerator
+from gtest_mock_generator import GMockGenerator, MockTemplates, check_mock_layout, mock_layout_argument, update_mocks
+
+def gmock_compiler():
+    """Get a C++ compiler able to compile gMock headers, or None if there is none."""
+    if not hasattr(gmock_compiler, 'compiler'):
+        gmock_compiler.compiler = None
+        for compiler in filter(None, map(shutil.which, ('g++', 'clang++'))):
+            probe = subprocess.run([compiler, '-std=c++14', '-fsyntax-only', '-x', 'c++', '-'],
+                                   input='#include <gmock/gmock.h>\n', capture_output=True, text=True)
+            if probe.returncode == 0:
+                gmock_compiler.compiler = compiler
+                break
+    return gmock_compiler.compiler
 
 class TestGMockGenerator(unittest.TestCase):
     def setUp(self):
@@ -11,21 +29,29 @@ class TestGMockGenerator(unittest.TestCase):
         self.test_header_content = """
 class FriendClass;
 
+template <typename Key, typename Value>
+class Map {};
+
 class BaseClass {
 public:
     BaseClass() {}
+    virtual ~BaseClass() {}
+
+    virtual void publicMethod() {}
 
-    void publicMethod() {}
+    void nonVirtualMethod() {}
+
+    static BaseClass *create();
 
 protected:
     int protectedMember;
 
-    void protectedMethod() {}
+    virtual int protectedMethod(int value) const { return value; }
 
 private:
     double privateMember;
 
-    void privateMethod() {}
+    virtual void privateMethod() noexcept {}
 
     friend class FriendClass;
 };
@@ -34,76 +60,470 @@ class DerivedClass : public BaseClass {
 public:
     DerivedClass() {}
 
-    void derivedPublicMethod() {}
-
-protected:
-    void derivedProtectedMethod() {}
+    void publicMethod() override {}
 
-private:
-    void derivedPrivateMethod() {}
+    virtual void derivedPublicMethod() & {}
+    virtual void derivedPublicMethod() && {}
 
     friend class FriendClass;
 };
 
 class FriendClass {
 public:
-    FriendClass() {}
-
-    void friendMethod(BaseClass& base) {
-        base.privateMethod();  // Accessing private method of BaseClass
-    }
+    virtual Map<int, double> friendMethod(BaseClass& base, const Map<int, int>& values) = 0;
 
-    void friendMethod(DerivedClass& derived) {
-        derived.derivedPrivateMethod();  // Accessing private method of DerivedClass
-    }
+    virtual void friendMethod(DerivedClass& derived) = 0;
 };
 """
 
         self.expected_mock_content = """
-#ifndef MOCK_TEST_CLASS_H
-#define MOCK_TEST_CLASS_H
+#ifndef MOCK_TEST_CLASS_MOCK_H
+#define MOCK_TEST_CLASS_MOCK_H
 
 #include <gmock/gmock.h>
 
 class MockBaseClass : public BaseClass {
 public:
     MOCK_METHOD(void, publicMethod, (), (override));
+    MOCK_METHOD(int, protectedMethod, (int value), (const, override));
+    MOCK_METHOD(void, privateMethod, (), (noexcept, override));
 };
 
 class MockDerivedClass : public DerivedClass {
 public:
-    MOCK_METHOD(void, derivedPublicMethod, (), (override));
+    MOCK_METHOD(int, protectedMethod, (int value), (const, override));
+    MOCK_METHOD(void, privateMethod, (), (noexcept, override));
+    MOCK_METHOD(void, publicMethod, (), (override));
+    MOCK_METHOD(void, derivedPublicMethod, (), (ref(&), override));
+    MOCK_METHOD(void, derivedPublicMethod, (), (ref(&&), override));
 };
 
 class MockFriendClass : public FriendClass {
 public:
-    MOCK_METHOD(void, friendMethod, (BaseClass& base), (override));
-    MOCK_METHOD(void, friendMethod, (DerivedClass& derived), (override));
+    MOCK_METHOD((Map<int, double>), friendMethod, (BaseClass & base, (const Map<int, int> &) values), (override));
+    MOCK_METHOD(void, friendMethod, (DerivedClass & derived), (override));
 };
 
-#endif // MOCK_TEST_CLASS_H
+#endif // MOCK_TEST_CLASS_MOCK_H
 """
 
-    def create_test_header_file(self):
-        test_dir = 'tests'
-        header_path = os.path.join(test_dir, 'test_class.h')
-        if not os.path.exists(test_dir):
-            os.makedirs(test_dir)
-        with open(header_path, 'w') as f:
-            f.write(self.test_header_content)
-        return header_path
-
     def test_generate_mock_file(self):
-        header_path = self.create_test_header_file()
-        parsed_data = self.parser.parse_header([header_path])
+        """
+        **Test Name:** `test_generate_mock_file`
+
+        **Purpose:**
+        To verify that only virtual methods are mocked, inherited ones included, with the qualifiers of the mocked
+        method, overloads kept apart and types holding commas parenthesized.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            header_path = os.path.join(directory, 'test_class.h')
+            with open(header_path, 'w') as f:
+                f.write(self.test_header_content)
+            parsed_data = self.parser.parse_header([header_path])
 
-        output_file = 'tests/MockOutput.h'
-        self.generator.generate_mock_file(parsed_data, output_file)
+            output_file = os.path.join(directory, 'test_class_mock.h')
+            self.generator.generate_mock_file(parsed_data, output_file)
 
-        with open(output_file, 'r') as f:
-            generated_mock_content = f.read()
+            with open(output_file, 'r') as f:
+                generated_mock_content = f.read()
 
         self.assertEqual(generated_mock_content.strip(), self.expected_mock_content.strip())
 
+    def test_pure_virtual_and_static_methods(self):
+        """
+        **Test Name:** `test_pure_virtual_and_static_methods`
+
+        **Purpose:**
+        To verify that the parser tells pure virtual, virtual, static and non-virtual methods apart.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            header_path = os.path.join(directory, 'test_class.h')
+            with open(header_path, 'w') as f:
+                f.write(self.test_header_content)
+            parsed_data = self.parser.parse_header([header_path])
+
+        methods = {(item['name'], method['name']): method for item in parsed_data if item['type'] == 'Class'
+                   for method in item['methods']}
+        self.assertTrue(methods[('FriendClass', 'friendMethod')]['is_pure_virtual'])
+        self.assertFalse(methods[('BaseClass', 'publicMethod')]['is_pure_virtual'])
+        self.assertTrue(methods[('BaseClass', 'publicMethod')]['is_virtual'])
+        self.assertTrue(methods[('DerivedClass', 'publicMethod')]['is_virtual'])
+        self.assertFalse(methods[('BaseClass', 'nonVirtualMethod')]['is_virtual'])
+        self.assertTrue(methods[('BaseClass', 'create')]['is_static'])
+
+    def test_class_templates_and_structs(self):
+        """
+        **Test Name:** `test_class_templates_and_structs`
+
+        **Purpose:**
+        To verify that class templates get a mock template deriving from the same instantiation, and that structs
+        and class templates are only mocked if they have a mockable method.
+        """
+        header_content = """
+template <typename> struct Box;
+
+template <typename T, int N = 3, template <typename> class Holder = Box, typename... Options>
+class Repository {
+public:
+    virtual ~Repository() {}
+    virtual T load(int id) const = 0;
+    template <typename U> void convert(U u);
+};
+
+template <>
+class Repository<bool> {
+public:
+    virtual bool load(int id) const;
+};
+
+template <typename T>
+struct Box { T value; };
+
+struct Listener {
+    virtual void notify(int event) = 0;
+};
+
+struct Point { int x; int y; };
+"""
+        with tempfile.TemporaryDirectory() as directory:
+            header_path = os.path.join(directory, 'templates.h')
+            with open(header_path, 'w') as f:
+                f.write(header_content)
+            parsed_data = self.parser.parse_header([header_path])
+        classes = {item['name']: item for item in parsed_data if item['type'] == 'Class'}
+        self.assertEqual(classes['Repository']['template_parameters'],
+                         ['typename T', 'int N', 'template <typename> class Holder', 'typename ... Options'])
+        self.assertEqual([method['name'] for method in classes['Repository']['methods']], ['load'])
+        self.assertTrue(classes['Point']['is_struct'])
+
+        rendered = self.generator.render(parsed_data, 'GUARD')
+        self.assertIn("template <typename T, int N, template <typename> class Holder, typename ... Options>\n"
+                      "class MockRepository : public Repository<T, N, Holder, Options...> {\npublic:\n"
+                      "    MOCK_METHOD(T, load, (int id), (const, override));\n};", rendered)
+        self.assertIn("class MockListener : public Listener {", rendered)
+        self.assertNotIn("MockBox", rendered)
+        self.assertNotIn("MockPoint", rendered)
+        self.assertEqual(rendered.count("class MockRepository"), 1)
+
+    def test_namespaced_and_nested_classes(self):
+        """
+        **Test Name:** `test_namespaced_and_nested_classes`
+
+        **Purpose:**
+        To verify that mocks are declared in the namespaces of their classes, so same-named classes of different
+        namespaces get mocks that do not clash, and that public nested classes and structs are mocked too.
+
+        **Validation:**
+        1. Classes get the qualified name of their namespaces and outer classes.
+        2. Each mock is wrapped in its namespaces and derives from the name of its class relative to them.
+        3. A class nested in a class template is mocked by a template deriving from the nested class of the
+           same instantiation; a class template nested in it is skipped.
+        4. Classes of anonymous namespaces are not mocked.
+        """
+        header_content = """
+namespace a {
+class Widget {
+public:
+    virtual void draw();
+};
+}
+
+namespace b {
+class Widget : public a::Widget {
+public:
+    virtual void resize(int width);
+
+    struct Part {
+        virtual int id() const = 0;
+    };
+};
+
+class Gadget : public Widget::Part {};
+}
+
+namespace {
+class Hidden {
+public:
+    virtual void hide();
+};
+}
+
+template <typename T>
+class List {
+public:
+    class Node {
+    public:
+        virtual T get();
+    };
+
+    template <typename U>
+    class Converter {
+    public:
+        virtual U convert(T value);
+    };
+};
+"""
+        with tempfile.TemporaryDirectory() as directory:
+            header_path = os.path.join(directory, 'widgets.h')
+            with open(header_path, 'w') as f:
+                f.write(header_content)
+            parsed_data = self.parser.parse_header([header_path])
+        b_classes = [item for item in parsed_data if item['name'] == 'b'][0]['children']
+        self.assertEqual([item['qualified_name'] for item in b_classes if item['type'] == 'Class'],
+                         ['b::Widget', 'b::Widget::Part', 'b::Gadget'])
+
+        rendered = self.generator.render(parsed_data, 'GUARD')
+        self.assertIn("namespace a {\n\nclass MockWidget : public Widget {\npublic:\n"
+                      "    MOCK_METHOD(void, draw, (), (override));\n};\n\n}  // namespace a\n\n"
+                      "namespace b {\n\nclass MockWidget : public Widget {", rendered)
+        self.assertIn("class MockWidget_Part : public Widget::Part {\npublic:\n"
+                      "    MOCK_METHOD(int, id, (), (const, override));\n};", rendered)
+        self.assertIn("class MockGadget : public Gadget {", rendered)
+        self.assertIn("template <typename T>\nclass MockList_Node : public List<T>::Node {\npublic:\n"
+                      "    MOCK_METHOD(T, get, (), (override));\n};\n\n#endif // GUARD\n", rendered)
+        self.assertIn("};\n\n}  // namespace b\n\ntemplate <typename T>\n", rendered)
+        self.assertNotIn("Converter", rendered)
+        self.assertNotIn("Hidden", rendered)
+
+    def compile_mocks(self, header_content, mock_names):
+        """Parse a header, generate its mocks and compile them along with an instance of each of `mock_names`,
+        returning the mock header."""
+        compiler = gmock_compiler()
+        if compiler is None:
+            self.skipTest("No C++ compiler with gMock")
+        with tempfile.TemporaryDirectory() as directory:
+            header_path = os.path.join(directory, 'interfaces.h')
+            with open(header_path, 'w') as f:
+                f.write(header_content)
+            mock_path = os.path.join(directory, 'interfaces_mock.h')
+            self.generator.generate_mock_file(self.parser.parse_header([header_path]), mock_path)
+            source_path = os.path.join(directory, 'test.cpp')
+            with open(source_path, 'w') as f:
+                f.write('#include "interfaces.h"\n#include "interfaces_mock.h"\n')
+                f.write(''.join(f"{mock_name} instance{index};\n" for index, mock_name in enumerate(mock_names)))
+            result = subprocess.run([compiler, '-std=c++14', '-fsyntax-only', source_path], capture_output=True, text=True)
+            with open(mock_path) as f:
+                mock_text = f.read()
+        self.assertEqual(result.returncode, 0, result.stderr + mock_text)
+        return mock_text
+
+    def test_unmockable_declarations_compile(self):
+        """
+        **Test Name:** `test_unmockable_declarations_compile`
+
+        **Purpose:**
+        To verify that the generated mocks compile for classes declaring operators, `final` methods, function
+        pointer and array parameters, and that `final` classes are not mocked.
+
+        **Validation:**
+        1. The mock header compiles with gMock, and the mocks can be instantiated.
+        2. Operators and `final` methods are not mocked, and neither is a `final` class.
+        3. A function pointer or array parameter is declared without its name.
+        """
+        header_content = """
+class Callbacks {
+public:
+    virtual ~Callbacks() {}
+    virtual bool operator==(const Callbacks &other) const { return this == &other; }
+    virtual void subscribe(void (*callback)(int, int), int values[4]) = 0;
+    virtual int count() const = 0;
+};
+
+class Sealed final : public Callbacks {
+public:
+    void subscribe(void (*callback)(int, int), int values[4]) override {}
+    int count() const override { return 0; }
+};
+
+class Partial : public Callbacks {
+public:
+    int count() const final { return 1; }
+    virtual void reset() = 0;
+};
+"""
+        mock_text = self.compile_mocks(header_content, ['MockCallbacks', 'MockPartial'])
+        self.assertIn("MOCK_METHOD(void, subscribe, (void (*)(int, int), int[4]), (override));", mock_text)
+        self.assertNotIn("operator", mock_text)
+        self.assertNotIn("MockSealed", mock_text)
+        self.assertNotIn("MOCK_METHOD(int, count", mock_text.split("class MockPartial")[1])
+
+    def test_instantiated_template_bases_and_packs_compile(self):
+        """
+        **Test Name:** `test_instantiated_template_bases_and_packs_compile`
+
+        **Purpose:**
+        To verify that the mock of a class deriving from an instantiation of a class template compiles, and
+        that methods expanding a parameter pack are not mocked.
+
+        **Validation:**
+        1. The mock header compiles with gMock, and the mocks can be instantiated.
+        2. `MockIntRepo` mocks the methods inherited from `Repo<int, 4>` with the template arguments.
+        3. `MockSink` mocks `flush` but not `take(Ts... args)`.
+        """
+        header_content = """
+namespace store {
+template <typename T, int N>
+class Repo {
+public:
+    virtual ~Repo() {}
+    virtual void put(const T &value, int slot) = 0;
+    virtual T get(int slot) const = 0;
+};
+
+class IntRepo : public Repo<int, 4> {
+public:
+    virtual void clear() = 0;
+};
+
+template <typename... Ts>
+class Sink {
+public:
+    virtual ~Sink() {}
+    virtual void take(Ts... args) {}
+    virtual void flush() = 0;
+};
+}
+"""
+        mock_text = self.compile_mocks(header_content, ['store::MockIntRepo', 'store::MockSink<int, char>'])
+        int_repo_mock = mock_text.split("class MockIntRepo")[1].split("};")[0]
+        self.assertIn("MOCK_METHOD(void, put, (const int & value, int slot), (override));", int_repo_mock)
+        self.assertIn("MOCK_METHOD(int, get, (int slot), (const, override));", int_repo_mock)
+        self.assertNotIn("take", mock_text)
+        self.assertIn("MOCK_METHOD(void, flush, (), (override));", mock_text)
+
+    def test_custom_templates(self):
+        """
+        **Test Name:** `test_custom_templates`
+
+        **Purpose:**
+        To verify that the templates of a mock header can be replaced, and that a template using an unknown
+        field is rejected when the templates are compiled.
+
+        **Validation:**
+        1. Methods and parameters are rendered with the custom templates, braces and quotes included.
+        2. Unknown templates and fields raise a `ValueError`.
+        """
+        virtual = {'is_virtual': True, 'is_static': False, 'is_const': False}
+        parsed_data = [{'type': 'Function', 'name': 'ignored', 'return_type': 'void', 'parameters': []},
+                       {'type': 'Class', 'name': 'Shape', 'methods': [
+                           {'name': 'area', 'return_type': 'double', 'parameters': [], **virtual},
+                           {'name': 'scale', 'return_type': 'void',
+                            'parameters': [{'name': 'x', 'type': 'double'}, {'name': 'y', 'type': 'double'}], **virtual}]}]
+        templates = MockTemplates(method="  // '{name}' {{{return_type}}}: {parameters}", parameter="{name}:{type}",
+                                  parameter_separator=" | ")
+        rendered = GMockGenerator(templates).render(parsed_data, 'GUARD')
+
+        self.assertIn("class MockShape : public Shape {\npublic:\n"
+                      "  // 'area' {double}: \n"
+                      "  // 'scale' {void}: x:double | y:double\n};", rendered)
+        self.assertNotIn('ignored', rendered)
+
+        with self.assertRaises(ValueError):
+            MockTemplates(methods="{name}")
+        with self.assertRaises(ValueError):
+            MockTemplates(parameter="{type} {name} = {default}")
+        with self.assertRaises(ValueError):
+            MockTemplates(parameter="{type!r} {name}")
+
+    def test_generate_mock_files(self):
+        """
+        **Test Name:** `test_generate_mock_files`
+
+        **Purpose:**
+        To verify that one generator writes several mock files in a run, each with its own header guard.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            mock_files = [([{'type': 'Class', 'name': name, 'methods': []}], os.path.join(directory, f"{name}_mock.h"))
+                          for name in ('First', 'Second')]
+            self.generator.generate_mock_files(mock_files)
+
+            with open(os.path.join(directory, 'Second_mock.h')) as f:
+                self.assertEqual(f.read(), "#ifndef MOCK_SECOND_MOCK_H\n#define MOCK_SECOND_MOCK_H\n\n"
+                                           "#include <gmock/gmock.h>\n\n"
+                                           "class MockSecond : public Second {\npublic:\n\n};\n\n"
+                                           "#endif // MOCK_SECOND_MOCK_H\n")
+            self.assertTrue(os.path.exists(os.path.join(directory, 'First_mock.h')))
+
+    def test_update_mocks_when_generator_changes(self):
+        """
+        **Test Name:** `test_update_mocks_when_generator_changes`
+
+        **Purpose:**
+        To verify that mocks recorded as current are kept for the same class data, but regenerated once the
+        generator version or the templates change.
+        """
+        parsed_data = [{'type': 'Class', 'name': 'Shape', 'methods': []}]
+        with tempfile.TemporaryDirectory() as directory:
+            entry = {'file': 'shape.h', 'output_file': os.path.join(directory, 'shape_output.yaml')}
+            self.assertEqual(update_mocks(entry, parsed_data, directory), [os.path.join(directory, 'shape_mock.h')])
+            self.assertEqual(update_mocks(entry, parsed_data, directory), [])
+
+            with mock.patch.object(gtest_mock_generator, 'GENERATOR_VERSION', 'next'):
+                self.assertEqual(len(update_mocks(entry, parsed_data, directory)), 1)
+            self.assertEqual(len(update_mocks(entry, parsed_data, directory)), 1)
+            templates = MockTemplates(class_close="\n}}; // {mock_name}")
+            self.assertEqual(len(update_mocks(entry, parsed_data, directory, mock_generator=GMockGenerator(templates))), 1)
+
+    def test_generate_class_mock_files(self):
+        """
+        **Test Name:** `test_generate_class_mock_files`
+
+        **Purpose:**
+        To verify that each class mock is written to its own header following the layout, that an umbrella header
+        includes them all, and that the header of an unchanged class is not rewritten.
+
+        **Validation:**
+        1. One header per class is written, with a header guard derived from its path.
+        2. The umbrella header includes the class headers by their relative path.
+        3. Changing one class only rewrites the header of that class.
+        """
+        run = {'name': 'run', 'return_type': 'void', 'parameters': [], 'is_virtual': True, 'is_static': False, 'is_const': False}
+        parsed_data = [{'type': 'Class', 'name': name, 'methods': [run]} for name in ('First', 'Second')]
+        with tempfile.TemporaryDirectory() as directory:
+            umbrella_file = os.path.join(directory, 'interfaces_mock.h')
+            first_file, second_file = self.generator.generate_class_mock_files(parsed_data, directory, '{header}/Mock{name}.h',
+                                                                               'interfaces', umbrella_file)
+            self.assertEqual(first_file, os.path.join(directory, 'interfaces', 'MockFirst.h'))
+            with open(first_file) as f:
+                self.assertTrue(f.read().startswith("#ifndef MOCK_INTERFACES_MOCKFIRST_H\n"))
+            with open(umbrella_file) as f:
+                self.assertIn('#include "interfaces/MockFirst.h"\n#include "interfaces/MockSecond.h"\n', f.read())
+
+            os.utime(first_file, ns=(0, 0))
+            os.utime(second_file, ns=(0, 0))
+            parsed_data[1]['methods'] = []
+            self.generator.generate_class_mock_files(parsed_data, directory, '{header}/Mock{name}.h', 'interfaces')
+            self.assertEqual(os.stat(first_file).st_mtime_ns, 0)
+            self.assertNotEqual(os.stat(second_file).st_mtime_ns, 0)
+
+    def test_invalid_layouts_and_clashing_class_mock_files(self):
+        """
+        **Test Name:** `test_invalid_layouts_and_clashing_class_mock_files`
+
+        **Purpose:**
+        To verify that an invalid mock layout is reported before anything is written, as a usage error on the
+        command line, and that two classes whose mocks would be written to the same header are reported.
+
+        **Validation:**
+        1. Layouts with an unknown field, a format spec, an unbalanced brace or no `{name}` are rejected.
+        2. `a::B_C` and the nested class `a::B::C` are reported as clashing, and no mock header is written.
+        """
+        self.assertEqual(check_mock_layout('{header}/Mock{name}.h'), '{header}/Mock{name}.h')
+        for layout in ('{header}/{class}.h', '{name:>10}.h', '{name}}.h', '{header}_mock.h'):
+            with self.assertRaises(ValueError):
+                check_mock_layout(layout)
+        with self.assertRaisesRegex(argparse.ArgumentTypeError, r"unsupported field \{class\}"):
+            mock_layout_argument('{header}/{class}.h')
+
+        run = {'name': 'run', 'return_type': 'void', 'parameters': [], 'is_virtual': True, 'is_static': False, 'is_const': False}
+        parsed_data = [{'type': 'Namespace', 'name': 'a', 'children': [
+            {'type': 'Class', 'name': 'B_C', 'qualified_name': 'a::B_C', 'methods': [run]},
+            {'type': 'Class', 'name': 'C', 'qualified_name': 'a::B::C', 'methods': [run]},
+        ]}]
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaisesRegex(ValueError, "a::B_C and a::B::C would both be written to"):
+                self.generator.generate_class_mock_files(parsed_data, directory, '{header}/Mock{name}.h', 'interfaces')
+            self.assertEqual(os.listdir(directory), [])
+
 if __name__ == '__main__':
     unittest.main()
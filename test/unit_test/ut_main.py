@@ -0,0 +1,167 @@
+import unittest
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+import profiling
+from main import consolidate_all, consolidate_ready, main, parse_all, parse_arguments
+from manifest import load_manifest
+from serialization import load_parsed_data
+
+HEADERS = {
+    'derived.h': '#include "base.h"\nclass Derived : public Base {\npublic:\n    virtual void stop();\n};\n',
+    'base.h': 'class Base {\npublic:\n    virtual int start(int speed) = 0;\n};\n',
+    'other.h': 'class Other {\npublic:\n    virtual bool ready() const;\n};\n',
+}
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+        self.header_files = []
+        for name, content in HEADERS.items():
+            header_file = os.path.join(self.temporary_directory.name, name)
+            with open(header_file, 'w') as f:
+                f.write(content)
+            self.header_files.append(header_file)
+        self.output_directory = os.path.join(self.temporary_directory.name, 'outputs')
+        self.parent_output_file = os.path.join(self.output_directory, 'parent_output.yaml')
+
+    def test_consolidate_ready_waits_for_included_headers(self):
+        """
+        **Test Name:** `test_consolidate_ready_waits_for_included_headers`
+
+        **Purpose:**
+        To verify that a header is only consolidated once the headers it includes are parsed, giving the same
+        result as `consolidate_all`.
+
+        **Validation:**
+        1. `derived.h`, listed before the `base.h` it includes, waits for it.
+        2. A header whose includes are unknown waits for all the others.
+        3. The consolidated data matches `consolidate_all`.
+        """
+        derived_header, base_header, other_header = self.header_files
+        parsed_files = parse_all(self.header_files)
+        includes = [[base_header], [], []]
+        parsed_items = list(zip(self.header_files, parsed_files, includes))
+
+        consolidated = list(consolidate_ready(parsed_items, self.header_files))
+        self.assertEqual([header_file for header_file, _ in consolidated], [derived_header, base_header, other_header])
+        self.assertEqual(dict(consolidated), dict(zip(self.header_files, consolidate_all(parsed_files))))
+
+        parsed_items[0] = (derived_header, parsed_files[0], None)
+        consolidated = list(consolidate_ready(parsed_items, self.header_files))
+        self.assertEqual([header_file for header_file, _ in consolidated], [base_header, other_header, derived_header])
+
+    def test_parse_all_with_worker_processes(self):
+        """
+        **Test Name:** `test_parse_all_with_worker_processes`
+
+        **Purpose:**
+        To verify that parsing the headers across worker processes gives the same result as a serial run.
+
+        **Validation:**
+        1. `parse_all` with 2 jobs returns the parsed data of every header, in the order of the headers.
+        2. The diagnostics of every header are gathered from the workers.
+        """
+        serial_diagnostics = {}
+        parallel_diagnostics = {}
+        serial = parse_all(self.header_files, jobs=1, diagnostics=serial_diagnostics)
+        parallel = parse_all(self.header_files, jobs=2, diagnostics=parallel_diagnostics)
+
+        self.assertEqual(parallel, serial)
+        self.assertEqual([[item['name'] for item in parsed_data] for parsed_data in parallel],
+                         [['Derived'], ['Base'], ['Other']])
+        self.assertEqual(parallel_diagnostics, serial_diagnostics)
+        self.assertEqual(list(parallel_diagnostics), self.header_files)
+
+    def test_main_pipeline(self):
+        """
+        **Test Name:** `test_main_pipeline`
+
+        **Purpose:**
+        To verify that `main` saves the consolidated outputs, mocks and a manifest in the order of the headers,
+        and leaves everything untouched when run again.
+        """
+        main(self.header_files, self.output_directory, self.parent_output_file)
+
+        entries = load_manifest(self.parent_output_file)
+        self.assertEqual([entry['file'] for entry in entries], self.header_files)
+        derived_data = load_parsed_data(entries[0]['output_file'])
+        self.assertEqual([method['name'] for method in derived_data[0]['methods']], ['start', 'stop'])
+        with open(os.path.join(self.output_directory, 'derived_mock.h')) as f:
+            self.assertIn("MOCK_METHOD(int, start, (int speed), (override));", f.read())
+
+        mtimes = {name: os.stat(os.path.join(self.output_directory, name)).st_mtime_ns
+                  for name in os.listdir(self.output_directory)}
+        main(self.header_files, self.output_directory, self.parent_output_file)
+        self.assertEqual(load_manifest(self.parent_output_file), entries)
+        self.assertEqual({name: os.stat(os.path.join(self.output_directory, name)).st_mtime_ns
+                          for name in os.listdir(self.output_directory)}, mtimes)
+
+    def test_main_pipeline_with_worker_processes(self):
+        """
+        **Test Name:** `test_main_pipeline_with_worker_processes`
+
+        **Purpose:**
+        To verify that with several jobs, the pool of worker processes is created, fed and shut down by the
+        main thread, the pipeline only consuming its results, and that consolidation is profiled.
+
+        **Validation:**
+        1. The manifest lists the headers in order, as in a serial run.
+        2. Every header is submitted to the pool, and the pool shut down, from the main thread.
+        3. The profiler records a `consolidate` stage for each header.
+        """
+        threads = []
+
+        def record_thread(original):
+            def wrapper(*args, **kwargs):
+                threads.append(threading.current_thread())
+                return original(*args, **kwargs)
+            return wrapper
+
+        recorder = profiling.enable()
+        self.addCleanup(profiling.disable)
+        with mock.patch.object(ProcessPoolExecutor, 'submit', record_thread(ProcessPoolExecutor.submit)), \
+             mock.patch.object(ProcessPoolExecutor, 'shutdown', record_thread(ProcessPoolExecutor.shutdown)):
+            main(self.header_files, self.output_directory, self.parent_output_file, jobs=2)
+
+        self.assertEqual([entry['file'] for entry in load_manifest(self.parent_output_file)], self.header_files)
+        self.assertGreaterEqual(len(threads), len(self.header_files) + 1)
+        self.assertTrue(all(thread is threading.main_thread() for thread in threads))
+        consolidated_files = {record[1] for record in recorder.records if record[0] == 'consolidate'}
+        self.assertEqual(consolidated_files, set(self.header_files))
+
+    def test_precompiled_prelude_requires_common_flags(self):
+        """
+        **Test Name:** `test_precompiled_prelude_requires_common_flags`
+
+        **Purpose:**
+        To verify that a precompiled prelude is rejected along with a compilation database, whose per-directory
+        flags clang would not load the PCH with, before anything is parsed.
+        """
+        with open(os.devnull, 'w') as devnull, mock.patch('sys.stderr', devnull):
+            with self.assertRaises(SystemExit):
+                parse_arguments(['--pch', 'prelude.h', '-p', 'build', 'header.h'])
+        with self.assertRaises(ValueError):
+            main(self.header_files, self.output_directory, self.parent_output_file,
+                 parser_options={'compilation_database': 'build'}, precompiled_prelude='prelude.h')
+        self.assertFalse(os.path.exists(self.parent_output_file))
+
+    def test_invalid_mock_layout_is_a_usage_error(self):
+        """
+        **Test Name:** `test_invalid_mock_layout_is_a_usage_error`
+
+        **Purpose:**
+        To verify that a mock layout using an unknown field is rejected with the arguments, rather than failing in
+        the middle of a run.
+        """
+        self.assertEqual(parse_arguments(['--mock-layout', '{header}/Mock{name}.h', 'header.h']).mock_layout,
+                         '{header}/Mock{name}.h')
+        with open(os.devnull, 'w') as devnull, mock.patch('sys.stderr', devnull):
+            with self.assertRaises(SystemExit):
+                parse_arguments(['--mock-layout', '{header}/{class}.h', 'header.h'])
+
+if __name__ == '__main__':
+    unittest.main()
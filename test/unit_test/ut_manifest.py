@@ -0,0 +1,62 @@
+import unittest
+import os
+import tempfile
+from manifest import file_digest, file_mtime, input_digest, load_manifest, save_manifest, write_if_changed
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+        self.file_path = os.path.join(self.temporary_directory.name, 'header.h')
+
+    def test_write_if_changed(self):
+        """
+        **Test Name:** `test_write_if_changed`
+
+        **Purpose:**
+        To verify that a file is only rewritten when its content changes, so its mtime is preserved otherwise.
+
+        **Validation:**
+        1. The first write creates the file.
+        2. Writing the same content again does not touch the file.
+        3. Writing different content rewrites it.
+        """
+        self.assertTrue(write_if_changed(self.file_path, 'int a;\n'))
+        os.utime(self.file_path, ns=(0, 0))
+        self.assertFalse(write_if_changed(self.file_path, 'int a;\n'))
+        self.assertEqual(file_mtime(self.file_path), 0)
+        self.assertTrue(write_if_changed(self.file_path, 'int b;\n'))
+        self.assertNotEqual(file_mtime(self.file_path), 0)
+
+    def test_input_digest_reuses_previous_hash(self):
+        """
+        **Test Name:** `test_input_digest_reuses_previous_hash`
+
+        **Purpose:**
+        To verify that the hash recorded in the previous manifest entry is reused while the input mtime is unchanged.
+        """
+        write_if_changed(self.file_path, 'int a;\n')
+        previous_entry = {'file_hash': 'previous', 'file_mtime': file_mtime(self.file_path)}
+        self.assertEqual(input_digest(self.file_path, previous_entry), 'previous')
+
+        previous_entry['file_mtime'] -= 1
+        self.assertEqual(input_digest(self.file_path, previous_entry), file_digest(self.file_path))
+
+    def test_manifest_round_trip(self):
+        """
+        **Test Name:** `test_manifest_round_trip`
+
+        **Purpose:**
+        To verify that a saved manifest loads back unchanged and that a missing manifest loads as empty.
+        """
+        manifest_file = os.path.join(self.temporary_directory.name, 'parent_output.yaml')
+        self.assertEqual(load_manifest(manifest_file), [])
+
+        entries = [{'file': 'test/base.h', 'output_file': 'outputs/base_output.yaml',
+                    'file_hash': 'abc', 'file_mtime': 1, 'output_mtime': 2}]
+        self.assertTrue(save_manifest(entries, manifest_file))
+        self.assertFalse(save_manifest(entries, manifest_file))
+        self.assertEqual(load_manifest(manifest_file), entries)
+
+if __name__ == '__main__':
+    unittest.main()
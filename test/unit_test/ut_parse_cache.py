@@ -0,0 +1,76 @@
+import unittest
+import os
+import tempfile
+from parse_cache import ParseCache
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+        self.cache = ParseCache(os.path.join(self.temporary_directory.name, 'cache'))
+        self.header_path = self.write_file('header.h', 'int testFunction(int a);\n')
+        self.include_path = self.write_file('include.h', 'typedef int TestType;\n')
+        self.parsed_data = [{'type': 'Function', 'name': 'testFunction', 'return_type': 'int',
+                             'parameters': [{'name': 'a', 'type': 'int'}]}]
+
+    def write_file(self, name, content):
+        path = os.path.join(self.temporary_directory.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_load_returns_stored_data(self):
+        """
+        **Test Name:** `test_load_returns_stored_data`
+
+        **Purpose:**
+        To verify that data stored for an unchanged header is returned as is.
+
+        **Validation:**
+        1. A header that was never stored is a cache miss.
+        2. After `store`, `load` returns the stored data and diagnostics.
+        """
+        diagnostics = [{'severity': 'warning', 'file': self.header_path, 'line': 1, 'column': 1,
+                        'message': 'unused', 'option': '-Wunused'}]
+        self.assertIsNone(self.cache.load(self.header_path, 'signature'))
+        self.cache.store(self.header_path, 'signature', [self.include_path], self.parsed_data, diagnostics)
+        self.assertEqual(self.cache.load(self.header_path, 'signature'), (self.parsed_data, diagnostics))
+
+    def test_changed_header_invalidates_entry(self):
+        """
+        **Test Name:** `test_changed_header_invalidates_entry`
+
+        **Purpose:**
+        To verify that editing a header makes the cache miss.
+        """
+        self.cache.store(self.header_path, 'signature', [self.include_path], self.parsed_data)
+        self.write_file('header.h', 'int testFunction(int a, int b);\n')
+        self.assertIsNone(self.cache.load(self.header_path, 'signature'))
+
+    def test_changed_include_invalidates_entry(self):
+        """
+        **Test Name:** `test_changed_include_invalidates_entry`
+
+        **Purpose:**
+        To verify that editing or removing a transitively included file makes the cache miss.
+        """
+        self.cache.store(self.header_path, 'signature', [self.include_path], self.parsed_data)
+        self.write_file('include.h', 'typedef long TestType;\n')
+        self.assertIsNone(self.cache.load(self.header_path, 'signature'))
+
+        self.cache.store(self.header_path, 'signature', [self.include_path], self.parsed_data)
+        os.remove(self.include_path)
+        self.assertIsNone(self.cache.load(self.header_path, 'signature'))
+
+    def test_changed_signature_invalidates_entry(self):
+        """
+        **Test Name:** `test_changed_signature_invalidates_entry`
+
+        **Purpose:**
+        To verify that different parser settings (clang arguments, parser version) do not share entries.
+        """
+        self.cache.store(self.header_path, 'signature', [self.include_path], self.parsed_data)
+        self.assertIsNone(self.cache.load(self.header_path, 'other signature'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
 import unittest
+import os
+import sys
+import tempfile
 from clang.cindex import CursorKind
 from cppparser import CppParser
 
@@ -7,7 +10,7 @@ class TestParser(unittest.TestCase):
 
     def setUp(self):
         """Set up the Clang index and mock nodes for testing."""
-        self.index = self.parser.__initialize_index()
+        self.index = self.parser._CppParser__initialize_index()
 
     def test_process_function(self):
         """
@@ -487,5 +490,197 @@ class TestParser(unittest.TestCase):
         self.assertEqual(len(friend_class_data['members']), 0)  # No members
         self.assertEqual(len(friend_class_data['static_members']), 0)  # No static members
 
+    def test_parse_header_skips_included_declarations(self):
+        """
+        **Test Name:** `test_parse_header_skips_included_declarations`
+
+        **Purpose:**
+        To verify that `parse_header` only processes declarations located in the parsed header, unless the
+        included header lives in an allowed directory.
+
+        **Setup:**
+        1. Write a header `included.h` declaring a typedef, and a header `main.h` including it and declaring a function.
+
+        **Execution:**
+        1. Call `parse_header` on `main.h` with the default parser.
+        2. Call `parse_header` on `main.h` with a parser allowing the temporary directory.
+
+        **Validation:**
+        1. The default parser only returns the function of `main.h`.
+        2. The parser allowing the directory also returns the typedef of `included.h`.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'included.h'), 'w') as f:
+                f.write('typedef int IncludedType;\n')
+            main_header = os.path.join(directory, 'main.h')
+            with open(main_header, 'w') as f:
+                f.write('#include "included.h"\nint mainFunction(IncludedType a);\n')
+
+            parsed_data = self.parser.parse_header([main_header])
+            self.assertEqual([item['name'] for item in parsed_data], ['mainFunction'])
+
+            parsed_data = CppParser(allowed_directories=[directory]).parse_header([main_header])
+            self.assertEqual([item['name'] for item in parsed_data], ['IncludedType', 'mainFunction'])
+
+    def test_parse_header_with_precompiled_header(self):
+        """
+        **Test Name:** `test_parse_header_with_precompiled_header`
+
+        **Purpose:**
+        To verify that headers parsed with a precompiled prelude give the same result as without it.
+
+        **Setup:**
+        1. Write a prelude header declaring a typedef, and a header using it without including the prelude.
+        2. Precompile the prelude with `build_precompiled_header`.
+
+        **Validation:**
+        1. The header parsed with the PCH has the function using the typedef from the prelude.
+        2. The typedef itself, located in the prelude, is not part of the output.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            prelude = os.path.join(directory, 'prelude.h')
+            with open(prelude, 'w') as f:
+                f.write('typedef int PreludeType;\n')
+            header = os.path.join(directory, 'header.h')
+            with open(header, 'w') as f:
+                f.write('PreludeType headerFunction(PreludeType a);\n')
+
+            precompiled_header = self.parser.build_precompiled_header(prelude, os.path.join(directory, 'prelude.pch'))
+            parsed_data = CppParser(precompiled_header=precompiled_header).parse_header([header])
+
+            self.assertEqual(len(parsed_data), 1)
+            self.assertEqual(parsed_data[0]['name'], 'headerFunction')
+            self.assertEqual(parsed_data[0]['return_type'], 'PreludeType')
+
+    def test_precompiled_header_is_only_rebuilt_when_stale(self):
+        """
+        **Test Name:** `test_precompiled_header_is_only_rebuilt_when_stale`
+
+        **Purpose:**
+        To verify that a PCH built by a previous run is kept, so the parse cache keyed by its digest stays valid,
+        and is rebuilt once the prelude, a file it includes or the arguments change.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            types_header = os.path.join(directory, 'types.h')
+            with open(types_header, 'w') as f:
+                f.write('typedef int PreludeType;\n')
+            prelude = os.path.join(directory, 'prelude.h')
+            with open(prelude, 'w') as f:
+                f.write('#include "types.h"\n')
+            precompiled_header = os.path.join(directory, 'prelude.pch')
+
+            def build(parser):
+                parser.build_precompiled_header(prelude, precompiled_header)
+                return os.stat(precompiled_header).st_mtime_ns
+
+            built_mtime = build(self.parser)
+            self.assertEqual(build(CppParser()), built_mtime)
+
+            # The included header was modified after the PCH was built.
+            os.utime(precompiled_header, ns=(built_mtime - 10**9, built_mtime - 10**9))
+            rebuilt_mtime = build(CppParser())
+            self.assertGreater(rebuilt_mtime, built_mtime - 10**9)
+            self.assertEqual(build(CppParser()), rebuilt_mtime)
+            self.assertNotEqual(build(CppParser(args=['-x', 'c++', '-std=c++17'])), rebuilt_mtime)
+
+    def test_parse_unsaved(self):
+        """
+        **Test Name:** `test_parse_unsaved`
+
+        **Purpose:**
+        To verify that `parse_unsaved` parses headers held in memory, including each other, without any file on disk.
+
+        **Setup:**
+        1. Give the content of `base.h` as a string and of `derived.h`, including `base.h`, as bytes.
+
+        **Validation:**
+        1. `derived.h` is parsed, and `Derived` inherits the method declared in the in-memory `base.h`.
+        2. Nothing is written to the directory the headers claim to be in.
+        3. New content for the same path is picked up by a parser reusing its translation units.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            base_header = os.path.join(directory, 'base.h')
+            derived_header = os.path.join(directory, 'derived.h')
+            unsaved_files = {
+                base_header: 'class Base {\npublic:\n    virtual int run() = 0;\n};\n',
+                derived_header: b'#include "base.h"\nclass Derived : public Base {};\n',
+            }
+            parser = CppParser(reuse_translation_units=True)
+            parsed_data = parser.parse_unsaved([base_header, derived_header], unsaved_files)
+            self.assertEqual([item['name'] for item in parsed_data], ['Base', 'Derived'])
+            self.assertEqual([method['name'] for method in parsed_data[1]['methods']], ['run'])
+            self.assertEqual(os.listdir(directory), [])
+
+            unsaved_files[base_header] = 'class Base {\npublic:\n    virtual void stop();\n};\n'
+            parsed_data = parser.parse_unsaved([base_header, derived_header], unsaved_files)
+            self.assertEqual([method['name'] for method in parsed_data[1]['methods']], ['stop'])
+
+    def test_parse_templates_and_aliases(self):
+        """
+        **Test Name:** `test_parse_templates_and_aliases`
+
+        **Purpose:**
+        To verify that function templates and `using` aliases are parsed, as `test/outputs/features.yaml` expects.
+
+        **Validation:**
+        1. A function template lists the names of its template parameters and its explicit specializations,
+           which are not reported as functions.
+        2. Type aliases and alias templates are `Using` entities with their underlying type.
+        """
+        header = os.path.join(tempfile.gettempdir(), 'templates.h')
+        content = ('namespace MathUtils {\n'
+                   '    template <typename T> T add(T a, T b) { return a + b; }\n'
+                   '    template <> int add<int>(int a, int b);\n'
+                   '    template <typename T, int N> T scale(T value);\n'
+                   '    template <> double scale<double, 2>(double value);\n'
+                   '}\n'
+                   'using Callback = void (*)(int);\n'
+                   'template <typename T> using Pointer = T *;\n')
+        parsed_data = self.parser.parse_unsaved([header], {header: content})
+
+        self.assertEqual(parsed_data[0]['children'], [
+            {'type': 'Template', 'name': 'add', 'parameters': ['T'], 'specializations': ['add<int>']},
+            {'type': 'Template', 'name': 'scale', 'parameters': ['T', 'N'], 'specializations': ['scale<double, 2>']},
+        ])
+        self.assertEqual(parsed_data[1:], [
+            {'type': 'Using', 'name': 'Callback', 'underlying_type': 'void (*)(int)'},
+            {'type': 'Using', 'name': 'Pointer', 'underlying_type': 'T *'},
+        ])
+
+    def test_traversal_does_not_recurse(self):
+        """
+        **Test Name:** `test_traversal_does_not_recurse`
+
+        **Purpose:**
+        To verify that the traversal keeps its own stack of scopes, so declarations nested deeper than the room left
+        on the Python stack are still parsed, each in its scope.
+
+        **Validation:**
+        1. With the recursion limit a few dozen frames above the current depth, 200 nested namespaces are traversed.
+        2. The class of the innermost namespace is qualified by every namespace, and its nested class follows it.
+        """
+        depth = 200
+        header = os.path.join(tempfile.gettempdir(), 'nested.h')
+        content = (''.join(f'namespace n{level} {{\n' for level in range(depth))
+                   + 'class Outer {\npublic:\n    class Inner { public: virtual void run(); };\n    virtual void stop();\n};\n'
+                   + '}\n' * depth)
+
+        frame, frames = sys._getframe(), 0
+        while frame is not None:
+            frame, frames = frame.f_back, frames + 1
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(frames + 60)
+        try:
+            entities = list(self.parser.iter_header([header], consolidate=False, unsaved_files=[(header, content)]))
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+
+        scope = entities[0]
+        for _ in range(depth - 1):
+            scope = scope.children[0]
+        prefix = '::'.join(f'n{level}' for level in range(depth))
+        self.assertEqual([(entity.name, entity.qualified_name) for entity in scope.children],
+                         [('Outer', f'{prefix}::Outer'), ('Inner', f'{prefix}::Outer::Inner')])
+
 if __name__ == '__main__':
     unittest.main()
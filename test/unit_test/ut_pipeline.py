@@ -0,0 +1,90 @@
+import unittest
+import threading
+from pipeline import Pipeline
+
+class TestPipeline(unittest.TestCase):
+    def test_stages_run_in_order(self):
+        """
+        **Test Name:** `test_stages_run_in_order`
+
+        **Purpose:**
+        To verify that every item goes through every stage, and that a stage may hold items back.
+
+        **Validation:**
+        1. The items come out of the last stage transformed by each stage, in order.
+        2. A stage yielding its items at the end still sees all of them.
+        """
+        def double(items):
+            for item in items:
+                yield item * 2
+
+        def reverse(items):
+            yield from reversed(list(items))
+
+        self.assertEqual(Pipeline(queue_size=2).run(range(10), double, lambda items: (item + 1 for item in items)),
+                         [item * 2 + 1 for item in range(10)])
+        self.assertEqual(Pipeline(queue_size=1).run(range(5), reverse, double), [8, 6, 4, 2, 0])
+
+    def test_queues_are_bounded(self):
+        """
+        **Test Name:** `test_queues_are_bounded`
+
+        **Purpose:**
+        To verify that a fast source never gets more than the queue size ahead of a slow stage.
+        """
+        produced = []
+        consumed = []
+        lead = []
+
+        def source():
+            for item in range(50):
+                produced.append(item)
+                yield item
+
+        def slow(items):
+            for item in items:
+                lead.append(len(produced) - len(consumed))
+                threading.Event().wait(0.001)
+                consumed.append(item)
+                yield item
+
+        self.assertEqual(Pipeline(queue_size=3).run(source(), slow), list(range(50)))
+        # The queue, the item the source holds while waiting for room and the item being consumed
+        self.assertLessEqual(max(lead), 3 + 2)
+
+    def test_errors_stop_every_stage(self):
+        """
+        **Test Name:** `test_errors_stop_every_stage`
+
+        **Purpose:**
+        To verify that an error in any stage is raised by `run`, and that the source is closed rather than
+        left producing items nobody consumes.
+        """
+        closed = threading.Event()
+
+        def source():
+            try:
+                for item in range(1000):
+                    yield item
+            finally:
+                closed.set()
+
+        def failing(items):
+            for item in items:
+                if item == 5:
+                    raise ValueError("broken item")
+                yield item
+
+        with self.assertRaisesRegex(ValueError, "broken item"):
+            Pipeline(queue_size=2).run(source(), failing, lambda items: items)
+        self.assertTrue(closed.is_set())
+
+        def failing_source():
+            yield 1
+            raise KeyError("missing header")
+
+        with self.assertRaises(KeyError):
+            Pipeline().run(failing_source(), lambda items: items)
+
+if __name__ == '__main__':
+    unittest.main()
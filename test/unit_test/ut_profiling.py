@@ -0,0 +1,122 @@
+import unittest
+import json
+import os
+import tempfile
+import profiling
+from profiling import NullProfiler, Profiler
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.profiler = Profiler()
+
+    def test_nested_stages(self):
+        """
+        **Test Name:** `test_nested_stages`
+
+        **Purpose:**
+        To verify that stages are aggregated by name and nesting depth, in the order they first started.
+
+        **Validation:**
+        1. A stage run twice inside another one is reported once, at depth 1, with 2 calls.
+        2. The wall time of the outer stage covers the inner ones.
+        """
+        with self.profiler.stage('parse'):
+            for file in ('a.h', 'b.h'):
+                with self.profiler.stage('parse header', file):
+                    pass
+        with self.profiler.stage('save outputs'):
+            pass
+
+        totals = self.profiler.stage_totals()
+        self.assertEqual([(name, depth, calls) for name, depth, calls, _, _, _ in totals],
+                         [('parse', 0, 1), ('parse header', 1, 2), ('save outputs', 0, 1)])
+        self.assertGreaterEqual(totals[0][3], totals[1][3])
+
+    def test_iterate_excludes_caller_time(self):
+        """
+        **Test Name:** `test_iterate_excludes_caller_time`
+
+        **Purpose:**
+        To verify that `iterate` yields every item and only measures the time spent producing them.
+        """
+        def slow_consumer():
+            items = []
+            for item in self.profiler.iterate('traverse', range(3), 'a.h'):
+                with self.profiler.stage('consolidate', 'a.h'):
+                    items.append(item)
+                    sum(range(100000))
+            return items
+
+        self.assertEqual(slow_consumer(), [0, 1, 2])
+        totals = {name: wall for name, _, _, wall, _, _ in self.profiler.stage_totals()}
+        self.assertLess(totals['traverse'], totals['consolidate'])
+
+    def test_file_totals_and_counters(self):
+        """
+        **Test Name:** `test_file_totals_and_counters`
+
+        **Purpose:**
+        To verify that the time of a file is not counted twice for nested stages of that file, and that
+        counters are attributed to the file of the innermost stage.
+        """
+        with self.profiler.stage('parse header', 'a.h'):
+            with self.profiler.stage('libclang parse', 'a.h'):
+                self.profiler.count('cursors', 5)
+        with self.profiler.stage('parse header', 'b.h'):
+            self.profiler.count('cursors', 2)
+        self.profiler.count('cache hits')
+
+        outer_wall = self.profiler.records[1][4]
+        self.assertEqual(self.profiler.file_totals()['a.h'][0], outer_wall)
+        self.assertEqual(self.profiler.counters, {'cursors': 7, 'cache hits': 1})
+        self.assertEqual(self.profiler.file_counters, {'a.h': {'cursors': 5}, 'b.h': {'cursors': 2}})
+
+        summary = self.profiler.summary()
+        self.assertIn('  libclang parse', summary)
+        self.assertIn('Counters: cache hits 1, cursors 7', summary)
+        self.assertIn('Peak memory', summary)
+
+    def test_write_trace(self):
+        """
+        **Test Name:** `test_write_trace`
+
+        **Purpose:**
+        To verify that the stages are written as complete trace events, with their file as an argument.
+        """
+        with self.profiler.stage('parse header', 'a.h'):
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            trace_file = os.path.join(directory, 'trace.json')
+            self.profiler.write_trace(trace_file)
+            with open(trace_file) as file:
+                trace = json.load(file)
+
+        stages = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual(len(stages), 1)
+        self.assertEqual(stages[0]['name'], 'parse header')
+        self.assertEqual(stages[0]['args']['file'], 'a.h')
+
+    def test_enable_and_disable(self):
+        """
+        **Test Name:** `test_enable_and_disable`
+
+        **Purpose:**
+        To verify that the module-level functions record into the enabled profiler only.
+        """
+        self.addCleanup(profiling.disable)
+        with profiling.stage('ignored'):
+            profiling.count('cursors')
+        self.assertIsInstance(profiling.profiler(), NullProfiler)
+
+        profiler = profiling.enable()
+        with profiling.stage('recorded'):
+            profiling.count('cursors')
+        self.assertEqual([record[0] for record in profiler.records], ['recorded'])
+        self.assertEqual(profiler.counters, {'cursors': 1})
+
+        profiling.disable()
+        self.assertEqual(list(profiling.iterate('traverse', [1, 2])), [1, 2])
+        self.assertEqual(len(profiler.records), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'benchmarks'))
+
+from run_benchmarks import MINIMUM_REGRESSION, find_regressions
+
+def results(timings):
+    return {'version': 1, 'scenarios': timings}
+
+class TestRunBenchmarks(unittest.TestCase):
+    def test_find_regressions(self):
+        """
+        **Test Name:** `test_find_regressions`
+
+        **Purpose:**
+        To verify which stages of a benchmark run are reported as regressions against a baseline.
+
+        **Validation:**
+        1. A stage slower than the baseline by more than the tolerance is reported, with both timings.
+        2. A stage within the tolerance, or faster than the baseline, is not.
+        3. A slowdown over the tolerance but below `MINIMUM_REGRESSION` seconds, i.e. timer noise, is not.
+        4. Stages and scenarios missing from the baseline are skipped, as is an empty baseline.
+        """
+        baseline = results({'many_classes': {'parse': 1.0, 'save': 0.5, 'load': 0.5, 'render': 0.001},
+                            'deep_hierarchy': {'parse': 2.0}})
+        current = results({'many_classes': {'parse': 1.3, 'save': 0.55, 'load': 0.2, 'render': 0.002, 'consolidate': 9.0},
+                           'deep_hierarchy': {'parse': 2.1},
+                           'new_scenario': {'parse': 5.0}})
+
+        self.assertEqual(find_regressions(current, baseline, 0.25), [('many_classes', 'parse', 1.0, 1.3)])
+        self.assertEqual(find_regressions(current, baseline, 0.5), [])
+        self.assertEqual(find_regressions(current, baseline, 0.01),
+                         [('many_classes', 'parse', 1.0, 1.3), ('many_classes', 'save', 0.5, 0.55),
+                          ('deep_hierarchy', 'parse', 2.0, 2.1)])
+        self.assertLess(0.002 - 0.001, MINIMUM_REGRESSION)
+        self.assertEqual(find_regressions(current, {}, 0.25), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import os
+import tempfile
+import yaml
+from serialization import load_parsed_data, save_parsed_data, stream_to_file
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+        self.parsed_data = [
+            {'type': 'Function', 'name': 'testFunction', 'return_type': 'int', 'parameters': [{'name': 'a', 'type': 'int'}]},
+            {'type': 'Namespace', 'name': 'TestNamespace', 'children': [{'type': 'Typedef', 'name': 'TestType', 'underlying_type': 'int'}]},
+        ]
+
+    def output_file(self, name):
+        return os.path.join(self.temporary_directory.name, name)
+
+    def test_streamed_yaml_matches_dump(self):
+        """
+        **Test Name:** `test_streamed_yaml_matches_dump`
+
+        **Purpose:**
+        To verify that writing items one at a time produces the same YAML as dumping the whole list.
+
+        **Validation:**
+        1. The streamed file equals `yaml.dump` of the list, for a list of items and for an empty list.
+        """
+        for data in (self.parsed_data, []):
+            output_file = self.output_file('streamed_output.yaml')
+            stream_to_file(iter(data), output_file)
+            with open(output_file) as f:
+                self.assertEqual(f.read(), yaml.dump(data, sort_keys=False))
+
+    def test_stream_leaves_unchanged_file_untouched(self):
+        """
+        **Test Name:** `test_stream_leaves_unchanged_file_untouched`
+
+        **Purpose:**
+        To verify that streaming the same items again does not replace the output file.
+        """
+        output_file = self.output_file('streamed_output.yaml')
+        self.assertTrue(stream_to_file(iter(self.parsed_data), output_file))
+        self.assertFalse(stream_to_file(iter(self.parsed_data), output_file))
+        self.assertEqual(os.listdir(self.temporary_directory.name), ['streamed_output.yaml'])
+
+    def test_round_trip(self):
+        """
+        **Test Name:** `test_round_trip`
+
+        **Purpose:**
+        To verify that parsed data saved as YAML or JSON Lines, or streamed as JSON Lines, loads back unchanged.
+        """
+        for name in ('saved_output.yaml', 'saved_output.jsonl'):
+            save_parsed_data(self.parsed_data, self.output_file(name))
+            self.assertEqual(load_parsed_data(self.output_file(name)), self.parsed_data)
+
+        stream_to_file(iter(self.parsed_data), self.output_file('streamed_output.jsonl'))
+        self.assertEqual(load_parsed_data(self.output_file('streamed_output.jsonl')), self.parsed_data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import argparse
+import os
+import tempfile
+from main import main
+from manifest import load_manifest
+from sharding import merge_shards, parse_shard, partition
+
+HEADERS = {
+    'derived.h': '#include "base.h"\nclass Derived : public Base {\npublic:\n    virtual void stop();\n};\n',
+    'base.h': 'class Base {\npublic:\n    virtual int start(int speed) = 0;\n};\n',
+    'other.h': 'class Other {\npublic:\n    virtual bool ready() const;\n};\n',
+}
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+
+    def path(self, *names):
+        return os.path.join(self.temporary_directory.name, *names)
+
+    def write_headers(self, sizes):
+        header_files = []
+        for name, size in sizes.items():
+            with open(self.path(name), 'w') as f:
+                f.write(' ' * size)
+            header_files.append(self.path(name))
+        return header_files
+
+    def test_partition_is_deterministic_and_balanced(self):
+        """
+        **Test Name:** `test_partition_is_deterministic_and_balanced`
+
+        **Purpose:**
+        To verify that headers are split by size into shards that do not depend on the order the headers are listed in.
+
+        **Validation:**
+        1. Every header is in exactly one shard, and each shard keeps the order of the list.
+        2. Shuffling the list gives the same shards.
+        3. The largest header gets a shard of its own, the others balance the remaining ones.
+        4. Shard specifications are numbered from 1 to N.
+        """
+        header_files = self.write_headers({'a.h': 900, 'b.h': 500, 'c.h': 400, 'd.h': 300, 'e.h': 200, 'f.h': 100})
+        shards = partition(header_files, 3)
+        self.assertEqual(sorted(sum(shards, [])), sorted(header_files))
+        for shard in shards:
+            self.assertEqual(shard, sorted(shard))
+
+        shuffled_shards = partition(list(reversed(header_files)), 3)
+        self.assertEqual([sorted(shard) for shard in shuffled_shards], [sorted(shard) for shard in shards])
+
+        self.assertEqual(shards[0], [self.path('a.h')])
+        self.assertEqual([sum(os.path.getsize(header_file) for header_file in shard) for shard in shards], [900, 800, 700])
+        self.assertEqual(partition(header_files[:1], 2), [header_files[:1], []])
+
+        self.assertEqual(parse_shard('2/4'), (2, 4))
+        for text in ('0/4', '5/4', '2', 'a/b'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(text)
+
+    def test_merge_shards(self):
+        """
+        **Test Name:** `test_merge_shards`
+
+        **Purpose:**
+        To verify that merging the outputs of shards run in separate directories gives the same outputs and mocks
+        as a single run, including a class whose base was parsed by another shard.
+
+        **Validation:**
+        1. The merged outputs and mocks match those of a single run, file by file.
+        2. A header produced by two shards is rejected.
+        """
+        header_files = []
+        for name, content in HEADERS.items():
+            with open(self.path(name), 'w') as f:
+                f.write(content)
+            header_files.append(self.path(name))
+        derived_header, base_header, other_header = header_files
+
+        manifest_files = []
+        for shard, shard_headers in enumerate([[derived_header, other_header], [base_header]]):
+            shard_directory = self.path(f'shard{shard}')
+            manifest_files.append(os.path.join(shard_directory, 'parent_output.yaml'))
+            main(shard_headers, shard_directory, manifest_files[-1])
+        merged_directory = self.path('merged')
+        entries = merge_shards(manifest_files, merged_directory, os.path.join(merged_directory, 'parent_output.yaml'))
+        single_directory = self.path('single')
+        main(sorted(header_files), single_directory, os.path.join(single_directory, 'parent_output.yaml'))
+
+        self.assertEqual(entries, load_manifest(os.path.join(merged_directory, 'parent_output.yaml')))
+        self.assertEqual([entry['file'] for entry in entries], sorted(header_files))
+        for name in ('derived_output.yaml', 'base_output.yaml', 'other_output.yaml', 'derived_mock.h', 'base_mock.h',
+                     'other_mock.h'):
+            with open(os.path.join(single_directory, name)) as f, open(os.path.join(merged_directory, name)) as g:
+                self.assertEqual(g.read(), f.read(), name)
+        with open(os.path.join(merged_directory, 'derived_mock.h')) as f:
+            self.assertIn("MOCK_METHOD(int, start, (int speed), (override));", f.read())
+
+        with self.assertRaisesRegex(ValueError, "base.h"):
+            merge_shards(manifest_files + manifest_files[1:], merged_directory,
+                         os.path.join(merged_directory, 'parent_output.yaml'))
+
+if __name__ == '__main__':
+    unittest.main()
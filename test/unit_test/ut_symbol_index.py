@@ -0,0 +1,138 @@
+import unittest
+import os
+import tempfile
+from serialization import save_parsed_data
+from symbol_index import SymbolIndex, generate_class_mock, update_symbol_index
+
+def class_data(name, usr, method_name):
+    method = {'type': 'Method', 'name': method_name, 'return_type': 'void', 'parameters': [],
+              'is_virtual': True, 'is_static': False, 'is_const': False, 'access': 'public'}
+    return {'type': 'Class', 'name': name, 'base_classes': [], 'members': [], 'methods': [method], 'static_members': [],
+            'usr': usr}
+
+class TestSymbolIndex(unittest.TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporary_directory.cleanup)
+        self.index_file = self.path('symbol_index.json')
+
+        self.header_files = [self.path('shapes.h'), self.path('widgets.h')]
+        self.parsed_files = [
+            [class_data('Shape', 'c:@S@Shape', 'draw')],
+            [{'type': 'Namespace', 'name': 'a', 'children': [class_data('Widget', 'c:@N@a@S@Widget', 'run')]},
+             {'type': 'Namespace', 'name': 'b', 'children': [class_data('Widget', 'c:@N@b@S@Widget', 'size')]}],
+        ]
+        self.output_files = [self.path('shapes_output.yaml'), self.path('widgets_output.yaml')]
+        for header_file, output_file, parsed_data in zip(self.header_files, self.output_files, self.parsed_files):
+            with open(header_file, 'w'):
+                pass
+            save_parsed_data(parsed_data, output_file)
+
+    def path(self, name):
+        return os.path.join(self.temporary_directory.name, name)
+
+    def test_lookup(self):
+        """
+        **Test Name:** `test_lookup`
+
+        **Purpose:**
+        To verify that same-named classes of different namespaces are indexed apart, and found by qualified name,
+        USR or unqualified name once the index is loaded again.
+        """
+        update_symbol_index(self.index_file, self.header_files, self.output_files, self.parsed_files)
+        index = SymbolIndex(self.index_file)
+
+        self.assertEqual([entry['usr'] for entry in index.lookup('a::Widget')], ['c:@N@a@S@Widget'])
+        self.assertEqual([entry['name'] for entry in index.lookup('c:@N@b@S@Widget')], ['b::Widget'])
+        self.assertEqual(len(index.lookup('Widget')), 2)
+        self.assertEqual(index.lookup('Shape')[0]['file'], self.header_files[0])
+        self.assertEqual(index.lookup('Missing'), [])
+
+    def test_index_spans_runs(self):
+        """
+        **Test Name:** `test_index_spans_runs`
+
+        **Purpose:**
+        To verify that a run indexing some headers keeps the classes indexed by earlier runs, and that headers which
+        no longer exist are dropped.
+        """
+        update_symbol_index(self.index_file, self.header_files[:1], self.output_files[:1], self.parsed_files[:1])
+        update_symbol_index(self.index_file, self.header_files[1:], self.output_files[1:])
+        self.assertEqual(len(SymbolIndex(self.index_file).lookup('Shape')), 1)
+
+        os.remove(self.header_files[0])
+        update_symbol_index(self.index_file, [], [])
+        self.assertEqual(SymbolIndex(self.index_file).lookup('Shape'), [])
+        self.assertEqual(len(SymbolIndex(self.index_file).lookup('Widget')), 2)
+
+    def test_generate_class_mock(self):
+        """
+        **Test Name:** `test_generate_class_mock`
+
+        **Purpose:**
+        To verify that the mock of a single class is generated from its indexed output file, and that an ambiguous
+        or unknown name is reported.
+        """
+        index = update_symbol_index(self.index_file, self.header_files, self.output_files, self.parsed_files)
+
+        entry, mock_file = generate_class_mock(index, 'b::Widget')
+        self.assertEqual(mock_file, self.path('b_Widget_mock.h'))
+        with open(mock_file) as f:
+            content = f.read()
+        self.assertIn("MOCK_METHOD(void, size, (), (override));", content)
+        self.assertNotIn("run", content)
+
+        with self.assertRaises(LookupError):
+            generate_class_mock(index, 'Widget')
+        with self.assertRaises(LookupError):
+            generate_class_mock(index, 'Missing')
+
+    def test_index_records_absolute_paths(self):
+        """
+        **Test Name:** `test_index_records_absolute_paths`
+
+        **Purpose:**
+        To verify that headers indexed by relative paths are recorded by absolute paths, so saving the index from
+        another directory keeps them.
+        """
+        working_directory = os.getcwd()
+        self.addCleanup(os.chdir, working_directory)
+        os.chdir(self.temporary_directory.name)
+        update_symbol_index(self.index_file, ['shapes.h'], ['shapes_output.yaml'], self.parsed_files[:1])
+
+        os.chdir(working_directory)
+        index = update_symbol_index(self.index_file, [], [])
+        entry, = index.lookup('Shape')
+        self.assertEqual((entry['file'], entry['output_file']), (self.header_files[0], self.output_files[0]))
+
+    def test_unmockable_class_and_template_arguments(self):
+        """
+        **Test Name:** `test_unmockable_class_and_template_arguments`
+
+        **Purpose:**
+        To verify that a class nested in a class template is found by its name without template arguments, and
+        that an indexed class that is not mocked is reported as such.
+
+        **Validation:**
+        1. `net::Queue::Observer` and `net::Queue<T, N>::Observer` both find the nested class, whose mock is generated.
+        2. A plain data struct is reported as not mockable.
+        """
+        observer = {**class_data('Observer', 'c:@N@net@ST>2#T#NI@Queue@S@Observer', 'notify'),
+                    'qualified_name': 'net::Queue<T, N>::Observer', 'scope_template_parameters': ['typename T', 'int N']}
+        point = {**class_data('Point', 'c:@S@Point', 'length'), 'is_struct': True}
+        point['methods'][0]['is_virtual'] = False
+        parsed_data = [{'type': 'Namespace', 'name': 'net', 'children': [observer]}, point]
+        save_parsed_data(parsed_data, self.output_files[0])
+        index = update_symbol_index(self.index_file, self.header_files[:1], self.output_files[:1], [parsed_data])
+
+        self.assertEqual(index.lookup('net::Queue::Observer'), index.lookup('net::Queue<T, N>::Observer'))
+        entry, mock_file = generate_class_mock(index, 'net::Queue::Observer')
+        self.assertEqual(mock_file, self.path('net_Queue_Observer_mock.h'))
+        with open(mock_file) as f:
+            self.assertIn("class MockQueue_Observer : public Queue<T, N>::Observer {", f.read())
+
+        with self.assertRaisesRegex(LookupError, "Point is not mockable"):
+            generate_class_mock(index, 'Point')
+
+if __name__ == '__main__':
+    unittest.main()